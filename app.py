@@ -2,6 +2,7 @@ import streamlit as st
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import json
 import time
 
 # -------------------------------
@@ -12,8 +13,15 @@ from backend.story_generator import StoryGenerator
 from backend.gherkin_generator import GherkinGenerator
 from backend.code_updater import CodeUpdater
 from backend.file_loader import FileLoader
-from backend.orchestrator_multi import OrchestratorMulti
+from backend.file_saver import ArtifactWriter
+from backend.analysis_cache import AnalysisCache
+from backend.behave_suite import BehaveSuite
+from backend.orchestrator_multi import DEFAULT_MAX_WORKERS
+from backend.job_runner import JobRunner
+from backend.source_discovery import DEFAULT_EXCLUDE, DEFAULT_INCLUDE
+from backend.step_index import StepIndex
 from backend.app_utils.prompt_manager import PromptManager
+from backend.app_utils.prompt_registry import PromptRegistry
 
 # -------------------------------
 # ⚙️ INITIAL SETUP
@@ -45,6 +53,51 @@ for folder in [INPUT_DIR, OUTPUT_DIR, OUTPUT_DIR / "requirements", OUTPUT_DIR /
 pm = PromptManager()
 prompts = pm.load_prompts() 
 
+# -------------------------------
+# 🧬 SHARED SOURCE ANALYSIS
+# -------------------------------
+@st.cache_resource
+def get_analysis_cache():
+    """One parse per distinct source across reruns, tabs and automation runs."""
+    return AnalysisCache()
+
+analysis_cache = get_analysis_cache()
+
+@st.cache_resource
+def get_job_runner():
+    """One background job queue shared by every session of this server."""
+    return JobRunner(analysis_cache=get_analysis_cache())
+
+job_runner = get_job_runner()
+
+@st.cache_resource
+def get_artifact_writer():
+    """Atomic, change-aware writer for the single-file tabs."""
+    return ArtifactWriter(OUTPUT_DIR)
+
+artifact_writer = get_artifact_writer()
+
+@st.cache_resource
+def get_step_index():
+    """Step definitions of earlier Gherkin outputs, offered to the model for reuse."""
+    return StepIndex(str(OUTPUT_DIR / ".step_index.json"))
+
+step_index = get_step_index()
+
+# -------------------------------
+# 📡 STREAMING HELPER
+# -------------------------------
+def stream_output(chunks, save_path, language="markdown"):
+    """Render model output as it streams in while writing it to ``save_path``."""
+    placeholder = st.empty()
+    text = ""
+    for chunk in artifact_writer.stream(save_path, chunks):
+        text += chunk
+        placeholder.code(text, language=language)
+    artifact_writer.flush()
+    placeholder.empty()
+    return text.strip()
+
 # -------------------------------
 # 🧭 DEFINE TABS
 # -------------------------------
@@ -69,13 +122,11 @@ with tabs[0]:
         st.success("✅ File uploaded successfully!")
 
         if st.button("🧾 Generate Requirements"):
-            generator = RequirementsGenerator(py_code, uploaded_file.name)
-            requirements_text = generator.process()
-            st.text_area("📘 Generated Requirements", requirements_text, height=400)
-
+            analysis = analysis_cache.from_text(py_code, uploaded_file.name)
+            generator = RequirementsGenerator(py_code, uploaded_file.name, analysis=analysis)
             save_path = OUTPUT_DIR / "requirements" / f"{uploaded_file.name.replace('.py', '_requirements.md')}"
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(requirements_text)
+            requirements_text = stream_output(generator.stream(), save_path)
+            st.text_area("📘 Generated Requirements", requirements_text, height=400)
             st.success(f"💾 Saved to {save_path}")
 
 # ============================================================
@@ -92,14 +143,13 @@ with tabs[1]:
         st.success("✅ File uploaded successfully!")
 
         if st.button("📖 Generate Story"):
-            story_gen = StoryGenerator(py_code, uploaded_file.name)  # ✅ Pass filename also
-            story_output = story_gen.process()
-            st.text_area("🧾 Generated User Story", story_output, height=400)
+            analysis = analysis_cache.from_text(py_code, uploaded_file.name)
+            story_gen = StoryGenerator(py_code, uploaded_file.name, analysis=analysis)  # ✅ Pass filename also
 
-            # Save output
+            # Stream output to screen and disk
             save_path = OUTPUT_DIR / f"{uploaded_file.name.replace('.py', '_story.md')}"
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(story_output)
+            story_output = stream_output(story_gen.stream(), save_path)
+            st.text_area("🧾 Generated User Story", story_output, height=400)
 
             st.success(f"💾 Saved to {save_path}")
 
@@ -119,13 +169,18 @@ with tabs[2]:
         st.success("✅ Both files uploaded successfully!")
 
         if st.button("🧩 Generate Feature File"):
-            gherkin_gen = GherkinGenerator(code_text, req_text, code_file.name)
-            gherkin_output = gherkin_gen.process()
-            st.text_area("📄 Generated Gherkin Feature", gherkin_output, height=400)
-
+            analysis = analysis_cache.from_text(code_text, code_file.name)
             save_path = OUTPUT_DIR / "gherkin" / f"{code_file.name.replace('.py', '.feature')}"
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(gherkin_output)
+            gherkin_gen = GherkinGenerator(
+                code_text, req_text, code_file.name, analysis=analysis,
+                step_index=step_index.refresh(str(OUTPUT_DIR / "gherkin")), output_path=save_path,
+            )
+            gherkin_output = stream_output(gherkin_gen.stream(), save_path, language="gherkin")
+            step_index.add(save_path, gherkin_output)
+            step_index.save()
+            # Keep the shared steps package in sync with the reply just saved.
+            BehaveSuite(OUTPUT_DIR / "gherkin", OUTPUT_DIR / "behave", artifact_writer).export()
+            st.text_area("📄 Generated Gherkin Feature", gherkin_output, height=400)
             st.success(f"💾 Saved to {save_path}")
 
 # ============================================================
@@ -144,13 +199,11 @@ with tabs[3]:
         st.success("✅ Files ready for update!")
 
         if st.button("🔧 Update Code"):
-            updater = CodeUpdater(py_code, req_text, uploaded_code.name)
-            updated_code = updater.process()
-            st.text_area("🧠 Updated Python Code", updated_code, height=400)
-
+            analysis = analysis_cache.from_text(py_code, uploaded_code.name)
+            updater = CodeUpdater(req_text, py_code, uploaded_code.name, analysis=analysis)
             save_path = OUTPUT_DIR / "updated_code" / uploaded_code.name
-            with open(save_path, "w", encoding="utf-8") as f:
-                f.write(updated_code)
+            updated_code = stream_output(updater.stream(), save_path, language="python")
+            st.text_area("🧠 Updated Python Code", updated_code, height=400)
             st.success(f"💾 Updated file saved to {save_path}")
 
 # ============================================================
@@ -159,49 +212,119 @@ with tabs[3]:
 with tabs[4]:
     st.header("🚀 Automated Multi-File Processing Dashboard")
 
-    st.write(f"📂 Scanning directory: `{INPUT_DIR}`")
-    py_files = FileLoader.list_py_files(str(INPUT_DIR))
-
-    if not py_files:
+    st.write(f"📂 Input directory: `{INPUT_DIR}` (scanned recursively while the job runs)")
+    include_col, exclude_col = st.columns(2)
+    include = include_col.text_input(
+        "✅ Include globs", value=", ".join(DEFAULT_INCLUDE),
+        help="Comma-separated gitignore-style patterns, e.g. `*.py, src/**/*.py`."
+    )
+    exclude = exclude_col.text_input(
+        "🚫 Exclude globs", value="",
+        help="Applied on top of .gitignore files and the usual VCS, cache and virtualenv folders."
+    )
+
+    first_file = next(iter(FileLoader.discover(str(INPUT_DIR))), None)
+    if first_file is None:
         st.warning("⚠️ No Python files found in the input folder.")
     else:
-        st.success(f"✅ Found {len(py_files)} Python files for processing.")
-        for file in py_files:
-            st.markdown(f"- `{file}`")
-
         st.markdown("---")
+        max_workers = st.slider(
+            "⚙️ Parallel workers", min_value=1, max_value=32,
+            value=min(DEFAULT_MAX_WORKERS, 32),
+            help="Number of files processed concurrently."
+        )
+        incremental = st.checkbox(
+            "⏭️ Skip unchanged files", value=True,
+            help="Only re-run stages whose source, prompt template or model changed since the last run."
+        )
         if st.button("🚀 Run Full Automation", use_container_width=True, type="primary"):
-            st.info("⚙️ Starting background processing for all files...")
-            progress = st.progress(0)
-            status_placeholder = st.empty()
-            results = []
-            total_files = len(py_files)
-
-            for i, file_path in enumerate(py_files):
-                filename = Path(file_path).name
-                status_placeholder.markdown(f"🧩 **Processing:** `{filename}`")
-                time.sleep(0.3)
-                try:
-                    orchestrator = OrchestratorMulti([file_path])
-                    result = orchestrator.process_all()
-                    results.append((filename, "🟢 Success", result))
-                except Exception as e:
-                    results.append((filename, f"🔴 Failed ({e})", None))
-                progress.progress((i + 1) / total_files)
-
-            status_placeholder.empty()
+            st.session_state["automation_job"] = job_runner.submit_directory(
+                INPUT_DIR,
+                include=[p.strip() for p in include.split(",") if p.strip()] or DEFAULT_INCLUDE,
+                exclude=list(DEFAULT_EXCLUDE) + [p.strip() for p in exclude.split(",") if p.strip()],
+                max_workers=max_workers, incremental=incremental, stream=True,
+            )
+            st.session_state["automation_events"] = 0
+
+    # Jobs run in the background: this page only polls their status.
+    job_id = st.session_state.get("automation_job")
+    recent_jobs = job_runner.list_jobs(limit=10)
+    if job_id is None and recent_jobs:
+        with st.expander("🗂️ Recent automation jobs"):
+            for recent in recent_jobs:
+                if st.button(f"{recent['status']} — {recent['id']}", key=f"job_{recent['id']}"):
+                    st.session_state["automation_job"] = recent["id"]
+                    st.rerun()
+
+    job = job_runner.get(job_id) if job_id else None
+    if job is not None:
+        st.markdown("---")
+        st.subheader(f"🧵 Job `{job['id']}` — {job['status']}")
+        stats = job["progress"]
+
+        if job["status"] in ("queued", "running"):
+            total_files = max(stats.get("total", 0), 1)
+            st.progress(min(1.0, (stats.get("completed", 0) + stats.get("failed", 0)) / total_files))
+            eta = f"{stats['eta_seconds']:.0f}s" if stats.get("eta_seconds") is not None else "…"
+            found = f"{stats.get('total', 0)}{'+ (scanning…)' if stats.get('discovering') else ''}"
+            st.markdown(
+                f"🧩 {stats.get('completed', 0)}/{found} files · "
+                f"⚡ {stats.get('files_per_second', 0):.2f} files/s · ⏳ ETA {eta}"
+            )
+            events = job_runner.events(job_id, st.session_state.get("automation_events", 0))
+            if events:
+                st.session_state["automation_events"] = events[-1]["seq"]
+                st.session_state["automation_log"] = (
+                    st.session_state.get("automation_log", []) +
+                    [f"- `{event['filename']}` — {event['message']}" for event in events]
+                )[-8:]
+            st.markdown("\n".join(st.session_state.get("automation_log", [])))
+            if st.button("⏹️ Cancel job", disabled=job.get("cancel_requested", False)):
+                job_runner.cancel(job_id)
+            time.sleep(1.0)
+            st.rerun()
+
+        if job["status"] == "done":
             st.success("✅ Automation completed for all files!")
-
+        elif job["status"] == "cancelled":
+            st.warning("⏹️ Job cancelled; finished files were kept.")
+        elif job["status"] in ("failed", "interrupted"):
+            st.error(f"❌ Job {job['status']}: {job.get('error') or 'the server restarted before it finished.'}")
+
+        result = job["result"] or {}
+        if result.get("skipped_summary"):
+            st.info(result["skipped_summary"])
+        if result.get("dedup_summary"):
+            st.info(result["dedup_summary"])
+
+        if job["stage_table"]:
+            st.markdown("---")
+            st.subheader("⏱️ Per-Stage Latency")
+            st.dataframe(job["stage_table"], use_container_width=True)
+            col1, col2 = st.columns(2)
+            col1.download_button(
+                "⬇️ Stage table (JSON)", json.dumps(job["stage_table"], indent=2),
+                file_name="stage_table.json", mime="application/json"
+            )
+            col2.download_button(
+                "⬇️ Metrics (OpenMetrics)", job["openmetrics"],
+                file_name="stage_metrics.txt", mime="text/plain"
+            )
+
+        if result.get("files"):
             st.markdown("---")
             st.subheader("📊 Processing Summary")
-            for filename, status, result in results:
-                with st.expander(f"{status} — {filename}"):
-                    if result:
-                        st.code(result, language="markdown")
-                    else:
-                        st.warning("No result data available for this file.")
+            for entry in result["files"]:
+                failed = entry["summary"].lstrip().startswith(("❌", "⏹️"))
+                with st.expander(f"{'🔴 Failed' if failed else '🟢 Success'} — {entry['filename']}"):
+                    st.code(entry["summary"], language="markdown")
             st.info(f"📁 Outputs saved in `{OUTPUT_DIR}` directory.")
 
+        if st.button("🧹 Clear job view"):
+            st.session_state.pop("automation_job", None)
+            st.session_state.pop("automation_log", None)
+            st.rerun()
+
 # ============================================================
 # 🧠 TAB 6: PROMPT MANAGER
 # ============================================================
@@ -225,9 +348,15 @@ with tabs[5]:
             placeholder=f"Enter or edit {key.replace('_', ' ')} prompt..."
         )
 
-    if st.button("💾 Save Prompts", use_container_width=True, type="primary"):
+    save_col, reload_col = st.columns(2)
+    if save_col.button("💾 Save Prompts", use_container_width=True, type="primary"):
         try:
             pm.save_prompts(updated_prompts)
+            PromptRegistry.reload_all()
             st.success("✅ Prompts saved successfully!")
         except Exception as e:
             st.error(f"⚠️ Failed to save prompts: {e}")
+
+    if reload_col.button("🔄 Reload Prompts", use_container_width=True):
+        PromptRegistry.reload_all()
+        st.success("✅ Prompt templates reloaded from disk.")
@@ -1,21 +1,262 @@
-import os
-from openai import OpenAI
+import asyncio
+import itertools
+import json
+import threading
+import time
 from dotenv import load_dotenv
+from backend.instrumentation import current_span
+from backend.model_providers import OpenAIProvider, provider_from_env
+from backend.rate_limiter import RateLimiter
+from backend.response_cache import ResponseCache
+from backend.retry_policy import RetryPolicy
+from backend.single_flight import SingleFlight
+
+DEFAULT_MODEL = "gpt-4.1-mini"
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+def _load_env_once():
+    """Parse .env a single time per process."""
+    global _env_loaded
+    with _env_lock:
+        if not _env_loaded:
+            load_dotenv()
+            _env_loaded = True
+
 
 class AIClient:
-    """Handles all OpenAI model calls for the automation framework."""
-
-    def __init__(self):
-        load_dotenv()
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            raise ValueError("❌ OpenAI API key missing in .env file.")
-        self.client = OpenAI(api_key=api_key)
-
-    def generate_text(self, prompt: str, model="gpt-4.1-mini"):
-        """Unified response generator for text-based prompts."""
-        response = self.client.responses.create(
-            model=model,
-            input=prompt
+    """Handles all model calls for the automation framework.
+
+    Requests go to a pluggable :class:`ModelProvider` (OpenAI by default,
+    or the deterministic local stub with ``AI_PROVIDER=stub``); this class
+    layers the response cache, rate limiter and retry policy on top.
+
+    Use ``AIClient.shared()`` to get the process-wide instance: it owns one
+    keep-alive HTTP connection pool that every generator reuses, so TLS
+    handshakes and environment parsing happen once per process.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache=None, limiter=None, retry_policy=None, provider=None):
+        _load_env_once()
+        self.provider = provider if provider is not None else provider_from_env()
+        self.cache = cache if cache is not None else ResponseCache.default()
+        self.limiter = limiter if limiter is not None else RateLimiter.default()
+        self.retry_policy = (
+            retry_policy if retry_policy is not None else RetryPolicy.default(self.limiter)
         )
-        return response.output[0].content[0].text.strip()
+        self.single_flight = SingleFlight()
+
+    @classmethod
+    def shared(cls):
+        """Return the lazily created, thread-safe process-wide client."""
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = cls()
+        return cls._shared
+
+    @classmethod
+    def set_shared(cls, client):
+        """Install ``client`` as the process-wide instance (e.g. a stub-backed one)."""
+        with cls._shared_lock:
+            cls._shared = client
+
+    @property
+    def client(self):
+        """Raw OpenAI client (e.g. for the Batch API); OpenAI provider only."""
+        if not isinstance(self.provider, OpenAIProvider):
+            raise ValueError(f"❌ Provider '{self.provider.name}' has no OpenAI client.")
+        return self.provider.client
+
+    @property
+    def async_client(self):
+        """Raw AsyncOpenAI client for the running loop; OpenAI provider only."""
+        if not isinstance(self.provider, OpenAIProvider):
+            raise ValueError(f"❌ Provider '{self.provider.name}' has no OpenAI client.")
+        return self.provider.async_client
+
+    @staticmethod
+    def _cache_key(prompt, messages):
+        return prompt if messages is None else json.dumps(messages, sort_keys=True)
+
+    def _complete(self, model, prompt=None, messages=None, use_cache=True):
+        """One cached, rate-limited, retried request.
+
+        With caching enabled, concurrent identical requests are coalesced:
+        only the first caller hits the provider, the others share its answer.
+        """
+        key = self._cache_key(prompt, messages)
+        span = current_span()
+        if use_cache:
+            cached = self.cache.get(model, key, self.provider.name)
+            if cached is not None:
+                if span is not None:
+                    span.record_call(model, cache_hit=True)
+                return cached
+
+        def fetch():
+            return self._fetch(model, prompt, messages, key, span, use_cache)
+
+        if not use_cache:
+            return fetch()
+        started = time.perf_counter()
+        text, coalesced = self.single_flight.do(ResponseCache.make_key(model, key, self.provider.name), fetch)
+        if coalesced and span is not None:
+            span.record_call(model, time.perf_counter() - started, coalesced=True)
+        return text
+
+    def _fetch(self, model, prompt, messages, key, span, use_cache):
+        estimate = RateLimiter.estimate_tokens(key)
+        started = time.perf_counter()
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            attempts += 1
+            self.limiter.acquire(estimate)
+            return self.provider.complete(model, prompt=prompt, messages=messages)
+
+        result = self.retry_policy.call(attempt)
+        self.limiter.adjust(estimate, result.total_tokens)
+        if span is not None:
+            span.record_call(model, time.perf_counter() - started, retries=attempts - 1, usage=result.usage)
+
+        if use_cache:
+            self.cache.set(model, key, result.text, self.provider.name)
+        return result.text
+
+    async def _acomplete(self, model, prompt=None, messages=None, use_cache=True):
+        """Async variant of :meth:`_complete`, coalescing with threads and other tasks.
+
+        The sqlite cache is read and written on a worker thread so cache I/O
+        never blocks the event loop.
+        """
+        key = self._cache_key(prompt, messages)
+        span = current_span()
+        if use_cache:
+            cached = await asyncio.to_thread(self.cache.get, model, key, self.provider.name)
+            if cached is not None:
+                if span is not None:
+                    span.record_call(model, cache_hit=True)
+                return cached
+
+        def fetch():
+            return self._afetch(model, prompt, messages, key, span, use_cache)
+
+        if not use_cache:
+            return await fetch()
+        started = time.perf_counter()
+        text, coalesced = await self.single_flight.ado(ResponseCache.make_key(model, key, self.provider.name), fetch)
+        if coalesced and span is not None:
+            span.record_call(model, time.perf_counter() - started, coalesced=True)
+        return text
+
+    async def _afetch(self, model, prompt, messages, key, span, use_cache):
+        estimate = RateLimiter.estimate_tokens(key)
+        started = time.perf_counter()
+        attempts = 0
+
+        async def attempt():
+            nonlocal attempts
+            attempts += 1
+            await self.limiter.aacquire(estimate)
+            return await self.provider.acomplete(model, prompt=prompt, messages=messages)
+
+        result = await self.retry_policy.acall(attempt)
+        self.limiter.adjust(estimate, result.total_tokens)
+        if span is not None:
+            span.record_call(model, time.perf_counter() - started, retries=attempts - 1, usage=result.usage)
+
+        if use_cache:
+            await asyncio.to_thread(self.cache.set, model, key, result.text, self.provider.name)
+        return result.text
+
+    def _stream(self, model, prompt=None, messages=None, use_cache=True):
+        """Yield text chunks from a streaming request, caching the full text.
+
+        Transient failures are retried only until the first chunk arrives;
+        once output has reached the caller a failure is raised as-is.
+        """
+        key = self._cache_key(prompt, messages)
+        span = current_span()
+        if use_cache:
+            cached = self.cache.get(model, key, self.provider.name)
+            if cached is not None:
+                if span is not None:
+                    span.record_call(model, cache_hit=True)
+                yield cached
+                return
+
+        estimate = RateLimiter.estimate_tokens(key)
+        started = time.perf_counter()
+        attempts = 0
+
+        def attempt():
+            nonlocal attempts
+            attempts += 1
+            self.limiter.acquire(estimate)
+            iterator = self.provider.stream(model, prompt=prompt, messages=messages)
+            return iterator, next(iterator, None)
+
+        iterator, first = self.retry_policy.call(attempt)
+        parts, usage = [], None
+        if first is not None:
+            for delta, chunk_usage in itertools.chain([first], iterator):
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                usage = chunk_usage or usage
+        self.limiter.adjust(estimate, usage.total_tokens if usage else None)
+        if span is not None:
+            # Includes the time the consumer spent handling each chunk.
+            span.record_call(model, time.perf_counter() - started, retries=attempts - 1, usage=usage)
+
+        if use_cache:
+            self.cache.set(model, key, "".join(parts).strip(), self.provider.name)
+
+    def generate_text(self, prompt: str, model=DEFAULT_MODEL, use_cache=True):
+        """Unified response generator for text-based prompts.
+
+        Responses are served from the shared response cache when the same
+        ``(model, prompt)`` pair was answered before; pass ``use_cache=False``
+        to force a fresh model call.
+        """
+        return self._complete(model, prompt=prompt, use_cache=use_cache)
+
+    async def agenerate_text(self, prompt: str, model=DEFAULT_MODEL, use_cache=True):
+        """Async counterpart of :meth:`generate_text` sharing the same cache."""
+        return await self._acomplete(model, prompt=prompt, use_cache=use_cache)
+
+    def chat_text(self, messages, model=DEFAULT_MODEL, use_cache=True):
+        """Chat-style variant of :meth:`generate_text`."""
+        return self._complete(model, messages=messages, use_cache=use_cache)
+
+    async def achat_text(self, messages, model=DEFAULT_MODEL, use_cache=True):
+        """Async variant of :meth:`chat_text`."""
+        return await self._acomplete(model, messages=messages, use_cache=use_cache)
+
+    def stream_text(self, prompt: str, model=DEFAULT_MODEL, use_cache=True):
+        """Streaming variant of :meth:`generate_text` yielding text deltas."""
+        return self._stream(model, prompt=prompt, use_cache=use_cache)
+
+    def stream_chat(self, messages, model=DEFAULT_MODEL, use_cache=True):
+        """Streaming variant of :meth:`chat_text` yielding text deltas."""
+        return self._stream(model, messages=messages, use_cache=use_cache)
+
+    def stats(self):
+        """Cache, throttling and retry counters for dashboards and logs."""
+        stats = {
+            "provider": self.provider.name,
+            "cache": self.cache.stats(),
+            "rate_limiter": self.limiter.stats(),
+            "retries": self.retry_policy.stats(),
+            "single_flight": self.single_flight.stats(),
+        }
+        if hasattr(self.provider, "stats"):
+            stats["provider_stats"] = self.provider.stats()
+        return stats
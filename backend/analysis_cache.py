@@ -0,0 +1,239 @@
+import ast
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from backend.code_parser import PythonCodeParser
+from backend.prompt_context import DEFAULT_TOKEN_BUDGET, PromptContextBuilder
+
+
+class ModuleAnalysis:
+    """Source text and parsed summary of one module, shared by every stage."""
+
+    def __init__(self, path, filename, code_text, source_hash, mtime_ns=None, size=None, summary=None):
+        self.path = path
+        self.filename = filename
+        self.code_text = code_text
+        self.source_hash = source_hash
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self._contexts = {}
+        self._lock = threading.Lock()
+        if summary is None:
+            parser = PythonCodeParser(code_text, filename)
+            summary = parser.process()
+            self._derive(parser.tree())
+        self.summary = summary
+
+    def _derive(self, tree):
+        """Compute what the chunker and dedup index need from the summary's parse.
+
+        The tree itself is not kept: cached analyses would hold every AST.
+        """
+        from backend.function_dedup import ModuleProfile
+
+        if tree is None:
+            self._contexts["definition_starts"] = None
+            self._contexts["dedup_profile"] = ModuleProfile(self.filename, [], None, None)
+            return
+        self._contexts["definition_starts"] = self.find_definition_starts(self.code_text, tree)
+        self._contexts["dedup_profile"] = ModuleProfile.build(self.code_text, self.filename, tree)
+
+    @staticmethod
+    def find_definition_starts(code_text, tree=None):
+        """``[(first_line, name)]`` of top-level defs/classes (decorators included), or ``None``.
+
+        ``tree`` is the module's AST, if already parsed.
+        """
+        if tree is None:
+            try:
+                tree = ast.parse(code_text)
+            except SyntaxError:
+                return None
+        return [
+            (min([node.lineno] + [d.lineno for d in node.decorator_list]), node.name)
+            for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        ]
+
+    def definition_starts(self):
+        """Memoized :meth:`find_definition_starts` for this module."""
+        with self._lock:
+            if "definition_starts" not in self._contexts:
+                self._contexts["definition_starts"] = self.find_definition_starts(self.code_text)
+            return self._contexts["definition_starts"]
+
+    def dedup_profile(self):
+        """Memoized :class:`backend.function_dedup.ModuleProfile` (structural fingerprints)."""
+        from backend.function_dedup import ModuleProfile
+
+        with self._lock:
+            if "dedup_profile" not in self._contexts:
+                self._contexts["dedup_profile"] = ModuleProfile.build(self.code_text, self.filename)
+            return self._contexts["dedup_profile"]
+
+    def prompt_context(self, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Memoized :meth:`PromptContextBuilder.build` output for this module."""
+        with self._lock:
+            if token_budget not in self._contexts:
+                builder = PromptContextBuilder(self.code_text, self.filename, token_budget, summary=self.summary)
+                self._contexts[token_budget] = builder.build()
+            return self._contexts[token_budget]
+
+    def render_context(self, token_budget=DEFAULT_TOKEN_BUDGET):
+        """Memoized :meth:`PromptContextBuilder.render` output for this module."""
+        key = ("render", token_budget)
+        with self._lock:
+            if key not in self._contexts:
+                builder = PromptContextBuilder(self.code_text, self.filename, token_budget, summary=self.summary)
+                self._contexts[key] = builder.render()
+            return self._contexts[key]
+
+
+class AnalysisCache:
+    """Reads and parses each source file once per run.
+
+    Entries are keyed by absolute path and validated against the file's
+    mtime and size; if those changed but the content hash did not, the
+    existing analysis is kept. Uploaded text is keyed by its content hash.
+    The cache holds at most ``max_entries`` analyses (least recently used
+    are dropped first).
+    """
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._pending = {}  # path -> Future of an analyse_file payload being computed
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hash_text(code_text: str) -> str:
+        return hashlib.sha256(code_text.encode("utf-8")).hexdigest()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, analysis):
+        with self._lock:
+            self._entries[key] = analysis
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, path) -> ModuleAnalysis:
+        """Return the analysis for ``path``, reading and parsing only if it changed."""
+        key = os.path.abspath(path)
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is not None:
+            # Being parsed by prefetch(): wait for that instead of parsing twice.
+            try:
+                pending.result()
+            except Exception:
+                pass
+
+        stat = os.stat(key)
+        entry = self._lookup(key)
+        if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+            self._count(True)
+            return entry
+
+        with open(key, "r", encoding="utf-8") as f:
+            code_text = f.read()
+        source_hash = self.hash_text(code_text)
+        if entry is not None and entry.source_hash == source_hash:
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            self._count(True)
+            return entry
+
+        self._count(False)
+        analysis = ModuleAnalysis(
+            key, os.path.basename(key), code_text, source_hash, stat.st_mtime_ns, stat.st_size
+        )
+        self._store(key, analysis)
+        return analysis
+
+    def _store_payload(self, payload):
+        """Cache a compact :func:`backend.cpu_tasks.analyse_file` result."""
+        from backend.function_dedup import ModuleProfile
+
+        analysis = ModuleAnalysis(
+            payload["path"], payload["filename"], payload["code_text"], payload["source_hash"],
+            payload["mtime_ns"], payload["size"], summary=payload["summary"],
+        )
+        analysis._contexts[payload["token_budget"]] = payload["context"]
+        analysis._contexts["definition_starts"] = payload["definition_starts"]
+        analysis._contexts["dedup_profile"] = ModuleProfile(payload["filename"], *payload["dedup_profile"])
+        self._store(payload["path"], analysis)
+        self._count(False)
+
+    def prefetch(self, paths, executor, window=64):
+        """Parse ``paths`` in ``executor`` (typically a process pool) ahead of use.
+
+        At most ``window`` files are in flight at once; files already cached
+        and unchanged are skipped. Concurrent :meth:`get` calls for a file
+        being prefetched wait for its result instead of parsing again.
+        """
+        from backend.cpu_tasks import analyse_file
+
+        slots = threading.BoundedSemaphore(max(1, window))
+
+        def done(key, future):
+            try:
+                self._store_payload(future.result())
+            except Exception:
+                pass  # get() will read the file itself and surface the error
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+                slots.release()
+
+        for path in paths:
+            key = os.path.abspath(path)
+            entry = self._lookup(key)
+            try:
+                stat = os.stat(key)
+            except OSError:
+                continue
+            if entry is not None and (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            slots.acquire()
+            try:
+                future = executor.submit(analyse_file, key)
+            except RuntimeError:  # executor shut down: the run is over
+                slots.release()
+                return
+            with self._lock:
+                self._pending[key] = future
+            future.add_done_callback(lambda f, key=key: done(key, f))
+
+    def from_text(self, code_text: str, filename: str) -> ModuleAnalysis:
+        """Return the analysis for in-memory source such as an uploaded file."""
+        source_hash = self.hash_text(code_text)
+        key = ("text", filename, source_hash)
+        entry = self._lookup(key)
+        if entry is not None:
+            self._count(True)
+            return entry
+
+        self._count(False)
+        analysis = ModuleAnalysis(None, filename, code_text, source_hash)
+        self._store(key, analysis)
+        return analysis
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
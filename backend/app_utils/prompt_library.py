@@ -1,24 +1,38 @@
-import json
-import os
+import hashlib
 from textwrap import dedent
+from backend.app_utils.prompt_registry import PromptRegistry
 
 PROMPT_STORE = "outputs/prompt_store.json"
 
 class PromptLibrary:
     """Central dynamic prompt loader for GPT interactions."""
 
+    _static_hashes = {}
+
     @staticmethod
     def _load_dynamic_prompt(name: str):
-        """Load updated prompt text from prompt_store.json if present."""
-        if os.path.exists(PROMPT_STORE):
-            try:
-                with open(PROMPT_STORE, "r", encoding="utf-8") as f:
-                    prompts = json.load(f)
-                if name in prompts:
-                    return prompts[name]
-            except Exception:
-                pass
-        return None  # fallback to static version
+        """Return the compiled prompt from prompt_store.json if one is set.
+
+        The store is held in memory by :class:`PromptRegistry` and only
+        re-read when the file changes.
+        """
+        return PromptRegistry.for_file(PROMPT_STORE).get(name)  # None → static version
+
+    @staticmethod
+    def template_hash(name: str) -> str:
+        """Return a short hash identifying the current version of a prompt.
+
+        Dynamic prompts use the registry's version hash; static prompts are
+        hashed by the compiled builder, so editing either changes the hash.
+        """
+        dynamic = PromptLibrary._load_dynamic_prompt(name)
+        if dynamic:
+            return dynamic.version
+        if name not in PromptLibrary._static_hashes:
+            code = getattr(PromptLibrary, name).__code__
+            payload = repr((code.co_code, code.co_consts))
+            PromptLibrary._static_hashes[name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        return PromptLibrary._static_hashes[name]
 
     # ===========================================================
     # 📘 REQUIREMENTS PROMPT
@@ -27,7 +41,10 @@ class PromptLibrary:
     def requirements_prompt(module_doc: str, functions_summary: str, constants: list, filename: str) -> str:
         dynamic = PromptLibrary._load_dynamic_prompt("requirements_prompt")
         if dynamic:
-            return dynamic
+            return dynamic.render(
+                module_doc=module_doc, functions_summary=functions_summary,
+                constants=constants, filename=filename,
+            )
 
         return dedent(f"""
         You are an expert Business Analyst specializing in system documentation.
@@ -51,12 +68,15 @@ class PromptLibrary:
     # 🧩 GHERKIN PROMPT
     # ===========================================================
     @staticmethod
-    def gherkin_prompt(module_doc: str, functions_summary: str, filename: str) -> str:
+    def gherkin_prompt(module_doc: str, functions_summary: str, filename: str, reusable_steps: str = "") -> str:
         dynamic = PromptLibrary._load_dynamic_prompt("gherkin_prompt")
         if dynamic:
-            return dynamic
+            return dynamic.render(
+                module_doc=module_doc, functions_summary=functions_summary,
+                filename=filename, reusable_steps=reusable_steps,
+            )
 
-        return dedent(f"""
+        prompt = dedent(f"""
         You are a BDD Automation Expert skilled in Gherkin syntax.
 
         Using the given Python module info, generate:
@@ -67,24 +87,67 @@ class PromptLibrary:
         Description: {module_doc}
         Functions Summary: {functions_summary}
         """)
+        if reusable_steps:
+            prompt += (
+                "\nThese step definitions already exist in the shared `steps` package of the generated "
+                "Behave suite, which every feature runs with. Use their exact wording in the feature "
+                "wherever they fit, and do NOT define them again; write step definitions only for steps "
+                f"not listed here:\n{reusable_steps}\n"
+            )
+        return prompt
 
     # ===========================================================
     # 🧠 CODE UPDATER PROMPT
     # ===========================================================
     @staticmethod
-    def code_updater_prompt(requirements_text: str, old_code: str, filename: str) -> str:
+    def code_updater_prompt(requirements_text: str, old_code: str, filename: str, code_context: str = "") -> str:
         dynamic = PromptLibrary._load_dynamic_prompt("code_updater_prompt")
         if dynamic:
-            return dynamic
+            return dynamic.render(
+                requirements_text=requirements_text, old_code=old_code,
+                filename=filename, code_context=code_context,
+            )
 
+        # The source is appended after dedent() so its own indentation survives.
         return dedent(f"""
         You are a Senior Python Engineer.
 
         Update `{filename}` based on these requirements:
         {requirements_text}
 
+        Current module structure:
+        {code_context}
+
+        Reply with the complete updated code of `{filename}`.
         Maintain existing functionality and follow PEP8 standards.
-        """)
+        """) + f"\nCurrent code:\n```python\n{old_code}\n```\n"
+
+    @staticmethod
+    def code_patch_prompt(requirements_text: str, old_code: str, filename: str, code_context: str = "") -> str:
+        dynamic = PromptLibrary._load_dynamic_prompt("code_patch_prompt")
+        if dynamic:
+            return dynamic.render(
+                requirements_text=requirements_text, old_code=old_code,
+                filename=filename, code_context=code_context,
+            )
+
+        # The source is appended after dedent() so its own indentation survives.
+        return dedent(f"""
+        You are a Senior Python Engineer.
+
+        Update `{filename}` based on these requirements:
+        {requirements_text}
+
+        Current module structure:
+        {code_context}
+
+        Reply with ONLY a unified diff of `{filename}` inside a ```diff block:
+        - one `@@ -start,count +start,count @@` header per hunk, 3 lines of unchanged context around each change
+        - context and removed lines copied exactly from the current code below
+        - no other commentary; reply `NO CHANGES` if nothing needs to change
+
+        Maintain existing functionality and follow PEP8 standards.
+        """) + f"\nCurrent code:\n```python\n{old_code}\n```\n"
 
     # ===========================================================
     # 📖 STORY PROMPT
@@ -93,7 +156,7 @@ class PromptLibrary:
     def story_prompt(module_doc: str, functions_summary: str, filename: str) -> str:
         dynamic = PromptLibrary._load_dynamic_prompt("story_prompt")
         if dynamic:
-            return dynamic
+            return dynamic.render(module_doc=module_doc, functions_summary=functions_summary, filename=filename)
 
         return dedent(f"""
         You are a Product Owner generating JIRA-style stories for `{filename}`.
@@ -113,7 +176,7 @@ class PromptLibrary:
     def test_prompt(functions_summary: str, filename: str) -> str:
         dynamic = PromptLibrary._load_dynamic_prompt("test_prompt")
         if dynamic:
-            return dynamic
+            return dynamic.render(functions_summary=functions_summary, filename=filename)
 
         return dedent(f"""
         You are a QA Automation Engineer.
@@ -32,8 +32,10 @@ class PromptManager:
         }
         self.save_prompts()
 
-    def save_prompts(self):
+    def save_prompts(self, prompts=None):
         """Save prompts to file."""
+        if prompts is not None:
+            self.prompts = dict(prompts)
         with open(self.prompt_file, "w", encoding="utf-8") as f:
             json.dump(self.prompts, f, indent=4)
         print(f"💾 Prompts saved to {self.prompt_file}")
@@ -0,0 +1,129 @@
+import hashlib
+import json
+import os
+import string
+import threading
+import time
+
+
+class _KeepMissing(dict):
+    """Leave unknown ``{placeholders}`` untouched when rendering."""
+
+    def __missing__(self, key):
+        return "{" + key + "}"
+
+
+class CompiledPrompt:
+    """A prompt template parsed once, with a stable version hash."""
+
+    def __init__(self, name: str, text: str):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        try:
+            self.fields = {
+                field.split(".")[0].split("[")[0]
+                for _, field, _, _ in string.Formatter().parse(text)
+                if field
+            }
+            self.formattable = True
+        except ValueError:
+            # Stray braces (e.g. JSON examples): render the text verbatim.
+            self.fields = set()
+            self.formattable = False
+
+    def render(self, **values) -> str:
+        if not self.formattable or not self.fields:
+            return self.text
+        try:
+            return self.text.format_map(_KeepMissing(values))
+        except (IndexError, KeyError, ValueError, AttributeError):
+            return self.text
+
+
+class PromptRegistry:
+    """Process-wide, in-memory view of a JSON prompt store.
+
+    The store is parsed once and kept as compiled templates. It is only
+    re-read when the file's mtime, inode or size changes (checked at most
+    every ``check_interval`` seconds) or when :meth:`reload` is called.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str, check_interval=0.5):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._loaded = False
+        self._checked_at = 0.0
+        self._raw = {}
+        self._compiled = {}
+
+    @classmethod
+    def for_file(cls, path: str):
+        """Return the shared registry for ``path``."""
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(path)
+            return cls._instances[key]
+
+    @classmethod
+    def reload_all(cls):
+        with cls._instances_lock:
+            registries = list(cls._instances.values())
+        for registry in registries:
+            registry.reload()
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    def _load(self, signature):
+        raw = {}
+        if signature is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    raw = {k: v for k, v in data.items() if isinstance(v, str)}
+            except Exception:
+                raw = {}
+        self._raw = raw
+        self._compiled = {name: CompiledPrompt(name, text) for name, text in raw.items() if text}
+        self._signature = signature
+        self._loaded = True
+
+    def _refresh(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and self._loaded and now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            signature = self._stat_signature()
+            if force or not self._loaded or signature != self._signature:
+                self._load(signature)
+
+    def reload(self):
+        """Drop the in-memory copy and re-read the store now."""
+        self._refresh(force=True)
+
+    def get(self, name: str):
+        """Return the :class:`CompiledPrompt` for ``name`` or ``None`` if unset/empty."""
+        self._refresh()
+        return self._compiled.get(name)
+
+    def version(self, name: str):
+        prompt = self.get(name)
+        return prompt.version if prompt else None
+
+    def all(self):
+        """Raw ``{name: text}`` mapping, including empty entries."""
+        self._refresh()
+        return dict(self._raw)
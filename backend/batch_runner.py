@@ -0,0 +1,283 @@
+"""Offline Batch API mode for :class:`OrchestratorMulti`.
+
+All prompts for a stage are written to one JSONL batch job, submitted,
+polled until complete and fanned back into ``generated_outputs``. Stage
+dependencies are handled as successive waves: requirements first, then
+Gherkin and code updates (which need the requirements) in a second wave.
+"""
+
+import argparse
+import json
+import time
+from backend.ai_client import AIClient, DEFAULT_MODEL
+from backend.chunker import ChunkedGenerator
+from backend.file_loader import FileLoader
+from backend.source_discovery import DEFAULT_EXCLUDE, DEFAULT_INCLUDE
+
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _response_text(body):
+    """Extract the text from a Responses or Chat Completions result body."""
+    for item in body.get("output", []) or []:
+        for content in item.get("content", []) or []:
+            if content.get("text"):
+                return content["text"].strip()
+    for choice in body.get("choices", []) or []:
+        message = choice.get("message") or {}
+        if message.get("content"):
+            return message["content"].strip()
+    return ""
+
+
+class BatchRunner:
+    """Runs an orchestrator's stages through the Batch API in waves."""
+
+    def __init__(self, orchestrator, client=None, model=DEFAULT_MODEL, poll_interval=30.0,
+                 completion_window="24h", timeout=None):
+        self.orchestrator = orchestrator
+        self.ai = AIClient.shared()
+        self.client = client if client is not None else self.ai.client
+        self.model = model
+        self.poll_interval = poll_interval
+        self.completion_window = completion_window
+        self.timeout = timeout
+        self.batch_dir = orchestrator.output_dir / "batches"
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        self.stats = {"submitted": 0, "cached": 0, "failed": 0, "batches": []}
+
+    # ----------------------------------------------------------------
+    # Batch API plumbing
+    # ----------------------------------------------------------------
+    def _write_jsonl(self, name, prompts):
+        path = self.batch_dir / f"{name}.jsonl"
+        with open(path, "w", encoding="utf-8") as f:
+            for custom_id, prompt in prompts.items():
+                f.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/responses",
+                    "body": {"model": self.model, "input": prompt},
+                }) + "\n")
+        return path
+
+    def submit(self, name, prompts):
+        """Upload ``{custom_id: prompt}`` as a batch job and return the batch id."""
+        path = self._write_jsonl(name, prompts)
+        with open(path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/responses",
+            completion_window=self.completion_window,
+        )
+        self.stats["batches"].append(batch.id)
+        return batch.id
+
+    def wait(self, batch_id):
+        """Poll until the batch reaches a terminal status."""
+        started = time.monotonic()
+        while True:
+            batch = self.client.batches.retrieve(batch_id)
+            if batch.status in TERMINAL_STATUSES:
+                return batch
+            if self.timeout is not None and time.monotonic() - started > self.timeout:
+                raise TimeoutError(f"❌ Batch {batch_id} still {batch.status} after {self.timeout}s")
+            time.sleep(self.poll_interval)
+
+    def fetch(self, batch):
+        """Return ``{custom_id: text}`` for every successful request."""
+        if not batch.output_file_id:
+            return {}
+        content = self.client.files.content(batch.output_file_id).text
+        results = {}
+        for line in content.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code", 200) >= 400:
+                continue
+            results[record["custom_id"]] = _response_text(response.get("body") or {})
+        return results
+
+    def run_wave(self, name, prompts):
+        """Resolve ``{custom_id: prompt}`` from the response cache or one batch job."""
+        results, pending = {}, {}
+        for custom_id, prompt in prompts.items():
+            cached = self.ai.cache.get(self.model, prompt, self.ai.provider.name)
+            if cached is not None:
+                results[custom_id] = cached
+            else:
+                pending[custom_id] = prompt
+        self.stats["cached"] += len(results)
+
+        if pending:
+            batch = self.wait(self.submit(name, pending))
+            answers = self.fetch(batch)
+            self.stats["submitted"] += len(pending)
+            self.stats["failed"] += len(pending) - len(answers)
+            for custom_id, text in answers.items():
+                self.ai.cache.set(self.model, pending[custom_id], text, self.ai.provider.name)
+            results.update(answers)
+        return results
+
+    # ----------------------------------------------------------------
+    # Orchestration
+    # ----------------------------------------------------------------
+    @staticmethod
+    def _prompts(generator):
+        if isinstance(generator, ChunkedGenerator):
+            return [generator.make_generator(chunk).build_prompt() for chunk in generator.chunks]
+        return [generator.build_prompt()]
+
+    @staticmethod
+    def _reduce(generator, outputs):
+        if isinstance(generator, ChunkedGenerator):
+            return generator.reduce(generator.chunks, outputs)
+        return outputs[0]
+
+    def _collect(self, jobs, results):
+        """Turn wave results back into stage outputs; missing answers fail the job."""
+        outputs = {}
+        for job_id, (generator, ids) in jobs.items():
+            if all(custom_id in results for custom_id in ids):
+                outputs[job_id] = self._reduce(generator, [results[i] for i in ids])
+        return outputs
+
+    def _stage_jobs(self, stage, files, make_generator):
+        jobs, prompts = {}, {}
+        for index, state in files.items():
+            path = state["paths"][stage]
+            if self.orchestrator._reuse_stage(state["key"], stage, state["fingerprints"][stage], path) is not None:
+                state["skipped"] += 1
+                continue
+            generator = make_generator(state)
+            ids = []
+            for part, prompt in enumerate(self._prompts(generator)):
+                custom_id = f"{index}:{stage}:{part}"
+                prompts[custom_id] = prompt
+                ids.append(custom_id)
+            jobs[(index, stage)] = (generator, ids)
+        return jobs, prompts
+
+    def _store(self, files, stage, outputs):
+        orch = self.orchestrator
+        for (index, _), output in outputs.items():
+            state = files[index]
+            orch._store_stage(state["key"], stage, state["fingerprints"][stage], state["paths"][stage], output)
+
+    def run(self):
+        """Process every file of the orchestrator in batch waves."""
+        orch = self.orchestrator
+        orch._start_run()
+        files, errors = {}, []
+        for index, file_path in orch._sources():
+            try:
+                analysis = orch.analysis_cache.get(file_path)
+                file_key = orch._file_key(file_path)
+                req_path, gherkin_path, updated_path = orch._paths(file_key)
+                files[index] = {
+                    "index": index,
+                    "name": file_key,
+                    "key": file_key,
+                    "analysis": analysis,
+                    "chunks": orch._chunks(analysis),
+                    # One wave cannot fall back from a failed patch, so batches regenerate code in full.
+                    "fingerprints": orch._stage_fingerprints(analysis.source_hash, code_update_mode="full"),
+                    "paths": {"requirements": req_path, "gherkin": gherkin_path, "updated_code": updated_path},
+                    "skipped": 0,
+                }
+            except Exception as e:
+                errors.append(f"❌ Error processing {orch._file_key(file_path)}: {e}")
+
+        # 🌊 Wave 1: requirements
+        jobs, prompts = self._stage_jobs(
+            "requirements", files,
+            lambda s: orch._requirements_generator(s["analysis"], s["chunks"]),
+        )
+        outputs = self._collect(jobs, self.run_wave("wave1_requirements", prompts))
+        self._store(files, "requirements", outputs)
+
+        requirements = {}
+        for index, state in files.items():
+            path = state["paths"]["requirements"]
+            if (index, "requirements") in outputs:
+                requirements[index] = outputs[(index, "requirements")]
+            elif (index, "requirements") not in jobs and path.exists():
+                requirements[index] = FileLoader.load_file(str(path))
+            else:
+                errors.append(f"❌ Error processing {state['name']}: requirements missing from batch output")
+        ready = {index: files[index] for index in requirements}
+
+        # 🌊 Wave 2: Gherkin + updated code, both depending on the requirements
+        gherkin_jobs, gherkin_prompts = self._stage_jobs(
+            "gherkin", ready,
+            lambda s: orch._gherkin_generator(
+                s["analysis"], s["chunks"], requirements[s["index"]], s["paths"]["gherkin"]
+            ),
+        )
+        update_jobs, update_prompts = self._stage_jobs(
+            "updated_code", ready,
+            lambda s: orch._code_updater(s["analysis"], s["chunks"], requirements[s["index"]], mode="full"),
+        )
+        results = self.run_wave("wave2_gherkin_code", {**gherkin_prompts, **update_prompts})
+        gherkin_outputs = self._collect(gherkin_jobs, results)
+        update_outputs = self._collect(update_jobs, results)
+        self._store(files, "gherkin", gherkin_outputs)
+        for (index, _), output in gherkin_outputs.items():
+            orch._index_steps(files[index]["paths"]["gherkin"], output)
+        self._store(files, "updated_code", update_outputs)
+        orch.manifest.save()
+        orch._finish_run()
+
+        summaries = []
+        for index, state in sorted(ready.items()):
+            missing = [
+                stage for stage, stage_jobs, stage_outputs in (
+                    ("gherkin", gherkin_jobs, gherkin_outputs),
+                    ("updated_code", update_jobs, update_outputs),
+                )
+                if (index, stage) in stage_jobs and (index, stage) not in stage_outputs
+            ]
+            if missing:
+                errors.append(f"❌ Error processing {state['name']}: no batch output for {', '.join(missing)}")
+                continue
+            paths = state["paths"]
+            summaries.append(orch._summary(
+                state["name"], paths["requirements"], paths["gherkin"], paths["updated_code"],
+                state["skipped"], state["chunks"],
+            ))
+
+        summaries.extend(errors)
+        summaries.append(
+            f"📦 Batch mode: {self.stats['submitted']} requests in {len(self.stats['batches'])} batches, "
+            f"{self.stats['cached']} served from cache, {self.stats['failed']} failed."
+        )
+        return "\n\n".join(summaries)
+
+
+def main():
+    from backend.orchestrator_multi import OrchestratorMulti
+
+    parser = argparse.ArgumentParser(description="Run the QA pipeline through the OpenAI Batch API.")
+    parser.add_argument("--input", default="input", help="Directory scanned recursively for sources.")
+    parser.add_argument("--include", nargs="+", default=list(DEFAULT_INCLUDE),
+                        help="Gitignore-style patterns of files to process.")
+    parser.add_argument("--exclude", nargs="+", default=[],
+                        help="Extra patterns to skip, on top of .gitignore and the usual VCS/cache folders.")
+    parser.add_argument("--no-gitignore", action="store_true", help="Do not apply .gitignore files.")
+    parser.add_argument("--poll-interval", type=float, default=30.0)
+    parser.add_argument("--full", action="store_true", help="Regenerate even unchanged stages.")
+    args = parser.parse_args()
+
+    sources = FileLoader.discover(
+        args.input, include=args.include, exclude=list(DEFAULT_EXCLUDE) + args.exclude,
+        gitignore=not args.no_gitignore,
+    )
+    orchestrator = OrchestratorMulti(sources, incremental=not args.full)
+    print(orchestrator.process_batch(poll_interval=args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Local stand-in for the OpenAI Files/Batches endpoints.
+
+Lets the batch mode of the orchestrator run end-to-end without network
+access or credentials::
+
+    python -m backend.batch_stub_server --port 8089
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub \\
+        python -m backend.batch_runner --input input
+
+Batches complete ``--delay`` seconds after submission; each request is
+answered with a deterministic echo of its prompt.
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBatchState:
+    """In-memory files and batches shared by all request handlers."""
+
+    def __init__(self, delay=1.0):
+        self.delay = delay
+        self.files = {}
+        self.batches = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def new_id(self, prefix):
+        with self._lock:
+            return f"{prefix}-{next(self._ids)}"
+
+    def add_file(self, content: bytes, filename: str, purpose: str):
+        file_id = self.new_id("file")
+        with self._lock:
+            self.files[file_id] = {
+                "meta": {
+                    "id": file_id, "object": "file", "bytes": len(content),
+                    "created_at": int(time.time()), "filename": filename,
+                    "purpose": purpose, "status": "processed",
+                },
+                "content": content,
+            }
+        return self.files[file_id]["meta"]
+
+    @staticmethod
+    def answer(body):
+        """Deterministic stand-in response for one batch request body."""
+        prompt = body.get("input")
+        if prompt is None:
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        text = f"[stub:{body.get('model', 'model')}] {str(prompt).strip()[:200]}"
+        return {
+            "object": "response",
+            "model": body.get("model"),
+            "output": [{"type": "message", "role": "assistant",
+                        "content": [{"type": "output_text", "text": text}]}],
+            "usage": {"input_tokens": len(str(prompt)) // 4, "output_tokens": len(text) // 4,
+                      "total_tokens": (len(str(prompt)) + len(text)) // 4},
+        }
+
+    def create_batch(self, input_file_id, endpoint, completion_window):
+        batch_id = self.new_id("batch")
+        batch = {
+            "id": batch_id, "object": "batch", "endpoint": endpoint,
+            "input_file_id": input_file_id, "completion_window": completion_window,
+            "status": "in_progress", "created_at": int(time.time()),
+            "output_file_id": None, "error_file_id": None,
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        with self._lock:
+            self.batches[batch_id] = {"batch": batch, "ready_at": time.time() + self.delay}
+        return batch
+
+    def get_batch(self, batch_id):
+        with self._lock:
+            entry = self.batches.get(batch_id)
+        if entry is None:
+            return None
+        batch = entry["batch"]
+        if batch["status"] == "in_progress" and time.time() >= entry["ready_at"]:
+            self._complete(batch)
+        return batch
+
+    def _complete(self, batch):
+        source = self.files[batch["input_file_id"]]["content"].decode("utf-8")
+        lines = []
+        for raw in source.splitlines():
+            if not raw.strip():
+                continue
+            request = json.loads(raw)
+            lines.append(json.dumps({
+                "id": self.new_id("req"),
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": self.answer(request.get("body", {}))},
+                "error": None,
+            }))
+        output = self.add_file(("\n".join(lines) + "\n").encode("utf-8"), "output.jsonl", "batch_output")
+        batch.update({
+            "status": "completed", "completed_at": int(time.time()),
+            "output_file_id": output["id"],
+            "request_counts": {"total": len(lines), "completed": len(lines), "failed": 0},
+        })
+
+
+class StubBatchHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):  # keep test output quiet
+        pass
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _not_found(self):
+        self._send_json({"error": {"message": f"Unknown route {self.path}"}}, status=404)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length)
+
+    def do_POST(self):
+        path = self.path.split("?")[0].rstrip("/")
+        if path.endswith("/files"):
+            header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8")
+            message = BytesParser(policy=HTTP).parsebytes(header + self._body())
+            fields = {}
+            for part in message.iter_parts():
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = (part.get_filename(), part.get_payload(decode=True))
+            filename, content = fields.get("file", ("batch.jsonl", b""))
+            purpose = (fields.get("purpose", (None, b"batch"))[1] or b"batch").decode("utf-8")
+            self._send_json(self.state.add_file(content, filename or "batch.jsonl", purpose))
+        elif path.endswith("/batches"):
+            payload = json.loads(self._body() or b"{}")
+            self._send_json(self.state.create_batch(
+                payload["input_file_id"], payload["endpoint"], payload.get("completion_window", "24h")
+            ))
+        else:
+            self._not_found()
+
+    def do_GET(self):
+        parts = self.path.split("?")[0].strip("/").split("/")
+        if len(parts) >= 2 and parts[-2] == "batches":
+            batch = self.state.get_batch(parts[-1])
+            if batch is None:
+                return self._not_found()
+            self._send_json(batch)
+        elif len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+            entry = self.state.files.get(parts[-2])
+            if entry is None:
+                return self._not_found()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(entry["content"])))
+            self.end_headers()
+            self.wfile.write(entry["content"])
+        elif len(parts) >= 2 and parts[-2] == "files":
+            entry = self.state.files.get(parts[-1])
+            if entry is None:
+                return self._not_found()
+            self._send_json(entry["meta"])
+        else:
+            self._not_found()
+
+
+def start_server(host="127.0.0.1", port=0, delay=1.0):
+    """Start the stub in a daemon thread and return ``(server, base_url)``."""
+    handler = type("BoundStubBatchHandler", (StubBatchHandler,), {"state": StubBatchState(delay)})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI Batch API stub server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--delay", type=float, default=1.0, help="Seconds before a batch completes.")
+    args = parser.parse_args()
+
+    handler = type("BoundStubBatchHandler", (StubBatchHandler,), {"state": StubBatchState(args.delay)})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"🧪 Stub batch server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Turn generated Gherkin replies into a runnable Behave suite.
+
+A Gherkin stage output is a model reply: the feature in a ```gherkin block
+and the step definitions in a ```python block. :class:`BehaveSuite` writes
+every feature to ``<suite>/<relative path>.feature`` and all step
+definitions into one shared ``<suite>/steps`` package, so a feature may use
+steps another module's reply defined (see :class:`StepIndex`). A step that
+an earlier file already defines is not written again; Behave would reject
+the suite as ambiguous.
+"""
+
+import ast
+import os
+from pathlib import Path, PurePosixPath
+from backend.source_discovery import SourceScanner
+from backend.step_index import normalize, parse_steps, split_reply
+
+STEP_IMPORT = "from behave import given, when, then, step  # noqa: F401"
+
+_STEP_DECORATORS = {"given", "when", "then", "step"}
+
+
+def _is_step_decorator(node):
+    target = node.func if isinstance(node, ast.Call) else node
+    name = target.attr if isinstance(target, ast.Attribute) else getattr(target, "id", "")
+    return name.lower() in _STEP_DECORATORS
+
+
+def dedupe_steps(code, seen):
+    """``code`` without step decorators whose pattern is already in ``seen`` (updated in place).
+
+    Functions left without a step decorator are dropped; other statements
+    (imports, helpers) are kept. Returns ``None`` if ``code`` does not parse.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    lines = code.splitlines()
+    drop = set()
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        decorators = [d for d in node.decorator_list if _is_step_decorator(d)]
+        if not decorators:
+            continue
+        kept = 0
+        for decorator in decorators:
+            source = "\n".join(lines[decorator.lineno - 1:decorator.end_lineno]).strip()
+            keys = {(keyword, normalize(pattern)) for keyword, pattern in parse_steps(source)}
+            if keys and keys <= seen:
+                drop.update(range(decorator.lineno - 1, decorator.end_lineno))
+            else:
+                seen.update(keys)
+                kept += 1
+        if not kept:
+            start = min(d.lineno for d in node.decorator_list)
+            drop.update(range(start - 1, node.end_lineno))
+    return "\n".join(line for index, line in enumerate(lines) if index not in drop).strip() + "\n"
+
+
+class BehaveSuite:
+    """Exports every Gherkin reply below ``gherkin_dir`` into ``suite_dir``.
+
+    Replies are read in path order, so which file owns a shared step is
+    stable between runs. Files of sources that no longer exist are removed.
+    """
+
+    def __init__(self, gherkin_dir, suite_dir, writer=None):
+        self.gherkin_dir = Path(gherkin_dir)
+        self.suite_dir = Path(suite_dir)
+        self.writer = writer
+        self.warnings = {}
+
+    def _write(self, path, text):
+        if self.writer is not None:
+            self.writer.write(path, text)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding="utf-8")
+
+    def export(self):
+        """Write the suite and return the paths of its ``.feature`` files."""
+        if not self.gherkin_dir.is_dir():
+            return []
+        seen, written, features = set(), set(), []
+        steps_dir = self.suite_dir / "steps"
+        for source in sorted(SourceScanner(str(self.gherkin_dir), include=("*.feature",))):
+            relative = PurePosixPath(Path(source).relative_to(self.gherkin_dir).as_posix())
+            with open(source, "r", encoding="utf-8") as f:
+                feature, blocks = split_reply(f.read())
+            if not feature:
+                self.warnings.setdefault(str(relative), []).append("reply has no feature")
+                continue
+
+            feature_path = self.suite_dir / relative
+            self._write(feature_path, feature + "\n")
+            written.add(feature_path)
+            features.append(str(feature_path))
+
+            steps = []
+            for block in blocks:
+                code = dedupe_steps(block, seen)
+                if code is None:
+                    self.warnings.setdefault(str(relative), []).append("step definitions do not parse")
+                elif code.strip():
+                    steps.append(code)
+            if steps:
+                name = str(relative.with_suffix("")).replace("/", "__")
+                steps_path = steps_dir / f"{name}_steps.py"
+                self._write(steps_path, "\n\n".join([STEP_IMPORT] + steps))
+                written.add(steps_path)
+
+        if self.suite_dir.is_dir():
+            for path in SourceScanner(str(self.suite_dir), include=("*.feature", "*.py")):
+                if Path(path) not in written:
+                    os.remove(path)
+        return features
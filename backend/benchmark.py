@@ -0,0 +1,323 @@
+"""Benchmark harness for the end-to-end generation pipeline.
+
+Synthetic module corpora of increasing size are generated on disk and run
+through :class:`OrchestratorMulti`, every generator, ``PythonCodeParser``,
+``PromptLibrary`` and ``FileSaver`` against the simulated-latency stub
+provider, so numbers are reproducible and need no network access::
+
+    python -m backend.benchmark --files 10 100 --lines 50 1000 --latency-ms 200 \\
+        --output benchmark.json
+
+The report is JSON: files/sec, p50/p95/p99 per stage and component, peak
+RSS and prompt tokens per file for every ``(files, lines)`` scenario.
+"""
+
+import argparse
+import ast
+import json
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from backend.ai_client import AIClient
+from backend.analysis_cache import AnalysisCache
+from backend.batch_runner import BatchRunner
+from backend.code_parser import PythonCodeParser
+from backend.code_updater import CodeUpdater
+from backend.file_saver import FileSaver
+from backend.gherkin_generator import GherkinGenerator
+from backend.instrumentation import percentiles
+from backend.model_providers import LocalStubProvider
+from backend.orchestrator_multi import OrchestratorMulti, DEFAULT_MAX_WORKERS
+from backend.rate_limiter import RateLimiter
+from backend.requirements_generator import RequirementsGenerator
+from backend.response_cache import ResponseCache
+from backend.retry_policy import RetryPolicy
+from backend.story_generator import StoryGenerator
+from backend.test_generator import TestGenerator
+from backend.app_utils.prompt_library import PromptLibrary
+
+DEFAULT_FILE_COUNTS = (10, 100, 1000, 10000)
+DEFAULT_LINE_COUNTS = (20, 200, 1000, 5000)
+DEFAULT_MAX_TOTAL_LINES = 2_000_000
+DEFAULT_SAMPLE = 50
+
+
+# ===== 🧪 Synthetic corpus =====
+def synthetic_module(index: int, lines: int) -> str:
+    """Deterministic Python module of roughly ``lines`` lines.
+
+    Blocks are only ever added whole, so the module always parses and may
+    run a few lines past ``lines``.
+    """
+    out = [
+        f'"""Synthetic module {index} used for pipeline benchmarks."""',
+        "",
+        "import math",
+        "from dataclasses import dataclass",
+        "",
+        f"MAX_ITEMS_{index} = {100 + index % 50}",
+        f'SERVICE_NAME = "service_{index}"',
+        "",
+    ]
+    block = 0
+    while len(out) < lines:
+        if block % 3 == 2:
+            out += [
+                "",
+                "@dataclass",
+                f"class Record{block}:",
+                f'    """Value object number {block}."""',
+                "",
+                "    key: str",
+                "    amount: float = 0.0",
+                "",
+                "    def scaled(self, factor: float = 1.0) -> float:",
+                '        """Return the amount multiplied by ``factor``."""',
+                "        return self.amount * factor",
+                "",
+                "    def describe(self) -> str:",
+                f'        return f"{{self.key}}: {{self.amount:.2f}} ({block})"',
+                "",
+            ]
+        else:
+            out += [
+                "",
+                f"def compute_{block}(values: list, limit: int = {block % 7 + 1}) -> float:",
+                f'    """Aggregate ``values`` for step {block}, capped at ``limit`` items."""',
+                "    total = 0.0",
+                "    for value in values[:limit]:",
+                "        if value < 0:",
+                "            raise ValueError('negative value')",
+                "        total += math.sqrt(value)",
+                "    return total",
+                "",
+            ]
+        block += 1
+    text = "\n".join(out) + "\n"
+    try:
+        ast.parse(text)
+    except SyntaxError as e:
+        raise RuntimeError(f"❌ Synthetic module {index} does not parse (line {e.lineno}: {e.msg})") from e
+    return text
+
+
+def write_corpus(directory, files: int, lines: int):
+    """Write ``files`` synthetic modules into ``directory`` and return their paths."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(files):
+        path = directory / f"module_{index:05d}.py"
+        path.write_text(synthetic_module(index, lines), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+
+# ===== 📏 Measurements =====
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def stub_client(latency_ms, jitter_ms=0.0, failure_rate=0.0, seed=0):
+    """Stub-backed client without cache or throttling, so every call pays the latency."""
+    limiter = RateLimiter()
+    return AIClient(
+        cache=ResponseCache(enabled=False),
+        limiter=limiter,
+        retry_policy=RetryPolicy(max_retries=5, base_delay=0.01, max_delay=0.1, limiter=limiter),
+        provider=LocalStubProvider(
+            latency=latency_ms / 1000.0, jitter=jitter_ms / 1000.0,
+            failure_rate=failure_rate, seed=seed,
+        ),
+    )
+
+
+def _time_each(items, fn):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    return percentiles(samples)
+
+
+def _requirements_prompt(analysis):
+    context = analysis.prompt_context()
+    return PromptLibrary.requirements_prompt(
+        context["module_doc"], context["functions_summary"], context["constants"], analysis.filename
+    )
+
+
+def bench_components(paths, output_dir, sample=DEFAULT_SAMPLE):
+    """Per-call latency of the building blocks on up to ``sample`` files."""
+    cache = AnalysisCache()
+    analyses = [cache.get(path) for path in paths[:sample]]
+    requirements = "## Requirements\n- The module aggregates values."
+    saver = FileSaver(str(output_dir))
+
+    return {
+        "parser": _time_each(analyses, lambda a: PythonCodeParser(a.code_text, a.filename).process()),
+        "prompt_library": _time_each(analyses, _requirements_prompt),
+        "requirements_generator": _time_each(
+            analyses, lambda a: RequirementsGenerator(a.code_text, a.filename, analysis=a).process()
+        ),
+        "gherkin_generator": _time_each(
+            analyses, lambda a: GherkinGenerator(a.code_text, requirements, a.filename, analysis=a).process()
+        ),
+        "code_updater": _time_each(
+            analyses, lambda a: CodeUpdater(requirements, a.code_text, a.filename, analysis=a).process()
+        ),
+        "test_generator": _time_each(
+            analyses, lambda a: TestGenerator("", a.filename, analysis=a).process()
+        ),
+        "story_generator": _time_each(
+            analyses, lambda a: StoryGenerator(a.code_text, a.filename, analysis=a).process()
+        ),
+        "file_saver": _time_each(
+            analyses, lambda a: saver.save_all(a.filename, requirements, "Feature: Benchmark")
+        ),
+    }
+
+
+def check_code_prompts(orchestrator, analyses, requirements):
+    """Fail fast unless every code-update prompt contains the code it updates.
+
+    Checks the batch-mode prompts (full regeneration, one per chunk for
+    large modules) and the full-file prompt a failed diff patch falls back to.
+    """
+    for analysis in analyses:
+        chunks = orchestrator._chunks(analysis)
+        generator = orchestrator._code_updater(analysis, chunks, requirements, mode="full")
+        updaters = [generator.make_generator(chunk) for chunk in chunks] if chunks else [generator]
+        for updater, prompt in zip(updaters, BatchRunner._prompts(generator)):
+            fallback = CodeUpdater(updater.requirements_text, updater.old_code, updater.filename,
+                                   analysis=updater.analysis, mode="diff")
+            if fallback.apply_patch("```diff\n@@ -1,1 +1,1 @@\n-# line not in the module\n+pass\n```") is not None:
+                raise RuntimeError(f"❌ {analysis.filename}: a mismatched patch was applied")
+            for kind, text in (("batch", prompt), ("fallback", fallback.build_prompt())):
+                if updater.old_code.strip() not in text:
+                    raise RuntimeError(f"❌ {analysis.filename}: {kind} code-update prompt lacks the source")
+
+
+# ===== 🏁 Scenarios =====
+def run_scenario(files, lines, workdir, max_workers=DEFAULT_MAX_WORKERS, sample=DEFAULT_SAMPLE):
+    """Benchmark one corpus of ``files`` modules with ``lines`` lines each."""
+    workdir = Path(workdir)
+    paths = write_corpus(workdir / "corpus", files, lines)
+
+    # The synthetic modules share one template, so dedup would skip most model stages.
+    orchestrator = OrchestratorMulti(
+        paths, max_workers=max_workers, incremental=False, output_dir=str(workdir / "outputs"), dedup=False,
+    )
+    check_code_prompts(
+        orchestrator, [orchestrator.analysis_cache.get(path) for path in paths[:sample]],
+        "## Requirements\n- The module aggregates values.",
+    )
+    started = time.perf_counter()
+    results = [summary for _, _, summary in orchestrator.iter_results()]
+    elapsed = time.perf_counter() - started
+    errors = sum(1 for summary in results if summary.lstrip().startswith("❌"))
+
+    stage_times, tokens_by_file = {}, {}
+    for span in orchestrator.spans.spans():
+        stage_times.setdefault(span.stage, []).append(span.wall_seconds)
+        tokens_by_file[span.file] = tokens_by_file.get(span.file, 0) + span.prompt_tokens
+    tokens = list(tokens_by_file.values())
+    return {
+        "files": files,
+        "lines_per_file": lines,
+        "max_workers": orchestrator.max_workers,
+        "wall_seconds": round(elapsed, 3),
+        "files_per_second": round(files / elapsed, 3) if elapsed else None,
+        "errors": errors,
+        "stages": {stage: percentiles(samples) for stage, samples in stage_times.items()},
+        "stage_table": orchestrator.stage_table(),
+        "artifacts": dict(orchestrator.writer.stats),
+        "dedup": orchestrator.dedup.stats(),
+        "prompt_tokens_per_file": {
+            "mean": round(sum(tokens) / len(tokens), 1) if tokens else 0,
+            "max": max(tokens, default=0),
+        },
+        "components": bench_components(paths, workdir / "component_outputs", sample),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_benchmarks(file_counts=DEFAULT_FILE_COUNTS, line_counts=DEFAULT_LINE_COUNTS,
+                   latency_ms=50.0, jitter_ms=0.0, failure_rate=0.0, seed=0,
+                   max_workers=DEFAULT_MAX_WORKERS, max_total_lines=DEFAULT_MAX_TOTAL_LINES,
+                   sample=DEFAULT_SAMPLE):
+    """Run the full ``file_counts × line_counts`` matrix and return the report dict.
+
+    Scenarios whose corpus would exceed ``max_total_lines`` are listed as
+    skipped. Peak RSS is process-wide, so it only grows across scenarios.
+    """
+    AIClient.set_shared(stub_client(latency_ms, jitter_ms, failure_rate, seed))
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "provider": "stub",
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "failure_rate": failure_rate,
+            "seed": seed,
+            "max_workers": max_workers,
+        },
+        "scenarios": [],
+        "skipped": [],
+    }
+
+    for files in file_counts:
+        for lines in line_counts:
+            if files * lines > max_total_lines:
+                report["skipped"].append({"files": files, "lines_per_file": lines})
+                continue
+            with tempfile.TemporaryDirectory(prefix="qa-bench-") as workdir:
+                report["scenarios"].append(
+                    run_scenario(files, lines, workdir, max_workers=max_workers, sample=sample)
+                )
+
+    report["client"] = AIClient.shared().stats()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the QA generation pipeline offline.")
+    parser.add_argument("--files", type=int, nargs="+", default=list(DEFAULT_FILE_COUNTS))
+    parser.add_argument("--lines", type=int, nargs="+", default=list(DEFAULT_LINE_COUNTS))
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Simulated model latency per call.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of calls failing with 429/503.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS)
+    parser.add_argument("--max-total-lines", type=int, default=DEFAULT_MAX_TOTAL_LINES,
+                        help="Skip scenarios whose corpus is larger than this.")
+    parser.add_argument("--sample", type=int, default=DEFAULT_SAMPLE,
+                        help="Files per scenario used for component timings.")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+    args = parser.parse_args()
+
+    report = run_benchmarks(
+        file_counts=args.files, line_counts=args.lines, latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed,
+        max_workers=args.workers, max_total_lines=args.max_total_lines, sample=args.sample,
+    )
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+        print(f"📊 Benchmark report written to {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import ast
+import asyncio
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from backend.analysis_cache import ModuleAnalysis
+
+DEFAULT_CHUNK_LINES = int(os.getenv("CHUNK_MAX_LINES", "400"))
+CHUNK_THRESHOLD_LINES = int(os.getenv("CHUNK_THRESHOLD_LINES", "1200"))
+
+CHUNK_MARKER = "<!-- chunk {index}: {label} -->"
+_CHUNK_MARKER_RE = re.compile(r"^<!-- chunk (\d+): .* -->$", re.MULTILINE)
+_DEFINITIONS = ("def ", "async def ", "class ", "@")
+_FENCE_RE = re.compile(r"^```[\w-]*\s*\n(.*?)\n```\s*$", re.DOTALL)
+
+
+class SourceChunk:
+    """A run of whole top-level definitions plus the module prelude."""
+
+    def __init__(self, index, label, start_line, end_line, prelude, body, analysis):
+        self.index = index
+        self.label = label
+        self.start_line = start_line
+        self.end_line = end_line
+        self.prelude = prelude
+        self.body = body
+        self.analysis = analysis
+
+    @property
+    def code_text(self):
+        return f"{self.prelude}\n{self.body}" if self.prelude else self.body
+
+
+class ModuleChunker:
+    """Splits a module at top-level class/function boundaries.
+
+    Everything before the first definition (docstring, imports, constants) is
+    the prelude shared by every chunk. Consecutive definitions are grouped
+    until a chunk reaches ``max_lines``; a single definition is never split.
+    """
+
+    def __init__(self, analysis, max_lines=DEFAULT_CHUNK_LINES):
+        self.analysis = analysis
+        self.max_lines = max_lines
+
+    @staticmethod
+    def should_chunk(analysis, threshold=CHUNK_THRESHOLD_LINES):
+        return analysis.code_text.count("\n") + 1 > threshold
+
+    def _chunk_summary(self, start, end):
+        summary = self.analysis.summary
+        return {
+            "module_doc": summary.get("module_doc", ""),
+            "functions": [f for f in summary.get("functions", []) if start <= f["lineno"] <= end],
+            "classes": [c for c in summary.get("classes", []) if start <= c["lineno"] <= end],
+            "constants": summary.get("constants", []),
+        }
+
+    def chunks(self):
+        """Return the module's chunks in source order (one chunk if unparsable)."""
+        lines = self.analysis.code_text.splitlines()
+        # Computed once per analysis (possibly in the CPU process pool).
+        boundaries = self.analysis.definition_starts()
+        if not boundaries:
+            return [SourceChunk(0, "module", 1, len(lines), "", self.analysis.code_text, self.analysis)]
+
+        prelude = "\n".join(lines[: boundaries[0][0] - 1]).rstrip()
+        segments = []
+        for i, (start, name) in enumerate(boundaries):
+            end = boundaries[i + 1][0] - 1 if i + 1 < len(boundaries) else len(lines)
+            segments.append((start, end, name))
+
+        groups, current = [], []
+        for segment in segments:
+            if current and segment[1] - current[0][0] + 1 > self.max_lines:
+                groups.append(current)
+                current = []
+            current.append(segment)
+        if current:
+            groups.append(current)
+
+        chunks = []
+        for index, group in enumerate(groups):
+            start, end = group[0][0], group[-1][1]
+            names = [name for _, _, name in group]
+            label = names[0] if len(names) == 1 else f"{names[0]}..{names[-1]}"
+            body = "\n".join(lines[start - 1:end]).rstrip() + "\n"
+            chunk_analysis = ModuleAnalysis(
+                None, f"{self.analysis.filename}#{index}", body, None,
+                summary=self._chunk_summary(start, end),
+            )
+            chunks.append(SourceChunk(index, label, start, end, prelude, body, chunk_analysis))
+        return chunks
+
+
+def strip_fences(text):
+    """Remove a single surrounding markdown code fence, if present."""
+    match = _FENCE_RE.match(text.strip())
+    return match.group(1) if match else text
+
+
+def merge_sections(chunks, outputs, title):
+    """Reduce per-chunk markdown outputs into one document with chunk markers."""
+    parts = [title] if title else []
+    for chunk, output in zip(chunks, outputs):
+        parts.append(CHUNK_MARKER.format(index=chunk.index, label=chunk.label))
+        parts.append(output.strip())
+    return "\n\n".join(parts) + "\n"
+
+
+def split_sections(text, count):
+    """Inverse of :func:`merge_sections`; falls back to the full text per chunk."""
+    markers = list(_CHUNK_MARKER_RE.finditer(text))
+    if len(markers) != count:
+        return [text] * count
+    sections = []
+    for i, marker in enumerate(markers):
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        sections.append(text[marker.end():end].strip())
+    return sections
+
+
+def merge_features(chunks, outputs):
+    """Reduce per-chunk Gherkin outputs into a single feature document.
+
+    Only one ``Feature:`` header is allowed per file, so the headers of every
+    chunk after the first are kept as comments.
+    """
+    parts = []
+    seen_feature = False
+    for chunk, output in zip(chunks, outputs):
+        lines = [f"# chunk {chunk.index}: {chunk.label}"]
+        for line in output.strip().splitlines():
+            if line.lstrip().startswith("Feature:"):
+                if seen_feature:
+                    line = "# " + line.strip()
+                seen_feature = True
+            lines.append(line)
+        parts.append("\n".join(lines))
+    return "\n\n".join(parts) + "\n"
+
+
+def _top_level(code):
+    """``(imports, first_definition)`` of ``code`` from its AST.
+
+    ``imports`` maps the line index of each top-level import to the whole
+    statement, and its continuation lines to ``None``. Code that does not
+    parse has no imports and its first definition is found by line prefix.
+    """
+    lines = code.splitlines()
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        starts = [index for index, line in enumerate(lines) if line.startswith(_DEFINITIONS)]
+        return {}, min(starts, default=len(lines))
+    imports, starts = {}, [len(lines)]
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports[node.lineno - 1] = "\n".join(lines[node.lineno - 1:node.end_lineno]).strip()
+            imports.update((index, None) for index in range(node.lineno, node.end_lineno))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            starts.append(min([node.lineno] + [d.lineno for d in node.decorator_list]) - 1)
+    return imports, min(starts)
+
+
+def merge_code(chunks, outputs):
+    """Reassemble updated chunk code into a module.
+
+    The original prelude is kept. Whatever a chunk's output repeats before
+    its first definition is dropped if it already appears in the prelude,
+    and new top-level imports are hoisted into the prelude (deduplicated,
+    first-seen order), so the result is the same regardless of map order.
+    Imports are found with ``ast``, so text in strings is never moved, and
+    nothing is hoisted from an output that does not parse.
+    """
+    prelude = chunks[0].prelude if chunks else ""
+    known = {line.strip() for line in prelude.splitlines() if line.strip()}
+    hoisted, bodies = [], []
+
+    for output in outputs:
+        code = strip_fences(output)
+        imports, first_definition = _top_level(code)
+        body_lines = []
+        for index, line in enumerate(code.splitlines()):
+            if index in imports:
+                statement = imports[index]
+                if statement is not None and statement not in known:
+                    known.add(statement)
+                    hoisted.append(statement)
+                continue
+            if index < first_definition and line.strip() in known:
+                continue
+            body_lines.append(line)
+        bodies.append("\n".join(body_lines).strip("\n"))
+
+    header = "\n".join(part for part in [prelude, "\n".join(hoisted)] if part)
+    return "\n\n\n".join(part for part in [header] + bodies if part) + "\n"
+
+
+class ChunkedGenerator:
+    """Map a per-chunk generator over a module's chunks and reduce the results.
+
+    ``make_generator(chunk)`` returns any generator exposing ``process`` and
+    ``aprocess``; ``reduce(chunks, outputs)`` merges the per-chunk outputs in
+    chunk order, so the result is deterministic however the map finishes.
+    Chunks run on ``executor`` (the orchestrator's stage pool) when given;
+    chunks no worker has picked up yet run on the calling thread, so a
+    saturated pool cannot deadlock. Per-chunk ``warnings`` are collected.
+    """
+
+    def __init__(self, chunks, make_generator, reduce, max_workers=4, executor=None):
+        self.chunks = chunks
+        self.make_generator = make_generator
+        self.reduce = reduce
+        self.max_workers = max(1, max_workers)
+        self.executor = executor
+        self._generators = []
+
+    @property
+    def warnings(self):
+        return [
+            f"chunk {chunk.index + 1}: {warning}"
+            for chunk, generator in zip(self.chunks, self._generators)
+            for warning in getattr(generator, "warnings", None) or []
+        ]
+
+    def _map(self, executor, generators):
+        # Run each chunk in a copy of the caller's context so model calls
+        # are attributed to the caller's instrumentation span.
+        futures = [executor.submit(contextvars.copy_context().run, g.process) for g in generators]
+        outputs = []
+        for future, generator in zip(futures, generators):
+            if future.cancel():  # not started yet: run it here rather than wait for a worker
+                outputs.append(generator.process())
+            else:
+                outputs.append(future.result())
+        return outputs
+
+    def process(self):
+        self._generators = generators = [self.make_generator(chunk) for chunk in self.chunks]
+        if self.executor is not None:
+            outputs = self._map(self.executor, generators)
+        elif self.max_workers == 1:
+            outputs = [generator.process() for generator in generators]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(generators)),
+                                    thread_name_prefix="qa-chunk") as pool:
+                outputs = self._map(pool, generators)
+        return self.reduce(self.chunks, outputs)
+
+    async def aprocess(self, semaphore=None):
+        self._generators = [self.make_generator(chunk) for chunk in self.chunks]
+
+        async def run(generator):
+            if semaphore is None:
+                return await generator.aprocess()
+            async with semaphore:
+                return await generator.aprocess()
+
+        outputs = await asyncio.gather(*(run(generator) for generator in self._generators))
+        return self.reduce(self.chunks, list(outputs))
+
+    def stream(self):
+        """Chunks complete out of order, so the merged result is yielded once."""
+        yield self.process()
@@ -1,30 +1,197 @@
 # backend/code_parser.py
 
 import ast
+import copy
+
+
+class _Canonicalizer(ast.NodeTransformer):
+    """Renames a function's parameters and local names to ``v0``, ``v1``, ... in order of appearance.
+
+    References to the module's own top-level definitions use their
+    ``module_names`` placeholder; other globals, builtins and attribute
+    names are kept, so only code that differs in naming (or docstrings)
+    becomes identical.
+    """
+
+    def __init__(self, local_names, module_names=None):
+        self.local_names = local_names
+        self.module_names = module_names or {}
+        self.mapping = {}
+
+    def _canonical(self, name):
+        if name not in self.local_names:
+            return self.module_names.get(name, name)
+        if name not in self.mapping:
+            self.mapping[name] = f"v{len(self.mapping)}"
+        return self.mapping[name]
+
+    def visit_Name(self, node):
+        node.id = self._canonical(node.id)
+        return node
+
+    def visit_arg(self, node):
+        node.arg = self._canonical(node.arg)
+        node.annotation = self.visit(node.annotation) if node.annotation else None
+        return node
+
+    def visit_FunctionDef(self, node):
+        node.name = self._canonical(node.name)
+        if ast.get_docstring(node, clean=False) is not None:
+            node.body = node.body[1:] or [ast.Pass()]
+        return self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
 
 class PythonCodeParser:
-    """Extracts module docstring, functions, and their docstrings from a Python file."""
+    """Extracts the public API surface of a Python file.
+
+    Besides the module docstring and top-level functions this collects classes
+    (with their methods), async functions, decorators, type annotations and
+    module-level constants.
+    """
 
-    def __init__(self, code_text: str, filename: str):
+    def __init__(self, code_text: str, filename: str, tree=None):
         self.code_text = code_text
         self.filename = filename
+        self._tree = tree
+        self._error = None
+
+    def tree(self):
+        """The module's AST, parsed at most once; ``None`` if the code does not parse."""
+        if self._tree is None and self._error is None:
+            try:
+                self._tree = ast.parse(self.code_text)
+            except Exception as e:
+                self._error = e
+        return self._tree
+
+    @staticmethod
+    def _unparse(node):
+        return ast.unparse(node) if node is not None else None
+
+    @classmethod
+    def _function_info(cls, node):
+        args = node.args
+        positional = args.posonlyargs + args.args
+        defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+
+        params = []
+        for arg, default in zip(positional, defaults):
+            params.append({
+                "name": arg.arg,
+                "annotation": cls._unparse(arg.annotation),
+                "default": cls._unparse(default),
+            })
+        if args.vararg:
+            params.append({"name": f"*{args.vararg.arg}", "annotation": cls._unparse(args.vararg.annotation), "default": None})
+        for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+            params.append({
+                "name": arg.arg,
+                "annotation": cls._unparse(arg.annotation),
+                "default": cls._unparse(default),
+            })
+        if args.kwarg:
+            params.append({"name": f"**{args.kwarg.arg}", "annotation": cls._unparse(args.kwarg.annotation), "default": None})
+
+        return {
+            "name": node.name,
+            "doc": ast.get_docstring(node) or "No description.",
+            "args": [arg.arg for arg in node.args.args],
+            "params": params,
+            "returns": cls._unparse(node.returns),
+            "decorators": [cls._unparse(d) for d in node.decorator_list],
+            "is_async": isinstance(node, ast.AsyncFunctionDef),
+            "lineno": node.lineno,
+        }
+
+    @classmethod
+    def _constant_info(cls, node):
+        if isinstance(node, ast.Assign):
+            targets = [t.id for t in node.targets if isinstance(t, ast.Name)]
+            annotation = None
+        elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+            targets = [node.target.id]
+            annotation = cls._unparse(node.annotation)
+        else:
+            return []
+
+        value = cls._unparse(node.value)
+        if value is not None and len(value) > 80:
+            value = value[:77] + "..."
+        return [
+            {"name": name, "annotation": annotation, "value": value}
+            for name in targets
+            if name.isupper()
+        ]
+
+    @staticmethod
+    def normalized_dump(node, module_names=None):
+        """``ast.dump`` of a function with its name, docstrings and local names canonicalized."""
+        local_names = {node.name}
+        for child in ast.walk(node):
+            if isinstance(child, ast.arg):
+                local_names.add(child.arg)
+            elif isinstance(child, ast.Name) and isinstance(child.ctx, (ast.Store, ast.Del)):
+                local_names.add(child.id)
+            elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                local_names.add(child.name)
+        node = copy.deepcopy(node)
+        node.decorator_list = []
+        return ast.dump(_Canonicalizer(local_names, module_names).visit(node), annotate_fields=False)
+
+    def normalized_functions(self):
+        """``[(qualified_name, lineno, normalized_dump)]`` for top-level functions and methods."""
+        tree = self.tree()
+        if tree is None:
+            return []
+
+        # Top-level definitions by position, so calls between renamed functions still match.
+        definitions = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+        module_names = {
+            node.name: f"m{index}"
+            for index, node in enumerate(n for n in tree.body if isinstance(n, definitions))
+        }
+        functions = []
+        for node in tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                functions.append((node.name, node.lineno, self.normalized_dump(node, module_names)))
+            elif isinstance(node, ast.ClassDef):
+                for item in node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        functions.append(
+                            (f"{node.name}.{item.name}", item.lineno, self.normalized_dump(item, module_names))
+                        )
+        return functions
 
     def process(self):
         """Parse the code and return module summary as dictionary."""
-        try:
-            tree = ast.parse(self.code_text)
-        except Exception as e:
-            return {"module_doc": f"⚠️ Failed to parse code: {e}", "functions": []}
+        tree = self.tree()
+        if tree is None:
+            return {
+                "module_doc": f"⚠️ Failed to parse code: {self._error}", "functions": [], "classes": [], "constants": []
+            }
 
         module_doc = ast.get_docstring(tree) or "No module description available."
 
-        functions = []
+        functions, classes, constants = [], [], []
         for node in tree.body:
-            if isinstance(node, ast.FunctionDef):
-                functions.append({
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                functions.append(self._function_info(node))
+            elif isinstance(node, ast.ClassDef):
+                classes.append({
                     "name": node.name,
                     "doc": ast.get_docstring(node) or "No description.",
-                    "args": [arg.arg for arg in node.args.args],
+                    "bases": [self._unparse(b) for b in node.bases],
+                    "decorators": [self._unparse(d) for d in node.decorator_list],
+                    "methods": [
+                        self._function_info(item)
+                        for item in node.body
+                        if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                    ],
+                    "lineno": node.lineno,
                 })
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                constants.extend(self._constant_info(node))
 
-        return {"module_doc": module_doc, "functions": functions}
+        return {"module_doc": module_doc, "functions": functions, "classes": classes, "constants": constants}
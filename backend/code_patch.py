@@ -0,0 +1,107 @@
+"""Apply model-written unified diffs to Python source.
+
+Models get hunk line numbers wrong far more often than context lines, so
+every hunk is located by its context and removed lines, starting from the
+position its header suggests and searching outwards. Trailing whitespace
+is ignored when matching.
+"""
+
+import re
+
+NO_CHANGES = "NO CHANGES"
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+_DIFF_FENCE_RE = re.compile(r"```(?:diff|patch|udiff)?\s*\n(.*?)\n```", re.DOTALL)
+
+
+class PatchError(ValueError):
+    """The diff is malformed or does not match the source."""
+
+
+class Hunk:
+    def __init__(self, old_start=None):
+        self.old_start = old_start  # 1-based, as claimed by the header (may be wrong)
+        self.lines = []  # (op, text) with op in " ", "-", "+"
+
+    @property
+    def old(self):
+        return [text for op, text in self.lines if op != "+"]
+
+    @property
+    def new(self):
+        return [text for op, text in self.lines if op != "-"]
+
+
+def extract_diff(text):
+    """The diff inside a fenced block (or the whole reply), or ``None`` for :data:`NO_CHANGES`."""
+    match = _DIFF_FENCE_RE.search(text)
+    body = match.group(1) if match else text
+    if body.strip().upper().startswith(NO_CHANGES):
+        return None
+    return body
+
+
+def parse_unified_diff(diff_text):
+    """Hunks of a single-file unified diff; file headers are ignored."""
+    hunks, hunk = [], None
+    for line in diff_text.splitlines():
+        if line.startswith("@@"):
+            match = _HUNK_RE.match(line)
+            hunk = Hunk(int(match.group(1)) if match else None)
+            hunks.append(hunk)
+        elif hunk is None or line.startswith(("--- ", "+++ ", "diff ", "index ")):
+            continue
+        elif line.startswith("\\"):
+            continue  # "\ No newline at end of file"
+        elif line[:1] in (" ", "-", "+"):
+            hunk.lines.append((line[0], line[1:]))
+        elif not line.strip():
+            hunk.lines.append((" ", ""))  # context blank line whose leading space was lost
+        else:
+            raise PatchError(f"Unexpected line in hunk: {line[:60]!r}")
+
+    if not hunks:
+        raise PatchError("Reply contains no diff hunks")
+    hunks = [h for h in hunks if any(op != " " for op, _ in h.lines)]
+    if not hunks:
+        raise PatchError("Diff contains no changes")
+    return hunks
+
+
+def _matches_at(lines, block, pos):
+    if pos < 0 or pos + len(block) > len(lines):
+        return False
+    return all(lines[pos + i].rstrip() == text.rstrip() for i, text in enumerate(block))
+
+
+def _locate(lines, block, expected, start):
+    """Position of ``block`` at or after ``start``, closest to ``expected``."""
+    expected = min(max(expected, start), len(lines))
+    for distance in range(len(lines) + 1):
+        for pos in (expected - distance, expected + distance) if distance else (expected,):
+            if pos >= start and _matches_at(lines, block, pos):
+                return pos
+    return None
+
+
+def apply_unified_diff(source, diff_text):
+    """Apply ``diff_text`` to ``source`` and return the new text; raises :class:`PatchError`."""
+    lines = source.splitlines()
+    cursor, offset = 0, 0
+    for number, hunk in enumerate(parse_unified_diff(diff_text), start=1):
+        old, new = hunk.old, hunk.new
+        expected = (hunk.old_start - 1 + offset) if hunk.old_start is not None else cursor
+        if not old:
+            if hunk.old_start is None:
+                raise PatchError(f"Hunk {number} inserts lines without context or line number")
+            # "-N,0" inserts after line N.
+            pos = min(max(expected + 1, cursor), len(lines))
+        else:
+            pos = _locate(lines, old, expected, cursor)
+            if pos is None:
+                raise PatchError(f"Hunk {number} does not match the source")
+        lines[pos:pos + len(old)] = new
+        cursor = pos + len(new)
+        offset += len(new) - len(old)
+
+    text = "\n".join(lines)
+    return text + "\n" if source.endswith("\n") or not source else text
@@ -1,18 +1,108 @@
+import ast
+import os
 from backend.ai_client import AIClient
+from backend.analysis_cache import ModuleAnalysis
 from backend.app_utils.prompt_library import PromptLibrary
+from backend.code_patch import PatchError, apply_unified_diff, extract_diff
+
+# "diff": ask for a unified diff and apply it locally; "full": regenerate the whole file.
+CODE_UPDATE_MODE = os.getenv("CODE_UPDATE_MODE", "diff").strip().lower()
+
 
 class CodeUpdater:
-    """Updates Python source code based on new requirements."""
+    """Updates Python source code based on new requirements.
+
+    In ``diff`` mode the model only returns the changed hunks, so completion
+    tokens scale with the size of the change rather than of the file. The
+    patched module must still parse; otherwise the file is regenerated in
+    full as before. ``outcome`` tells which path was taken.
+    """
 
-    def __init__(self, requirements_text: str, old_code: str, filename: str):
+    def __init__(self, requirements_text: str, old_code: str, filename: str, analysis=None, mode=None):
         self.requirements_text = requirements_text
         self.old_code = old_code
         self.filename = filename
-        self.ai = AIClient()
+        self.analysis = analysis or ModuleAnalysis(None, filename, old_code, None)
+        self.mode = (mode or CODE_UPDATE_MODE).lower()
+        self.outcome = None  # "patched", "unchanged", "fallback" or "full"
+        self.patch_error = None
+        self.ai = AIClient.shared()
+
+    def _with_source(self, prompt):
+        """``prompt``, checked to contain the code being updated.
+
+        A custom template from the prompt store may leave out ``{old_code}``;
+        the model cannot update code it never sees, so the source is appended.
+        """
+        if self.old_code.strip() in prompt:
+            return prompt
+        return f"{prompt.rstrip()}\n\nCurrent code:\n```python\n{self.old_code}\n```\n"
+
+    def build_prompt(self):
+        code_context = self.analysis.render_context()
+        return self._with_source(PromptLibrary.code_updater_prompt(
+            self.requirements_text, self.old_code, self.filename, code_context=code_context
+        ))
+
+    def build_patch_prompt(self):
+        code_context = self.analysis.render_context()
+        return self._with_source(PromptLibrary.code_patch_prompt(
+            self.requirements_text, self.old_code, self.filename, code_context=code_context
+        ))
+
+    def apply_patch(self, reply):
+        """Apply the model's diff reply; returns the new code or ``None`` to fall back."""
+        try:
+            diff = extract_diff(reply)
+            if diff is None:
+                self.outcome = "unchanged"
+                return self.old_code
+            updated = apply_unified_diff(self.old_code, diff)
+            ast.parse(updated)
+        except (PatchError, SyntaxError) as e:
+            self.patch_error = str(e)
+            self.outcome = "fallback"
+            return None
+        self.outcome = "patched"
+        return updated
+
+    @property
+    def warnings(self):
+        if self.outcome == "fallback":
+            return [f"diff patch failed ({self.patch_error}); regenerated the full file"]
+        return []
 
     def process(self):
         """Use centralized prompt to request GPT-driven code updates."""
-        prompt = PromptLibrary.code_updater_prompt(
-            self.requirements_text, self.old_code, self.filename
-        )
-        return self.ai.generate_text(prompt)
+        if self.mode == "diff":
+            updated = self.apply_patch(self.ai.generate_text(self.build_patch_prompt()))
+            if updated is not None:
+                return updated
+        else:
+            self.outcome = "full"
+        return self.ai.generate_text(self.build_prompt())
+
+    async def aprocess(self):
+        """Async variant of :meth:`process`."""
+        if self.mode == "diff":
+            updated = self.apply_patch(await self.ai.agenerate_text(self.build_patch_prompt()))
+            if updated is not None:
+                return updated
+        else:
+            self.outcome = "full"
+        return await self.ai.agenerate_text(self.build_prompt())
+
+    def stream(self):
+        """Yield the response in chunks as the model produces them.
+
+        A diff cannot be shown before it is applied, so in ``diff`` mode the
+        patched module arrives as one chunk; only a fallback streams.
+        """
+        if self.mode == "diff":
+            updated = self.apply_patch(self.ai.generate_text(self.build_patch_prompt()))
+            if updated is not None:
+                yield updated
+                return
+        else:
+            self.outcome = "full"
+        yield from self.ai.stream_text(self.build_prompt())
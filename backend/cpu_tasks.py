@@ -0,0 +1,76 @@
+"""CPU-bound local stages that can run in a process pool.
+
+Everything here is a top-level function taking and returning plain
+strings, numbers, lists and dicts, so calls pickle compactly and behave
+the same inline or in a ``ProcessPoolExecutor`` worker.
+"""
+
+import ast
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from backend.analysis_cache import AnalysisCache, ModuleAnalysis
+from backend.chunker import strip_fences
+from backend.code_parser import PythonCodeParser
+from backend.function_dedup import ModuleProfile
+from backend.prompt_context import DEFAULT_TOKEN_BUDGET, PromptContextBuilder
+
+DEFAULT_CPU_WORKERS = int(os.getenv("ORCHESTRATOR_CPU_WORKERS", str(os.cpu_count() or 1)))
+CPU_OFFLOAD_MIN_FILES = int(os.getenv("ORCHESTRATOR_CPU_MIN_FILES", "200"))
+CPU_START_METHOD = os.getenv("ORCHESTRATOR_CPU_START_METHOD", "spawn")
+
+
+def make_cpu_pool(workers=DEFAULT_CPU_WORKERS):
+    """Process pool for the functions below (``spawn`` by default: safe next to threads)."""
+    return ProcessPoolExecutor(
+        max_workers=max(1, workers), mp_context=multiprocessing.get_context(CPU_START_METHOD)
+    )
+
+
+def analyse_file(path, token_budget=DEFAULT_TOKEN_BUDGET):
+    """Read, hash and parse ``path`` and build its prompt context and dedup fingerprints."""
+    stat = os.stat(path)
+    with open(path, "r", encoding="utf-8") as f:
+        code_text = f.read()
+    filename = os.path.basename(path)
+    parser = PythonCodeParser(code_text, filename)
+    summary = parser.process()
+    tree = parser.tree()  # parsed once; everything below reuses it
+    context = PromptContextBuilder(code_text, filename, token_budget, summary=summary).build()
+    return {
+        "path": path,
+        "filename": filename,
+        "code_text": code_text,
+        "source_hash": AnalysisCache.hash_text(code_text),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "summary": summary,
+        "token_budget": token_budget,
+        "context": context,
+        "definition_starts": ModuleAnalysis.find_definition_starts(code_text, tree) if tree else None,
+        "dedup_profile": ModuleProfile.fingerprints(code_text, filename, tree) if tree else ([], None, None),
+    }
+
+
+def check_output(stage, text):
+    """Cheap structural checks of a stage output; returns a list of warnings."""
+    if not text or not text.strip():
+        return [f"{stage} output is empty"]
+
+    if stage == "updated_code":
+        try:
+            ast.parse(strip_fences(text))
+        except SyntaxError as e:
+            return [f"updated code does not parse (line {e.lineno}: {e.msg})"]
+
+    elif stage == "gherkin":
+        body = strip_fences(text)
+        keywords = [line.strip().split(":", 1)[0] for line in body.splitlines() if ":" in line]
+        warnings = []
+        if "Feature" not in keywords:
+            warnings.append("Gherkin has no Feature")
+        if not any(k in ("Scenario", "Scenario Outline", "Example") for k in keywords):
+            warnings.append("Gherkin has no Scenario")
+        return warnings
+
+    return []
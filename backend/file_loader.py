@@ -1,4 +1,5 @@
 import os
+from backend.source_discovery import DEFAULT_EXCLUDE, SourceScanner
 
 class FileLoader:
     """Handles file loading and reading for the automation system."""
@@ -28,3 +29,8 @@ class FileLoader:
             for file in os.listdir(directory)
             if file.endswith(".md")
         ]
+
+    @staticmethod
+    def discover(directory: str, include=("*.py",), exclude=DEFAULT_EXCLUDE, gitignore=True):
+        """Lazily yields matching files below ``directory``, recursively (see :class:`SourceScanner`)."""
+        return SourceScanner(directory, include=include, exclude=exclude, gitignore=gitignore)
@@ -1,16 +1,225 @@
+import hashlib
+import json
 import os
+import secrets
+import threading
+import zipfile
+from pathlib import Path
 
-class FileSaver:
-    def __init__(self, output_dir="outputs"):
-        self.output_dir = output_dir
-        os.makedirs(output_dir, exist_ok=True)
+DEFAULT_FSYNC_BATCH = int(os.getenv("ARTIFACT_FSYNC_BATCH", "64"))
+PARTIAL_SUFFIX = ".partial"
+
+
+class ArtifactWriter:
+    """Crash-safe writer for generated artifacts.
+
+    Every file is written to a temporary sibling, fsynced, and moved into
+    place with ``os.replace``, so readers only ever see a previous or a
+    complete version, never a truncated one. Artifacts keep the mode of the
+    file they replace (new ones get the umask default). Writes whose content
+    matches the file already on disk are skipped. A file's data must reach
+    disk before its rename, so each file is synced on its own (``fdatasync``
+    where available); the renames are batched, their folders fsynced
+    together every ``fsync_batch`` writes and on :meth:`flush`.
+    ``fsync_batch <= 0`` disables fsync altogether, trading crash safety
+    for speed.
+    """
+
+    def __init__(self, output_dir="generated_outputs", fsync_batch=DEFAULT_FSYNC_BATCH):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.fsync_batch = fsync_batch
+        self.artifacts = {}  # path -> {"sha256", "size"} of every artifact of this run
+        self.stats = {"written": 0, "unchanged": 0, "fsyncs": 0}
+        self._pending = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(data: bytes) -> dict:
+        return {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+
+    @staticmethod
+    def _same_content(path, data: bytes) -> bool:
+        try:
+            if os.path.getsize(path) != len(data):
+                return False
+            with open(path, "rb") as f:
+                return f.read() == data
+        except OSError:
+            return False
+
+    def _finish(self, path, data, written):
+        """Record an artifact; the caller has already put it in place."""
+        with self._lock:
+            self.artifacts[str(path)] = self._digest(data)
+            self.stats["written" if written else "unchanged"] += 1
+            if not written or self.fsync_batch <= 0:
+                return
+            self._pending.append(str(path))
+            if len(self._pending) < self.fsync_batch:
+                return
+            pending, self._pending = self._pending, []
+        self._sync(pending)
+
+    @staticmethod
+    def _create(tmp_path):
+        """Open a new file for writing; the kernel applies the umask to its 0666 mode."""
+        return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+
+    @classmethod
+    def _create_tmp(cls, path):
+        """``(fd, tmp_path)`` of a new, uniquely named sibling of ``path``."""
+        folder, name = os.path.split(os.path.abspath(path))
+        while True:
+            tmp_path = os.path.join(folder, f".{name}.{secrets.token_hex(4)}.tmp")
+            try:
+                return cls._create(tmp_path), tmp_path
+            except FileExistsError:
+                continue
+
+    @staticmethod
+    def _keep_mode(fd, path):
+        """Give the new version of ``path`` the mode of the file it replaces, if any."""
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except OSError:
+            return  # new artifact: keeps the umask default it was created with
+        os.fchmod(fd, mode)
+
+    def _durable(self, f):
+        """Flush ``f`` to disk before it is renamed into place."""
+        f.flush()
+        if self.fsync_batch > 0:
+            getattr(os, "fdatasync", os.fsync)(f.fileno())
+
+    def _sync(self, paths):
+        """Fsync the folders of renamed ``paths`` so the renames survive a crash."""
+        folders = {os.path.dirname(os.path.abspath(path)) for path in paths}
+        for folder in folders:
+            try:
+                fd = os.open(folder, os.O_RDONLY)
+            except OSError:
+                continue
+            try:
+                os.fsync(fd)
+            except OSError:
+                pass  # directories cannot be fsynced on every platform
+            finally:
+                os.close(fd)
+        with self._lock:
+            self.stats["fsyncs"] += 1
+
+    def write(self, path, text) -> bool:
+        """Atomically write ``text`` to ``path``; returns ``False`` if it was unchanged."""
+        data = text.encode("utf-8")
+        if self._same_content(path, data):
+            self._finish(path, data, written=False)
+            return False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        fd, tmp_path = self._create_tmp(path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._keep_mode(f.fileno(), path)
+                f.write(data)
+                self._durable(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._finish(path, data, written=True)
+        return True
+
+    def stream(self, path, chunks):
+        """Write ``chunks`` as they arrive and yield them on.
+
+        Chunks go to ``<path>.partial`` and are flushed immediately, so an
+        interrupted run leaves the partial output on disk next to the last
+        complete version. Once the stream ends the partial file holds the
+        stripped text, as the response cache does, and replaces ``path`` (or
+        is dropped if the content did not change).
+        """
+        partial_path = f"{path}{PARTIAL_SUFFIX}"
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)  # left by an interrupted run
+        parts = []
+        with os.fdopen(self._create(partial_path), "w", encoding="utf-8") as f:
+            self._keep_mode(f.fileno(), path)
+            for chunk in chunks:
+                f.write(chunk)
+                f.flush()
+                parts.append(chunk)
+                yield chunk
+            raw = "".join(parts)
+            text = raw.strip()
+            if text != raw:
+                f.seek(0)
+                f.write(text)
+                f.truncate()
+            self._durable(f)
+
+        data = text.encode("utf-8")
+        if self._same_content(path, data):
+            os.remove(partial_path)
+            self._finish(path, data, written=False)
+        else:
+            os.replace(partial_path, path)
+            self._finish(path, data, written=True)
+
+    def track(self, path):
+        """Include an existing, reused artifact in this run's index and archive."""
+        with open(path, "rb") as f:
+            data = f.read()
+        with self._lock:
+            self.artifacts[str(path)] = self._digest(data)
+
+    def flush(self):
+        """Fsync every write that has not been synced yet."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if pending:
+            self._sync(pending)
+
+    def _relative(self, path):
+        try:
+            return Path(path).resolve().relative_to(self.output_dir.resolve()).as_posix()
+        except ValueError:
+            return Path(path).name
+
+    def index(self) -> dict:
+        """``{relative path: {"sha256", "size"}}`` for every artifact of this run."""
+        with self._lock:
+            artifacts = dict(self.artifacts)
+        return {self._relative(path): digest for path, digest in sorted(artifacts.items())}
+
+    def write_index(self, path=None):
+        """Write :meth:`index` as JSON (``<output_dir>/index.json`` by default)."""
+        path = path or self.output_dir / "index.json"
+        self.write(path, json.dumps(self.index(), indent=2, sort_keys=True))
+        return path
+
+    def pack(self, archive_path=None):
+        """Bundle this run's artifacts and their index into one zip file."""
+        archive_path = Path(archive_path or self.output_dir / "artifacts.zip")
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            paths = sorted(self.artifacts)
+        tmp_path = f"{archive_path}.tmp"
+        with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for path in paths:
+                if os.path.exists(path):
+                    archive.write(path, self._relative(path))
+            archive.writestr("index.json", json.dumps(self.index(), indent=2, sort_keys=True))
+        os.replace(tmp_path, archive_path)
+        return archive_path
+
+
+class FileSaver(ArtifactWriter):
+    """Saves requirements and Gherkin for one file into the orchestrator's layout."""
 
     def save_all(self, filename, req_text, gherkin_text):
         base = os.path.splitext(filename)[0]
-        req_path = os.path.join(self.output_dir, f"{base}_requirements.md")
-        gherkin_path = os.path.join(self.output_dir, f"{base}.feature")
-
-        with open(req_path, "w", encoding="utf-8") as r:
-            r.write(req_text)
-        with open(gherkin_path, "w", encoding="utf-8") as g:
-            g.write(gherkin_text)
+        self.write(self.output_dir / "requirements" / f"{base}_requirements.md", req_text)
+        self.write(self.output_dir / "gherkin" / f"{base}.feature", gherkin_text)
@@ -0,0 +1,381 @@
+"""Structural deduplication of functions and modules across a run.
+
+Every function is reduced to a normalized AST (see
+:meth:`PythonCodeParser.normalized_dump`): identical fingerprints mean the
+code only differs in naming or docstrings. Near duplicates are found with
+MinHash signatures over token shingles of that AST and an LSH band index.
+
+When a whole module duplicates one processed earlier in the run, its
+requirements and Gherkin stages reuse the earlier module's outputs with
+names adapted instead of calling the model. Updated code is always
+generated: a text rename cannot safely rewrite a module.
+"""
+
+import ast
+import asyncio
+import copy
+import hashlib
+import os
+import random
+import re
+import threading
+from backend.chunker import ChunkedGenerator
+from backend.code_parser import PythonCodeParser
+
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+NUM_PERM = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: candidates from ~50% similarity, verified against the threshold
+SHINGLE_SIZE = 5
+REUSED_STAGES = ("requirements", "gherkin")
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240229)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_CODE_RE = re.compile(r"```.*?```|`[^`\n]+`", re.DOTALL)  # fenced blocks and inline code
+
+
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def shingles(dump):
+    tokens = _TOKEN_RE.findall(dump)
+    if len(tokens) <= SHINGLE_SIZE:
+        return {_hash64(" ".join(tokens))}
+    return {_hash64(" ".join(tokens[i:i + SHINGLE_SIZE])) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    return tuple(min((a * h + b) % _PRIME for h in shingle_set) for a, b in _PERMUTATIONS)
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return sum(x == y for x, y in zip(signature, other)) / NUM_PERM
+
+
+def prelude_dump(code_text, tree=None):
+    """``ast.dump`` of the module-level code outside functions: imports, constants, class bodies.
+
+    Part of the module fingerprint, so modules whose functions match but
+    whose constants differ are not treated as exact duplicates. Class names
+    are blanked, as renames are adapted like function names. ``tree`` is
+    the module's AST, if already parsed.
+    """
+    if tree is None:
+        try:
+            tree = ast.parse(code_text)
+        except SyntaxError:
+            return ""
+    parts = []
+    for index, node in enumerate(tree.body):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if index == 0 and isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant):
+            continue  # module docstring
+        if isinstance(node, ast.ClassDef):
+            node = copy.copy(node)
+            node.name = ""
+            node.body = [
+                item for item in node.body
+                if not isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and not (isinstance(item, ast.Expr) and isinstance(item.value, ast.Constant))  # docstrings
+            ]
+        parts.append(ast.dump(node, annotate_fields=False))
+    return "\n".join(parts)
+
+
+def _bands(signature):
+    rows = NUM_PERM // LSH_BANDS
+    return [(band, signature[band * rows:(band + 1) * rows]) for band in range(LSH_BANDS)]
+
+
+class ModuleProfile:
+    """Fingerprints of one module: per function, and for the module as a whole."""
+
+    def __init__(self, filename, functions, fingerprint, signature):
+        self.filename = filename
+        self.functions = functions  # [(qualified_name, fingerprint, signature)]
+        self.fingerprint = fingerprint
+        self.signature = signature
+
+    @staticmethod
+    def fingerprints(code_text, filename, tree=None):
+        """``(functions, fingerprint, signature)`` of a module, as plain picklable data.
+
+        ``tree`` is the module's AST, if already parsed.
+        """
+        parser = PythonCodeParser(code_text, filename, tree)
+        functions, module_shingles = [], set()
+        for name, _, dump in parser.normalized_functions():
+            function_shingles = shingles(dump)
+            module_shingles |= function_shingles
+            functions.append((name, hashlib.sha256(dump.encode("utf-8")).hexdigest()[:20], minhash(function_shingles)))
+        if not functions:
+            return [], None, None
+        prelude = prelude_dump(code_text, parser.tree())
+        if prelude:
+            module_shingles |= shingles(prelude)
+        parts = sorted(fp for _, fp, _ in functions) + [prelude]
+        fingerprint = hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+        return functions, fingerprint, minhash(module_shingles)
+
+    @classmethod
+    def build(cls, code_text, filename, tree=None):
+        return cls(filename, *cls.fingerprints(code_text, filename, tree))
+
+
+class DedupMatch:
+    """A module that duplicates ``leader``; ``mapping`` renames the leader's functions and classes to its own."""
+
+    def __init__(self, leader, leader_filename, filename, kind, score, mapping):
+        self.leader = leader
+        self.leader_filename = leader_filename
+        self.filename = filename
+        self.kind = kind  # "exact" or "near"
+        self.score = score
+        self.mapping = mapping
+
+    def reuses(self, stage):
+        return stage in REUSED_STAGES
+
+    def adapt(self, text):
+        """The leader's output with the leader's file name and definitions renamed.
+
+        Definition names are only renamed inside code (fenced blocks and
+        inline backticks) and never after a ``.``, so prose and attribute
+        calls such as ``cache.get`` keep their wording.
+        """
+        if self.filename != self.leader_filename:
+            text = re.sub(r"(?<![\w.-])" + re.escape(self.leader_filename) + r"(?!\w)",
+                          lambda m: self.filename, text)
+        if not self.mapping:
+            return text
+        names = sorted(self.mapping, key=len, reverse=True)
+        pattern = re.compile(r"(?<![\w.])(" + "|".join(re.escape(name) for name in names) + r")(?!\w)")
+        return _CODE_RE.sub(lambda code: pattern.sub(lambda m: self.mapping[m.group(1)], code.group(0)), text)
+
+
+class _Slot:
+    """A stage output published once, awaited by threads or asyncio tasks."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.waiters = []  # (loop, future)
+
+
+class DedupIndex:
+    """Corpus-wide exact and near-duplicate index for one run.
+
+    :meth:`register` profiles every module (function statistics are kept
+    either way); with ``reuse`` enabled it also returns a :class:`DedupMatch`
+    for modules that duplicate an earlier one. Leaders :meth:`publish` their
+    stage outputs; duplicates :meth:`wait` for them. A leader that fails is
+    :meth:`abandon`-ed and its duplicates generate their own outputs.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, reuse=True):
+        self.threshold = threshold
+        self.reuse = reuse
+        self._lock = threading.Lock()
+        self._matches = {}  # module key -> DedupMatch or None
+        self._leaders = {}  # module key -> ModuleProfile
+        self._exact = {}  # module fingerprint -> leader key
+        self._buckets = {}  # (band, rows) -> [leader key]
+        self._function_fps = set()
+        self._function_buckets = {}  # (band, rows) -> [signature]
+        self._slots = {}
+        self._abandoned = set()
+        self.counts = {"modules": 0, "exact_modules": 0, "near_modules": 0,
+                       "functions": 0, "exact_functions": 0, "near_functions": 0}
+
+    # ----------------------------------------------------------------
+    # Registration
+    # ----------------------------------------------------------------
+    def _count_functions(self, profile):
+        """Classify each function against the ones seen so far, then index it (lock held)."""
+        for _, fingerprint, signature in profile.functions:
+            self.counts["functions"] += 1
+            if fingerprint in self._function_fps:
+                self.counts["exact_functions"] += 1
+            else:
+                candidates = {id(s): s for b in _bands(signature) for s in self._function_buckets.get(b, [])}
+                if any(similarity(signature, s) >= self.threshold for s in candidates.values()):
+                    self.counts["near_functions"] += 1
+                self._function_fps.add(fingerprint)
+            for band in _bands(signature):
+                bucket = self._function_buckets.setdefault(band, [])
+                if len(bucket) < 64:  # cap hot buckets (trivial one-liners)
+                    bucket.append(signature)
+
+    def _mapping(self, leader, profile):
+        """Leader name → own name for paired functions and classes."""
+        mapping = {}
+        by_fingerprint = {}
+        for name, fingerprint, _ in leader.functions:
+            by_fingerprint.setdefault(fingerprint, []).append(name)
+        for name, fingerprint, signature in profile.functions:
+            if by_fingerprint.get(fingerprint):
+                source = by_fingerprint[fingerprint].pop(0)
+            else:
+                scored = [(similarity(signature, s), n) for n, _, s in leader.functions]
+                score, source = max(scored, default=(0.0, None))
+                if score < self.threshold:
+                    continue
+            for old, new in zip(source.split("."), name.split(".")):
+                if old != new:
+                    mapping.setdefault(old, new)
+        return mapping
+
+    def register(self, key, profile):
+        """Index ``profile`` (a :class:`ModuleProfile`) and return its match, if any."""
+        with self._lock:
+            if key in self._matches:
+                return self._matches[key]
+            self.counts["modules"] += 1
+            self._count_functions(profile)
+
+            match = None
+            if profile.fingerprint is not None:
+                leader_key = self._exact.get(profile.fingerprint)
+                if leader_key is not None:
+                    leader = self._leaders[leader_key]
+                    match = DedupMatch(leader_key, leader.filename, profile.filename, "exact", 1.0,
+                                       self._mapping(leader, profile))
+                else:
+                    candidates = {k for b in _bands(profile.signature) for k in self._buckets.get(b, [])}
+                    scored = [(similarity(profile.signature, self._leaders[k].signature), k) for k in candidates]
+                    score, leader_key = max(scored, default=(0.0, None))
+                    if leader_key is not None and score >= self.threshold:
+                        leader = self._leaders[leader_key]
+                        match = DedupMatch(leader_key, leader.filename, profile.filename, "near", score,
+                                           self._mapping(leader, profile))
+
+            if match is None or not self.reuse:
+                match = None
+                if profile.fingerprint is not None:
+                    self._leaders[key] = profile
+                    self._exact.setdefault(profile.fingerprint, key)
+                    for band in _bands(profile.signature):
+                        self._buckets.setdefault(band, []).append(key)
+            else:
+                self.counts[f"{match.kind}_modules"] += 1
+            self._matches[key] = match
+            return match
+
+    # ----------------------------------------------------------------
+    # Output hand-off between a leader and its duplicates
+    # ----------------------------------------------------------------
+    def _slot(self, key, stage):
+        """The slot for ``(key, stage)``; the caller must hold ``self._lock``."""
+        slot = self._slots.get((key, stage))
+        if slot is None:
+            slot = self._slots[(key, stage)] = _Slot()
+            if key in self._abandoned:
+                slot.done.set()
+        return slot
+
+    def _set(self, slot, value):
+        """Resolve ``slot`` once; the caller must hold ``self._lock``. Returns async waiters."""
+        if slot.done.is_set():
+            return []
+        slot.value = value
+        slot.done.set()
+        waiters, slot.waiters = slot.waiters, []
+        return waiters
+
+    @staticmethod
+    def _wake(waiters, value):
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(value))
+
+    def publish(self, key, stage, output):
+        with self._lock:
+            waiters = self._set(self._slot(key, stage), output)
+        self._wake(waiters, output)
+
+    def abandon(self, key):
+        """Release everyone still waiting on ``key``: they fall back to the model."""
+        with self._lock:
+            self._abandoned.add(key)
+            waiters = []
+            for (slot_key, _), slot in self._slots.items():
+                if slot_key == key:
+                    waiters += self._set(slot, None)
+        self._wake(waiters, None)
+
+    def reset_outputs(self):
+        """Forget published outputs before the same modules run again."""
+        with self._lock:
+            self._slots = {}
+            self._abandoned = set()
+
+    def wait(self, key, stage):
+        with self._lock:
+            slot = self._slot(key, stage)
+        slot.done.wait()
+        return slot.value
+
+    async def await_output(self, key, stage):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            slot = self._slot(key, stage)
+            if slot.done.is_set():
+                return slot.value
+            slot.waiters.append((loop, future))
+        return await future
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+        duplicates = counts["exact_functions"] + counts["near_functions"]
+        counts["duplicate_ratio"] = round(duplicates / counts["functions"], 4) if counts["functions"] else 0.0
+        return counts
+
+
+class ReusedOutput:
+    """Stage generator that adapts the leader's output instead of calling the model.
+
+    If the leader fails, ``fallback`` (the regular generator) runs instead.
+    """
+
+    def __init__(self, index, match, stage, fallback):
+        self.index = index
+        self.match = match
+        self.stage = stage
+        self.fallback = fallback
+        self.reused = False
+
+    @property
+    def warnings(self):
+        return [] if self.reused else getattr(self.fallback, "warnings", [])
+
+    def _adapted(self, output):
+        if output is None:
+            return None
+        self.reused = True
+        return self.match.adapt(output)
+
+    def process(self):
+        output = self._adapted(self.index.wait(self.match.leader, self.stage))
+        return output if output is not None else self.fallback.process()
+
+    async def aprocess(self, semaphore):
+        """Waits without holding a ``semaphore`` slot; only a fallback takes one."""
+        output = self._adapted(await self.index.await_output(self.match.leader, self.stage))
+        if output is not None:
+            return output
+        if isinstance(self.fallback, ChunkedGenerator):
+            return await self.fallback.aprocess(semaphore)
+        async with semaphore:
+            return await self.fallback.aprocess()
+
+    def stream(self):
+        output = self._adapted(self.index.wait(self.match.leader, self.stage))
+        if output is not None:
+            yield output
+        else:
+            yield from self.fallback.stream()
@@ -1,19 +1,40 @@
 from backend.ai_client import AIClient
+from backend.analysis_cache import ModuleAnalysis
 from backend.app_utils.prompt_library import PromptLibrary
 
 class GherkinGenerator:
     """Generates Gherkin feature files and step definitions."""
 
-    def __init__(self, code: str, requirement: str, filename: str):
+    def __init__(self, code: str, requirement: str, filename: str, analysis=None, step_index=None,
+                 output_path=None):
         self.code = code
         self.requirement = requirement
         self.filename = filename
-        self.ai = AIClient()
+        self.analysis = analysis or ModuleAnalysis(None, filename, code, None)
+        # Existing steps (a StepIndex) to offer for reuse; ``output_path``'s own steps are not offered.
+        self.step_index = step_index
+        self.output_path = output_path
+        self.ai = AIClient.shared()
 
-    def process(self):
-        module_doc = "Extracted module documentation."
-        functions_summary = "List of functions and logical flows."
-        prompt = PromptLibrary.gherkin_prompt(
-            module_doc, functions_summary, self.filename
+    def build_prompt(self):
+        context = self.analysis.prompt_context()
+        reusable_steps = ""
+        if self.step_index is not None:
+            reusable_steps = self.step_index.render(
+                f"{self.filename} {context['module_doc']} {context['functions_summary']}",
+                exclude=self.output_path,
+            )
+        return PromptLibrary.gherkin_prompt(
+            context["module_doc"], context["functions_summary"], self.filename, reusable_steps=reusable_steps
         )
-        return self.ai.generate_text(prompt)
+
+    def process(self):
+        return self.ai.generate_text(self.build_prompt())
+
+    async def aprocess(self):
+        """Async variant of :meth:`process`."""
+        return await self.ai.agenerate_text(self.build_prompt())
+
+    def stream(self):
+        """Yield the response in chunks as the model produces them."""
+        return self.ai.stream_text(self.build_prompt())
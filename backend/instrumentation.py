@@ -0,0 +1,248 @@
+"""Structured per-(file, stage) spans for the generation pipeline.
+
+The orchestrator opens one :class:`Span` per file and stage; while it is
+active, ``AIClient`` attributes every model call (tokens, cache hits,
+retries, model time) to it through a context variable. A
+:class:`SpanRecorder` aggregates the spans into a per-stage latency table
+and exports them as JSON or OpenMetrics text.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# USD per one million (prompt, completion) tokens.
+MODEL_PRICES = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+_current_span = contextvars.ContextVar("qa_current_span", default=None)
+
+
+def model_price(model):
+    """``(prompt, completion)`` USD per million tokens, overridable from the environment."""
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (
+        float(os.getenv("AI_PRICE_PROMPT_PER_MTOK", prompt_price)),
+        float(os.getenv("AI_PRICE_COMPLETION_PER_MTOK", completion_price)),
+    )
+
+
+def percentiles(samples):
+    """Summary of latency ``samples`` (seconds) in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000.0, 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000.0, 3),
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "max_ms": round(ordered[-1] * 1000.0, 3),
+    }
+
+
+class Span:
+    """Timing, token and cache accounting for one stage of one file."""
+
+    def __init__(self, file, stage, queue_wait=0.0):
+        self.file = file
+        self.stage = stage
+        self.status = "ok"
+        self.error = None
+        self.started = time.time()
+        self.wall_seconds = 0.0
+        self.queue_wait = max(0.0, queue_wait)
+        self.model_seconds = 0.0
+        self.write_seconds = 0.0
+        self.calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self._lock = threading.Lock()
+
+    def record_call(self, model, seconds=0.0, cache_hit=False, retries=0, usage=None, coalesced=False):
+        """Attribute one model call to this span.
+
+        Cache hits and calls coalesced onto another caller's identical
+        in-flight request add no tokens or cost.
+        """
+        prompt_price, completion_price = model_price(model)
+        prompt_tokens = (usage.prompt_tokens or 0) if usage else 0
+        completion_tokens = (usage.completion_tokens or 0) if usage else 0
+        with self._lock:
+            self.calls += 1
+            self.model_seconds += seconds
+            self.retries += retries
+            if coalesced:
+                self.coalesced += 1
+            elif cache_hit:
+                self.cache_hits += 1
+            else:
+                self.cache_misses += 1
+                self.prompt_tokens += prompt_tokens
+                self.completion_tokens += completion_tokens
+                self.cost_usd += (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1e6
+
+    def add_wait(self, seconds):
+        with self._lock:
+            self.queue_wait += max(0.0, seconds)
+
+    @contextmanager
+    def timed_write(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.write_seconds += time.perf_counter() - started
+
+    def to_dict(self):
+        other = self.wall_seconds - self.model_seconds - self.write_seconds
+        return {
+            "file": self.file,
+            "stage": self.stage,
+            "status": self.status,
+            "error": self.error,
+            "started": round(self.started, 6),
+            "wall_seconds": round(self.wall_seconds, 6),
+            "queue_wait_seconds": round(self.queue_wait, 6),
+            "model_seconds": round(self.model_seconds, 6),
+            "write_seconds": round(self.write_seconds, 6),
+            "other_seconds": round(max(0.0, other), 6),
+            "calls": self.calls,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "coalesced": self.coalesced,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+        }
+
+
+def current_span():
+    """The span active in this thread or task, or ``None``."""
+    return _current_span.get()
+
+
+class SpanRecorder:
+    """Thread-safe collection of finished spans for one run."""
+
+    def __init__(self):
+        self._spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, file, stage, queued_at=None):
+        """Open a span; ``queued_at`` (``time.perf_counter()``) sets its queue wait."""
+        started = time.perf_counter()
+        span = Span(file, stage, started - queued_at if queued_at is not None else 0.0)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.status = "error"
+            span.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.wall_seconds = time.perf_counter() - started
+            with self._lock:
+                self._spans.append(span)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def stage_table(self):
+        """One row per stage: latency percentiles, queue wait, tokens, cache and cost."""
+        by_stage = {}
+        for span in self.spans():
+            by_stage.setdefault(span.stage, []).append(span)
+
+        rows = []
+        for stage, spans in by_stage.items():
+            latency = percentiles([s.wall_seconds for s in spans])
+            rows.append({
+                "stage": stage,
+                "spans": len(spans),
+                "skipped": sum(1 for s in spans if s.status == "skipped"),
+                "errors": sum(1 for s in spans if s.status == "error"),
+                "p50_ms": latency["p50_ms"],
+                "p95_ms": latency["p95_ms"],
+                "max_ms": latency["max_ms"],
+                "total_s": round(sum(s.wall_seconds for s in spans), 3),
+                "queue_wait_s": round(sum(s.queue_wait for s in spans), 3),
+                "model_s": round(sum(s.model_seconds for s in spans), 3),
+                "write_s": round(sum(s.write_seconds for s in spans), 3),
+                "cache_hits": sum(s.cache_hits for s in spans),
+                "cache_misses": sum(s.cache_misses for s in spans),
+                "coalesced": sum(s.coalesced for s in spans),
+                "retries": sum(s.retries for s in spans),
+                "prompt_tokens": sum(s.prompt_tokens for s in spans),
+                "completion_tokens": sum(s.completion_tokens for s in spans),
+                "cost_usd": round(sum(s.cost_usd for s in spans), 6),
+            })
+        return rows
+
+    def to_json(self, indent=2):
+        return json.dumps(
+            {"stages": self.stage_table(), "spans": [span.to_dict() for span in self.spans()]},
+            indent=indent,
+        )
+
+    def to_openmetrics(self, prefix="qa_stage"):
+        """Per-stage summaries and counters in OpenMetrics text format."""
+        by_stage = {}
+        for span in self.spans():
+            by_stage.setdefault(span.stage, []).append(span)
+
+        lines = [
+            f"# TYPE {prefix}_seconds summary",
+            f"# UNIT {prefix}_seconds seconds",
+            f"# HELP {prefix}_seconds Wall time per file and stage.",
+        ]
+        for stage, spans in by_stage.items():
+            ordered = sorted(s.wall_seconds for s in spans)
+            for q in (0.5, 0.95, 0.99):
+                value = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+                lines.append(f'{prefix}_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{prefix}_seconds_sum{{stage="{stage}"}} {sum(ordered):.6f}')
+            lines.append(f'{prefix}_seconds_count{{stage="{stage}"}} {len(ordered)}')
+
+        counters = [
+            ("queue_wait_seconds", "Time spent queued before the stage started.", lambda s: s.queue_wait),
+            ("model_seconds", "Time spent in model calls, including retries.", lambda s: s.model_seconds),
+            ("write_seconds", "Time spent writing outputs.", lambda s: s.write_seconds),
+            ("cache_hits", "Model calls served from the response cache.", lambda s: s.cache_hits),
+            ("cache_misses", "Model calls sent to the provider.", lambda s: s.cache_misses),
+            ("coalesced", "Model calls that shared an identical in-flight request.", lambda s: s.coalesced),
+            ("retries", "Retried model call attempts.", lambda s: s.retries),
+            ("prompt_tokens", "Prompt tokens reported by the provider.", lambda s: s.prompt_tokens),
+            ("completion_tokens", "Completion tokens reported by the provider.", lambda s: s.completion_tokens),
+            ("cost_usd", "Estimated model cost in USD.", lambda s: s.cost_usd),
+        ]
+        for name, help_text, value in counters:
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            for stage, spans in by_stage.items():
+                total = sum(value(s) for s in spans)
+                lines.append(f'{prefix}_{name}_total{{stage="{stage}"}} {total:g}')
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
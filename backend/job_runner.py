@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from backend.orchestrator_multi import OrchestratorMulti, DEFAULT_MAX_WORKERS
+from backend.source_discovery import DEFAULT_EXCLUDE, DEFAULT_INCLUDE, SourceScanner
+
+DEFAULT_JOB_DB = os.getenv("JOB_RUNNER_DB", ".cache/jobs.sqlite")
+DEFAULT_MAX_JOBS = int(os.getenv("JOB_RUNNER_MAX_JOBS", "2"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class JobRunner:
+    """Background queue that runs :class:`OrchestratorMulti` jobs off the UI thread.
+
+    Jobs execute on a small thread pool (``max_jobs`` at a time) and their
+    state is persisted in a SQLite table, so a page reload or a second
+    browser can look a job up again by id. Submitting a job identical to
+    one that is still queued or running returns the existing job id
+    instead of doing the work twice. Jobs left active by a previous
+    process are marked ``interrupted`` at start-up.
+    """
+
+    def __init__(self, db_path=DEFAULT_JOB_DB, max_jobs=DEFAULT_MAX_JOBS, analysis_cache=None):
+        self.db_path = db_path
+        self.analysis_cache = analysis_cache
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_jobs), thread_name_prefix="qa-job")
+        self._lock = threading.Lock()
+        self._live = {}  # job_id -> {"orchestrator": ..., "cancel": Event}
+        self._conn = None
+        self._init_db()
+
+    # ----------------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------------
+    def _connection(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.db_path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def _init_db(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT,
+                    progress TEXT
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_fingerprint ON jobs (fingerprint, status)")
+            conn.execute(
+                "UPDATE jobs SET status = 'interrupted', finished_at = ? WHERE status IN (?, ?)",
+                (time.time(), *ACTIVE_STATUSES),
+            )
+            conn.commit()
+
+    def _update(self, job_id, **fields):
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            conn = self._connection()
+            conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+
+    @staticmethod
+    def fingerprint(file_paths, incremental):
+        """Identity of a job: the same files with the same options."""
+        return JobRunner._hash({
+            "files": sorted(os.path.abspath(p) for p in file_paths), "incremental": bool(incremental),
+        })
+
+    @staticmethod
+    def _hash(identity):
+        payload = json.dumps(identity, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # ----------------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------------
+    def submit(self, file_paths, max_workers=DEFAULT_MAX_WORKERS, incremental=True, stream=True):
+        """Queue a run over ``file_paths`` and return its job id (deduplicated)."""
+        file_paths = list(file_paths)
+        params = {
+            "file_paths": file_paths, "max_workers": max_workers,
+            "incremental": incremental, "stream": stream,
+        }
+        return self._enqueue(self.fingerprint(file_paths, incremental), params, file_paths)
+
+    def submit_directory(self, root, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE, gitignore=True,
+                         max_workers=DEFAULT_MAX_WORKERS, incremental=True, stream=True):
+        """Queue a run over every matching file below ``root``, discovered while the job runs."""
+        params = {
+            "root": os.path.abspath(root), "include": list(include), "exclude": list(exclude),
+            "gitignore": gitignore, "max_workers": max_workers, "incremental": incremental, "stream": stream,
+        }
+        identity = ("root", "include", "exclude", "gitignore", "incremental")
+        fingerprint = self._hash({key: params[key] for key in identity})
+        scanner = SourceScanner(root, include=include, exclude=exclude, gitignore=gitignore)
+        return self._enqueue(fingerprint, params, scanner)
+
+    def _enqueue(self, fingerprint, params, file_paths):
+        max_workers, incremental, stream = params["max_workers"], params["incremental"], params["stream"]
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE fingerprint = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (fingerprint, *ACTIVE_STATUSES),
+            ).fetchone()
+            if row is not None:
+                return row["id"]
+
+            job_id = uuid.uuid4().hex[:12]
+            conn.execute(
+                "INSERT INTO jobs (id, fingerprint, status, params, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, fingerprint, json.dumps(params), time.time()),
+            )
+            conn.commit()
+            cancel = threading.Event()
+            orchestrator = OrchestratorMulti(
+                file_paths, max_workers=max_workers, incremental=incremental, stream=stream,
+                analysis_cache=self.analysis_cache, cancel_event=cancel,
+            )
+            self._live[job_id] = {"orchestrator": orchestrator, "cancel": cancel}
+
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def _run(self, job_id):
+        live = self._live[job_id]
+        orchestrator, cancel = live["orchestrator"], live["cancel"]
+        if cancel.is_set():
+            self._update(job_id, status="cancelled", finished_at=time.time())
+            self._forget(job_id)
+            return
+
+        self._update(job_id, status="running", started_at=time.time())
+        results = {}
+        try:
+            for index, filename, summary in orchestrator.iter_results():
+                results[index] = {"filename": filename, "summary": summary}
+            status, error = ("cancelled" if cancel.is_set() else "done"), None
+        except Exception as e:
+            status, error = "failed", str(e)
+        result = {
+            "files": [results[index] for index in sorted(results)],
+            "skipped_summary": orchestrator.skipped_summary() if orchestrator.incremental else None,
+            "dedup_summary": orchestrator.dedup_summary() if orchestrator.dedup.stats()["functions"] else None,
+        }
+        self._update(
+            job_id, status=status, finished_at=time.time(), result=json.dumps(result), error=error,
+            progress=json.dumps({
+                "progress": orchestrator.tracker.progress(),
+                "stage_table": orchestrator.stage_table(),
+                "openmetrics": orchestrator.spans.to_openmetrics(),
+            }),
+        )
+        self._forget(job_id)
+
+    def _forget(self, job_id):
+        with self._lock:
+            self._live.pop(job_id, None)
+
+    def cancel(self, job_id):
+        """Ask a queued or running job to stop; returns ``False`` if it already finished."""
+        with self._lock:
+            live = self._live.get(job_id)
+        if live is None:
+            return False
+        live["cancel"].set()
+        return True
+
+    def get(self, job_id):
+        """Job record with live progress while running; ``None`` for unknown ids."""
+        with self._lock:
+            row = self._connection().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            live = self._live.get(job_id)
+        if row is None:
+            return None
+
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        saved = json.loads(job.pop("progress") or "{}")
+        if live is not None:
+            orchestrator = live["orchestrator"]
+            job["progress"] = orchestrator.tracker.progress()
+            job["stage_table"] = orchestrator.stage_table()
+            job["openmetrics"] = orchestrator.spans.to_openmetrics()
+            job["cancel_requested"] = live["cancel"].is_set()
+        else:
+            job["progress"] = saved.get("progress", {})
+            job["stage_table"] = saved.get("stage_table", [])
+            job["openmetrics"] = saved.get("openmetrics", "")
+        return job
+
+    def events(self, job_id, since=0):
+        """Progress events of a running job newer than ``since``."""
+        with self._lock:
+            live = self._live.get(job_id)
+        return live["orchestrator"].tracker.events_since(since) if live else []
+
+    def list_jobs(self, limit=20):
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT id, status, created_at, started_at, finished_at FROM jobs "
+                "ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            for live in self._live.values():
+                live["cancel"].set()
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import weakref
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI, DefaultHttpxClient
+
+
+class Usage:
+    """Token counts reported by a provider for one request."""
+
+    def __init__(self, prompt_tokens=None, completion_tokens=None, total_tokens=None):
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+        if total_tokens is None and prompt_tokens is not None and completion_tokens is not None:
+            total_tokens = prompt_tokens + completion_tokens
+        self.total_tokens = total_tokens
+
+
+class ModelResult:
+    """Text returned by a provider plus the token usage it reported."""
+
+    def __init__(self, text: str, usage=None):
+        self.text = text
+        self.usage = usage or Usage()
+
+    @property
+    def total_tokens(self):
+        return self.usage.total_tokens
+
+
+class ProviderError(Exception):
+    """Provider failure carrying an HTTP-like ``status_code`` for the retry policy."""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after_seconds = retry_after
+
+
+class ModelProvider:
+    """Backend that turns a prompt (or chat messages) into text.
+
+    ``AIClient`` adds caching, rate limiting and retries on top, so a
+    provider only performs single attempts. Pass ``prompt`` for the
+    Responses-style single input or ``messages`` for a chat exchange.
+    """
+
+    name = "base"
+
+    def complete(self, model, prompt=None, messages=None) -> ModelResult:
+        raise NotImplementedError
+
+    async def acomplete(self, model, prompt=None, messages=None) -> ModelResult:
+        raise NotImplementedError
+
+    def stream(self, model, prompt=None, messages=None):
+        """Yield ``(delta, usage)``; ``usage`` is a :class:`Usage` on the last item only."""
+        result = self.complete(model, prompt=prompt, messages=messages)
+        yield result.text, result.usage
+
+
+class OpenAIProvider(ModelProvider):
+    """OpenAI Responses / Chat Completions over pooled keep-alive HTTP clients."""
+
+    name = "openai"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        if not self.api_key:
+            raise ValueError("❌ OpenAI API key missing in .env file.")
+        self._client = None
+        self._client_lock = threading.Lock()
+        # Async HTTP pools are tied to the event loop that created them.
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    @staticmethod
+    def _pool_limits():
+        return httpx.Limits(
+            max_connections=int(os.getenv("AI_HTTP_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("AI_HTTP_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("AI_HTTP_KEEPALIVE_EXPIRY", "60")),
+        )
+
+    @property
+    def client(self):
+        """OpenAI client backed by a pooled keep-alive HTTP client, built on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = OpenAI(
+                        api_key=self.api_key,
+                        max_retries=0,  # retries are handled by AIClient.retry_policy
+                        http_client=DefaultHttpxClient(limits=self._pool_limits()),
+                    )
+        return self._client
+
+    @property
+    def async_client(self):
+        """AsyncOpenAI client for the running event loop, built on first use."""
+        loop = asyncio.get_running_loop()
+        with self._client_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = AsyncOpenAI(
+                    api_key=self.api_key,
+                    max_retries=0,
+                    http_client=DefaultAsyncHttpxClient(limits=self._pool_limits()),
+                )
+                self._async_clients[loop] = client
+        return client
+
+    @staticmethod
+    def _usage(response):
+        """Usage from a Responses (input/output) or Chat (prompt/completion) payload."""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return None
+        prompt = getattr(usage, "input_tokens", None)
+        if prompt is None:
+            prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "output_tokens", None)
+        if completion is None:
+            completion = getattr(usage, "completion_tokens", None)
+        return Usage(prompt, completion, getattr(usage, "total_tokens", None))
+
+    def _result(self, response, chat):
+        if chat:
+            text = response.choices[0].message.content
+        else:
+            text = response.output[0].content[0].text
+        return ModelResult(text.strip(), self._usage(response))
+
+    def complete(self, model, prompt=None, messages=None):
+        if messages is not None:
+            response = self.client.chat.completions.create(model=model, messages=messages)
+        else:
+            response = self.client.responses.create(model=model, input=prompt)
+        return self._result(response, messages is not None)
+
+    async def acomplete(self, model, prompt=None, messages=None):
+        if messages is not None:
+            response = await self.async_client.chat.completions.create(model=model, messages=messages)
+        else:
+            response = await self.async_client.responses.create(model=model, input=prompt)
+        return self._result(response, messages is not None)
+
+    def stream(self, model, prompt=None, messages=None):
+        if messages is not None:
+            stream = self.client.chat.completions.create(
+                model=model, messages=messages, stream=True,
+                stream_options={"include_usage": True},
+            )
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                yield delta or "", self._usage(chunk)
+        else:
+            stream = self.client.responses.create(model=model, input=prompt, stream=True)
+            for event in stream:
+                delta = event.delta if event.type == "response.output_text.delta" else None
+                yield delta or "", self._usage(getattr(event, "response", None))
+
+
+class LocalStubProvider(ModelProvider):
+    """Deterministic offline provider for CI and load testing.
+
+    Responses are rendered from ``template`` and depend only on the model
+    and prompt. Latency is ``latency`` seconds plus up to ``jitter`` more,
+    and a ``failure_rate`` fraction of attempts raise a retryable
+    :class:`ProviderError` (429 or 503). Jitter and failures are derived
+    from a hash of (seed, prompt, attempt number), so a run is reproducible
+    regardless of thread scheduling, and retries of the same prompt can
+    succeed.
+    """
+
+    name = "stub"
+    DEFAULT_TEMPLATE = "[stub:{model}] {digest}\n{prompt_head}"
+
+    def __init__(self, latency=0.0, jitter=0.0, failure_rate=0.0, seed=0,
+                 template=DEFAULT_TEMPLATE, chunk_size=32):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.template = template
+        self.chunk_size = max(1, chunk_size)
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.injected_failures = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.getenv("STUB_LATENCY_MS", "0")) / 1000.0,
+            jitter=float(os.getenv("STUB_JITTER_MS", "0")) / 1000.0,
+            failure_rate=float(os.getenv("STUB_FAILURE_RATE", "0")),
+            seed=int(os.getenv("STUB_SEED", "0")),
+        )
+
+    @staticmethod
+    def _input_text(prompt, messages):
+        if messages is not None:
+            return "\n".join(str(m.get("content", "")) for m in messages)
+        return prompt or ""
+
+    def _fraction(self, *parts):
+        digest = hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def _plan(self, model, text):
+        """Decide delay and failure for this attempt of ``text``."""
+        key = hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+            self.calls += 1
+        delay = self.latency + self.jitter * self._fraction(self.seed, key, attempt, "latency")
+        fail = self._fraction(self.seed, key, attempt, "failure") < self.failure_rate
+        if fail:
+            with self._lock:
+                self.injected_failures += 1
+        return key, delay, fail
+
+    def _render(self, model, text, key):
+        head = text.strip()[:200]
+        body = self.template.format(model=model, digest=key[:12], prompt_head=head)
+        return ModelResult(body, Usage(len(text) // 4 + 1, len(body) // 4 + 1))
+
+    def _failure(self, key):
+        status = 429 if int(key[:2], 16) % 2 == 0 else 503
+        return ProviderError(f"⚠️ Injected stub failure ({status})", status_code=status)
+
+    def complete(self, model, prompt=None, messages=None):
+        text = self._input_text(prompt, messages)
+        key, delay, fail = self._plan(model, text)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise self._failure(key)
+        return self._render(model, text, key)
+
+    async def acomplete(self, model, prompt=None, messages=None):
+        text = self._input_text(prompt, messages)
+        key, delay, fail = self._plan(model, text)
+        if delay:
+            await asyncio.sleep(delay)
+        if fail:
+            raise self._failure(key)
+        return self._render(model, text, key)
+
+    def stream(self, model, prompt=None, messages=None):
+        text = self._input_text(prompt, messages)
+        key, delay, fail = self._plan(model, text)
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise self._failure(key)
+        result = self._render(model, text, key)
+        pieces = [result.text[i:i + self.chunk_size] for i in range(0, len(result.text), self.chunk_size)]
+        for i, piece in enumerate(pieces):
+            yield piece, result.usage if i == len(pieces) - 1 else None
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "injected_failures": self.injected_failures}
+
+
+def provider_from_env():
+    """Build the provider selected by ``AI_PROVIDER`` (``openai`` or ``stub``)."""
+    name = os.getenv("AI_PROVIDER", "openai").strip().lower()
+    if name == "stub":
+        return LocalStubProvider.from_env()
+    if name == "openai":
+        return OpenAIProvider()
+    raise ValueError(f"❌ Unknown AI_PROVIDER '{name}'. Use 'openai' or 'stub'.")
@@ -1,71 +1,636 @@
+import asyncio
+import itertools
 import os
-from pathlib import Path
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from backend.ai_client import AIClient, DEFAULT_MODEL
+from backend.analysis_cache import AnalysisCache
+from backend.behave_suite import BehaveSuite
 from backend.requirements_generator import RequirementsGenerator
 from backend.gherkin_generator import GherkinGenerator
-from backend.code_updater import CodeUpdater
+from backend.code_updater import CODE_UPDATE_MODE, CodeUpdater
+from backend.chunker import (
+    ChunkedGenerator, ModuleChunker, merge_code, merge_features, merge_sections, split_sections,
+)
+from backend.cpu_tasks import CPU_OFFLOAD_MIN_FILES, DEFAULT_CPU_WORKERS, check_output, make_cpu_pool
+from backend.file_saver import ArtifactWriter
+from backend.function_dedup import DedupIndex, ReusedOutput
+from backend.instrumentation import SpanRecorder
+from backend.run_manifest import RunManifest
+from backend.status_tracker import StatusTracker
+from backend.step_index import StepIndex
+from backend.app_utils.prompt_library import PromptLibrary
+
+DEFAULT_MAX_WORKERS = int(os.getenv("ORCHESTRATOR_MAX_WORKERS", "4"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("ORCHESTRATOR_MAX_CONCURRENCY", "64"))
+DISCOVERY_BATCH = 256
+DEDUP_ENABLED = os.getenv("ORCHESTRATOR_DEDUP", "1").lower() not in ("0", "false", "no")
+
+
+class RunCancelled(Exception):
+    """Raised inside a run once its ``cancel_event`` is set."""
 
 
 class OrchestratorMulti:
     """Handles automation workflow for multiple Python files."""
 
-    def __init__(self, file_paths):
-        self.file_paths = file_paths
-        self.output_dir = Path("generated_outputs")
+    def __init__(self, file_paths, max_workers=DEFAULT_MAX_WORKERS, incremental=True, stream=False,
+                 analysis_cache=None, output_dir="generated_outputs", tracker=None, cancel_event=None,
+                 cpu_workers=DEFAULT_CPU_WORKERS, archive=False, code_update_mode=CODE_UPDATE_MODE,
+                 dedup=DEDUP_ENABLED, source_root=None):
+        # A list is processed as given; any other iterable (e.g. a SourceScanner)
+        # is consumed lazily, so the first files start while the rest are found.
+        if isinstance(file_paths, (list, tuple)):
+            self.file_paths, self._source = list(file_paths), None
+            source_root = source_root or self._common_folder(self.file_paths)
+        else:
+            source_root = source_root or getattr(file_paths, "root", None)
+            self.file_paths, self._source = [], iter(file_paths)
+        # Outputs mirror each source's path below this folder, so same-named
+        # modules in different packages never share artifacts.
+        self.source_root = os.path.abspath(source_root) if source_root else None
+        self.max_workers = max(1, int(max_workers or 1))
+        self.incremental = incremental
+        self.stream = stream
+        self.output_dir = Path(output_dir)
         self.requirements_dir = self.output_dir / "requirements"
         self.gherkin_dir = self.output_dir / "gherkin"
         self.updated_dir = self.output_dir / "updated_code"
+        self.behave_dir = self.output_dir / "behave"  # runnable suite exported from the Gherkin replies
 
         # Ensure folders exist
         for folder in [self.output_dir, self.requirements_dir, self.gherkin_dir, self.updated_dir]:
             folder.mkdir(parents=True, exist_ok=True)
 
-    def process_all(self):
-        """Process all input Python files end-to-end."""
-        results = []
+        self.analysis_cache = analysis_cache if analysis_cache is not None else AnalysisCache()
+        self.writer = ArtifactWriter(self.output_dir)
+        self.archive = archive
+        self.code_update_mode = code_update_mode
+        self.step_index = StepIndex(str(self.output_dir / ".step_index.json"))
+        self._reusable_steps = None
+        self.manifest = RunManifest(str(self.output_dir / ".run_manifest.json"))
+        # Modules that structurally duplicate an earlier one reuse its outputs.
+        self.dedup = DedupIndex(reuse=dedup)
+        self.stats = {"stages_run": 0, "stages_skipped": 0, "stages_deduped": 0}
+        self._stats_lock = threading.Lock()
+        self.spans = SpanRecorder()
+        self.tracker = tracker if tracker is not None else StatusTracker(
+            total_files=len(self.file_paths), discovering=self._source is not None
+        )
+        self.cancel_event = cancel_event
+        self.cpu_workers = cpu_workers
+        self._cpu_pool = None
+        self._discovered = None  # feeds lazily discovered paths to the prefetcher
+        self._stage_pool = None  # shared by Gherkin stages and chunk maps during a threaded run
+        self.warnings = {}
+        self.reuse_outcomes = {}  # file_key -> {stage: True if adapted, False if the fallback ran}
+
+    @staticmethod
+    def _common_folder(file_paths):
+        try:
+            return os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in file_paths]) or None
+        except ValueError:  # no paths, or paths on different drives
+            return None
 
-        for file_path in self.file_paths:
-            filename = Path(file_path).name
+    def _file_key(self, file_path):
+        """Source path relative to ``source_root`` (POSIX style).
 
+        Keys the manifest, progress and summaries, and names the outputs.
+        Sources outside the root keep their whole absolute path.
+        """
+        path = os.path.abspath(file_path)
+        if self.source_root is not None:
             try:
-                # 1️⃣ Load Python code
-                with open(file_path, "r", encoding="utf-8") as f:
-                    code_text = f.read()
+                relative = os.path.relpath(path, self.source_root)
+            except ValueError:
+                relative = os.pardir
+            if relative != os.pardir and not relative.startswith(os.pardir + os.sep):
+                return Path(relative).as_posix()
+        return Path(os.path.splitdrive(path)[1]).as_posix().lstrip("/")
+
+    @contextmanager
+    def _cpu_offload(self):
+        """Run parsing and output checks in a process pool for large runs.
+
+        Model calls stay on threads/asyncio; the pool only receives compact
+        picklable payloads (paths and text). Small file lists stay inline,
+        where process start-up would cost more than it saves. Lazily
+        discovered sources cannot be counted up front, so they always use
+        the pool and are prefetched as the scan finds them.
+        """
+        lazy = self._source is not None
+        if self.cpu_workers <= 1 or (not lazy and len(self.file_paths) < CPU_OFFLOAD_MIN_FILES):
+            yield
+            return
+
+        pool = make_cpu_pool(self.cpu_workers)
+        if lazy:
+            self._discovered = queue.Queue()
+            paths = iter(self._discovered.get, None)
+        else:
+            paths = self.file_paths
+        prefetcher = threading.Thread(
+            target=self.analysis_cache.prefetch, args=(paths, pool, self.cpu_workers * 4),
+            name="qa-prefetch", daemon=True,
+        )
+        self._cpu_pool = pool
+        prefetcher.start()
+        try:
+            yield
+        finally:
+            self._cpu_pool = None
+            if self._discovered is not None:
+                self._discovered.put(None)  # discovery may have stopped early
+                self._discovered = None
+            pool.shutdown(wait=True, cancel_futures=True)
+            prefetcher.join()
+
+    def _add_warnings(self, file_key, warnings):
+        if warnings:
+            with self._stats_lock:
+                self.warnings.setdefault(file_key, []).extend(warnings)
+
+    def _check_output(self, file_key, stage, output):
+        pool = self._cpu_pool
+        if pool is not None:
+            self._add_warnings(file_key, pool.submit(check_output, stage, output).result())
+        else:
+            self._add_warnings(file_key, check_output(stage, output))
+
+    async def _acheck_output(self, file_key, stage, output):
+        pool = self._cpu_pool
+        if pool is not None:
+            warnings = await asyncio.get_running_loop().run_in_executor(pool, check_output, stage, output)
+            self._add_warnings(file_key, warnings)
+        else:
+            self._add_warnings(file_key, check_output(stage, output))
+
+    def _start_run(self):
+        """Index the step definitions already generated and freeze them for this run.
+
+        Every Gherkin prompt of the run offers the same existing steps, so
+        prompts (and cached responses) do not depend on completion order.
+        """
+        self._reusable_steps = self.step_index.refresh(str(self.gherkin_dir)).snapshot()
+        self.dedup.reset_outputs()
+
+    def _index_steps(self, gherkin_path, output):
+        self.step_index.add(gherkin_path, output)
+
+    def _finish_run(self):
+        """Export the Behave suite, sync the run's outputs and pack them when ``archive`` is set."""
+        BehaveSuite(self.gherkin_dir, self.behave_dir, self.writer).export()
+        self.writer.flush()
+        self.step_index.save()
+        if self.archive:
+            self.writer.pack()
+
+    def _sources(self):
+        """Yield ``(index, path)``, appending lazily discovered paths to ``file_paths``."""
+        if self._source is None:
+            yield from enumerate(list(self.file_paths))
+            return
+        for path in self._source:
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                break
+            index = len(self.file_paths)
+            self.file_paths.append(path)
+            self.tracker.add_files()
+            if self._discovered is not None:
+                self._discovered.put(path)
+            yield index, path
+        self._source = None  # reruns reuse the discovered list
+        if self._discovered is not None:
+            self._discovered.put(None)
+        self.tracker.discovery_done()
+
+    def _check_cancelled(self):
+        """Stop at the next file or stage boundary once cancellation was requested."""
+        if self.cancel_event is not None and self.cancel_event.is_set():
+            raise RunCancelled("Run cancelled")
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _stage_fingerprints(self, source_hash, code_update_mode=None):
+        """Fingerprint each stage from source, prompt template, provider and model."""
+        model = f"{AIClient.shared().provider.name}:{DEFAULT_MODEL}"  # stub outputs never look fresh to openai
+        req_fp = RunManifest.fingerprint(
+            source_hash, PromptLibrary.template_hash("requirements_prompt"), model
+        )
+        update_parts = [
+            source_hash, PromptLibrary.template_hash("code_updater_prompt"), model, req_fp
+        ]
+        if (code_update_mode or self.code_update_mode) == "diff":
+            update_parts.append(PromptLibrary.template_hash("code_patch_prompt"))
+        return {
+            "requirements": req_fp,
+            "gherkin": RunManifest.fingerprint(
+                source_hash, PromptLibrary.template_hash("gherkin_prompt"), model, req_fp
+            ),
+            "updated_code": RunManifest.fingerprint(*update_parts),
+        }
+
+    def _reuse_stage(self, file_key, stage, fingerprint, output_path):
+        """Return the previous output if the stage is up to date, else ``None``."""
+        if self.incremental and self.manifest.is_fresh(file_key, stage, fingerprint, output_path):
+            self._count("stages_skipped")
+            self.writer.track(output_path)
+            with open(output_path, "r", encoding="utf-8") as f:
+                return f.read()
+        return None
+
+    def _store_stage(self, file_key, stage, fingerprint, output_path, output):
+        self.writer.write(output_path, output)
+        self._record_stage(file_key, stage, fingerprint, output_path)
+
+    def _record_stage(self, file_key, stage, fingerprint, output_path):
+        self.manifest.record(file_key, stage, fingerprint, output_path)
+        self._count("stages_run")
+
+    def _finish_stage(self, file_key, stage, generator, output):
+        """Publish a stage output to duplicates and account for reuse and warnings."""
+        self.dedup.publish(file_key, stage, output)
+        if getattr(generator, "reused", False):
+            self._count("stages_deduped")
+        if isinstance(generator, ReusedOutput):
+            with self._stats_lock:
+                self.reuse_outcomes.setdefault(file_key, {})[stage] = generator.reused
+        self._add_warnings(file_key, getattr(generator, "warnings", None))
+
+    def _run_stage(self, file_key, stage, fingerprint, output_path, generator, queued_at=None):
+        """Run ``generator`` and write its output unless the stage is up to date.
+
+        In streaming mode the output is written to a ``.partial`` file chunk
+        by chunk as it arrives. Returns ``(output_text, skipped)``.
+        """
+        self._check_cancelled()
+        with self.spans.span(file_key, stage, queued_at) as span:
+            previous = self._reuse_stage(file_key, stage, fingerprint, output_path)
+            if previous is not None:
+                span.status = "skipped"
+                self.dedup.publish(file_key, stage, previous)
+                self.tracker.stage_done(file_key, stage, skipped=True)
+                return previous, True
+
+            if self.stream:
+                output = "".join(self.writer.stream(output_path, generator.stream())).strip()
+                self._record_stage(file_key, stage, fingerprint, output_path)
+            else:
+                output = generator.process()
+                with span.timed_write():
+                    self._store_stage(file_key, stage, fingerprint, output_path, output)
+            self._finish_stage(file_key, stage, generator, output)
+            self._check_output(file_key, stage, output)
+            self.tracker.stage_done(file_key, stage)
+            return output, False
+
+    async def _arun_stage(self, file_key, stage, fingerprint, output_path, generator, semaphore):
+        """Async variant of :meth:`_run_stage`; ``semaphore`` bounds in-flight model calls.
+
+        Manifest checks and artifact writes run on worker threads, off the event loop.
+        """
+        self._check_cancelled()
+        with self.spans.span(file_key, stage) as span:
+            previous = await asyncio.to_thread(self._reuse_stage, file_key, stage, fingerprint, output_path)
+            if previous is not None:
+                span.status = "skipped"
+                self.dedup.publish(file_key, stage, previous)
+                self.tracker.stage_done(file_key, stage, skipped=True)
+                return previous, True
+
+            if isinstance(generator, (ChunkedGenerator, ReusedOutput)):
+                output = await generator.aprocess(semaphore)
+            else:
+                waiting = time.perf_counter()
+                async with semaphore:
+                    span.add_wait(time.perf_counter() - waiting)
+                    output = await generator.aprocess()
+            with span.timed_write():
+                await asyncio.to_thread(self._store_stage, file_key, stage, fingerprint, output_path, output)
+            self._finish_stage(file_key, stage, generator, output)
+            await self._acheck_output(file_key, stage, output)
+            self.tracker.stage_done(file_key, stage)
+            return output, False
+
+    def _analyse(self, file_path, queued_at=None):
+        """Parse ``file_path`` (cached) and derive its fingerprints, chunks and duplicate match."""
+        self._check_cancelled()
+        file_key = self._file_key(file_path)
+        self.tracker.start_file(file_key, file_key)
+        with self.spans.span(file_key, "parse", queued_at):
+            analysis = self.analysis_cache.get(file_path)
+            match = self.dedup.register(file_key, analysis.dedup_profile())
+            result = analysis, self._stage_fingerprints(analysis.source_hash), self._chunks(analysis), match
+        self.tracker.stage_done(file_key, "parse")
+        return result
 
-                # 2️⃣ Generate Requirements
-                req_gen = RequirementsGenerator(code_text, filename)
-                requirements_output = req_gen.process()
+    # ----------------------------------------------------------------
+    # Stage generators (chunked map-reduce for very large modules)
+    # ----------------------------------------------------------------
+    @staticmethod
+    def _chunks(analysis):
+        """Chunks for large modules, or ``None`` to process the file whole."""
+        if not ModuleChunker.should_chunk(analysis):
+            return None
+        chunks = ModuleChunker(analysis).chunks()
+        return chunks if len(chunks) > 1 else None
 
-                req_path = self.requirements_dir / f"{filename.replace('.py', '_requirements.md')}"
-                with open(req_path, "w", encoding="utf-8") as f:
-                    f.write(requirements_output)
+    def _requirements_generator(self, analysis, chunks):
+        if chunks is None:
+            return RequirementsGenerator(analysis.code_text, analysis.filename, analysis=analysis)
+        return ChunkedGenerator(
+            chunks,
+            lambda chunk: RequirementsGenerator(chunk.code_text, analysis.filename, analysis=chunk.analysis),
+            lambda chunks, outputs: merge_sections(chunks, outputs, f"# Requirements — {analysis.filename}"),
+            self.max_workers, executor=self._stage_pool,
+        )
 
-                # 3️⃣ Generate Gherkin (using code + requirements)
-                gherkin_gen = GherkinGenerator(code_text, requirements_output, filename)
-                gherkin_output = gherkin_gen.process()
+    def _gherkin_generator(self, analysis, chunks, requirements_output, output_path=None):
+        steps = self._reusable_steps
+        if chunks is None:
+            return GherkinGenerator(
+                analysis.code_text, requirements_output, analysis.filename, analysis=analysis,
+                step_index=steps, output_path=output_path,
+            )
+        sections = split_sections(requirements_output, len(chunks))
+        return ChunkedGenerator(
+            chunks,
+            lambda chunk: GherkinGenerator(
+                chunk.code_text, sections[chunk.index], analysis.filename, analysis=chunk.analysis,
+                step_index=steps, output_path=output_path,
+            ),
+            merge_features,
+            self.max_workers, executor=self._stage_pool,
+        )
 
-                gherkin_path = self.gherkin_dir / f"{filename.replace('.py', '.feature')}"
-                with open(gherkin_path, "w", encoding="utf-8") as f:
-                    f.write(gherkin_output)
+    def _code_updater(self, analysis, chunks, requirements_output, mode=None):
+        mode = mode or self.code_update_mode
+        if chunks is None:
+            return CodeUpdater(
+                requirements_output, analysis.code_text, analysis.filename, analysis=analysis, mode=mode
+            )
+        sections = split_sections(requirements_output, len(chunks))
+        return ChunkedGenerator(
+            chunks,
+            lambda chunk: CodeUpdater(
+                sections[chunk.index], chunk.code_text, analysis.filename, analysis=chunk.analysis, mode=mode
+            ),
+            merge_code,
+            self.max_workers, executor=self._stage_pool,
+        )
 
-                # 4️⃣ Generate Updated Code (simulating new requirement addition)
-                updater = CodeUpdater(code_text, requirements_output, filename)
-                updated_code = updater.process()
+    def _deduped(self, match, stage, generator):
+        """Reuse the matching module's output for ``stage`` when the match allows it."""
+        if match is None or not match.reuses(stage):
+            return generator
+        return ReusedOutput(self.dedup, match, stage, generator)
 
-                updated_path = self.updated_dir / filename
-                with open(updated_path, "w", encoding="utf-8") as f:
-                    f.write(updated_code)
+    def _paths(self, file_key):
+        """Output paths mirroring ``file_key`` (see :meth:`_file_key`) under each output folder."""
+        relative = PurePosixPath(file_key)
+        return (
+            self.requirements_dir / relative.parent / relative.name.replace('.py', '_requirements.md'),
+            self.gherkin_dir / relative.parent / relative.name.replace('.py', '.feature'),
+            self.updated_dir / relative,
+        )
 
-                # 5️⃣ Summary for display
-                summary = f"""
-                ✅ **{filename} processed successfully**
-                - 📘 Requirements → `{req_path}`
-                - 🧩 Gherkin → `{gherkin_path}`
-                - 🔁 Updated Code → `{updated_path}`
-                """
+    def _process_file(self, file_path, stage_pool=None, queued_at=None):
+        """Run every stage for one file and return its display summary."""
+        file_key = self._file_key(file_path)
 
-                results.append(summary)
+        try:
+            # 1️⃣ Load and analyse Python code
+            analysis, fingerprints, chunks, match = self._analyse(file_path, queued_at)
+            req_path, gherkin_path, updated_path = self._paths(file_key)
 
-            except Exception as e:
-                results.append(f"❌ Error processing {filename}: {e}")
+            # 2️⃣ Generate Requirements
+            requirements_output, req_skipped = self._run_stage(
+                file_key, "requirements", fingerprints["requirements"], req_path,
+                self._deduped(match, "requirements", self._requirements_generator(analysis, chunks)),
+            )
+
+            # 3️⃣ Gherkin and 4️⃣ Updated Code only depend on the requirements,
+            # so they may run side by side once those are available.
+            gherkin_args = (
+                file_key, "gherkin", fingerprints["gherkin"], gherkin_path,
+                self._deduped(match, "gherkin",
+                              self._gherkin_generator(analysis, chunks, requirements_output, gherkin_path)),
+            )
+            update_args = (
+                file_key, "updated_code", fingerprints["updated_code"], updated_path,
+                self._deduped(match, "updated_code", self._code_updater(analysis, chunks, requirements_output)),
+            )
+            # Duplicates wait on their leader's stages, so they never occupy
+            # the stage pool the leader's Gherkin stage needs.
+            if stage_pool is not None and match is None:
+                gherkin_future = stage_pool.submit(self._run_stage, *gherkin_args, time.perf_counter())
+                _, update_skipped = self._run_stage(*update_args)
+                gherkin_output, gherkin_skipped = gherkin_future.result()
+            else:
+                gherkin_output, gherkin_skipped = self._run_stage(*gherkin_args)
+                _, update_skipped = self._run_stage(*update_args)
+            self._index_steps(gherkin_path, gherkin_output)
+
+            self.manifest.save()
+            self.tracker.finish_file(file_key)
+
+            # 5️⃣ Summary for display
+            return self._summary(
+                file_key, req_path, gherkin_path, updated_path,
+                sum([req_skipped, gherkin_skipped, update_skipped]), chunks, self.warnings.get(file_key), match,
+                self.reuse_outcomes.get(file_key),
+            )
+
+        except RunCancelled:
+            self.tracker.finish_file(file_key, ok=False, message="Cancelled")
+            return f"⏹️ {file_key} cancelled"
+
+        except Exception as e:
+            self.tracker.finish_file(file_key, ok=False, message=str(e))
+            return f"❌ Error processing {file_key}: {e}"
+
+        finally:
+            # Duplicates still waiting on a stage this file never produced fall back to the model.
+            self.dedup.abandon(file_key)
+
+    async def _aprocess_file(self, file_path, semaphore):
+        """Async variant of :meth:`_process_file`."""
+        file_key = self._file_key(file_path)
+
+        try:
+            # Reading and parsing (inline or in the process pool) happen off the event loop.
+            analysis, fingerprints, chunks, match = await asyncio.to_thread(self._analyse, file_path)
+            req_path, gherkin_path, updated_path = self._paths(file_key)
+
+            requirements_output, req_skipped = await self._arun_stage(
+                file_key, "requirements", fingerprints["requirements"], req_path,
+                self._deduped(match, "requirements", self._requirements_generator(analysis, chunks)), semaphore,
+            )
+
+            (gherkin_output, gherkin_skipped), (_, update_skipped) = await asyncio.gather(
+                self._arun_stage(
+                    file_key, "gherkin", fingerprints["gherkin"], gherkin_path,
+                    self._deduped(match, "gherkin",
+                                  self._gherkin_generator(analysis, chunks, requirements_output, gherkin_path)),
+                    semaphore,
+                ),
+                self._arun_stage(
+                    file_key, "updated_code", fingerprints["updated_code"], updated_path,
+                    self._deduped(match, "updated_code", self._code_updater(analysis, chunks, requirements_output)),
+                    semaphore,
+                ),
+            )
+            self._index_steps(gherkin_path, gherkin_output)
+
+            await asyncio.to_thread(self.manifest.save)
+            self.tracker.finish_file(file_key)
+            return self._summary(
+                file_key, req_path, gherkin_path, updated_path,
+                sum([req_skipped, gherkin_skipped, update_skipped]), chunks, self.warnings.get(file_key), match,
+                self.reuse_outcomes.get(file_key),
+            )
+
+        except RunCancelled:
+            self.tracker.finish_file(file_key, ok=False, message="Cancelled")
+            return f"⏹️ {file_key} cancelled"
+
+        except Exception as e:
+            self.tracker.finish_file(file_key, ok=False, message=str(e))
+            return f"❌ Error processing {file_key}: {e}"
+
+        finally:
+            # Duplicates still waiting on a stage this file never produced fall back to the model.
+            self.dedup.abandon(file_key)
+
+    @staticmethod
+    def _summary(filename, req_path, gherkin_path, updated_path, skipped, chunks=None, warnings=None, match=None,
+                 reused=None):
+        skipped_note = f"\n            - ⏭️ {skipped}/3 stages unchanged, reused" if skipped else ""
+        if chunks:
+            skipped_note += f"\n            - 🧱 Processed in {len(chunks)} chunks"
+        if match is not None:
+            labels = {"requirements": "requirements", "gherkin": "Gherkin"}
+            adapted = [labels[stage] for stage, ok in (reused or {}).items() if ok]
+            fallback = [labels[stage] for stage, ok in (reused or {}).items() if not ok]
+            skipped_note += f"\n            - 🧬 {match.kind.capitalize()} duplicate of `{match.leader}`"
+            if adapted:
+                skipped_note += f", {' and '.join(adapted)} adapted"
+            if fallback:
+                skipped_note += f"; leader output unavailable, {' and '.join(fallback)} generated by the model"
+        for warning in warnings or []:
+            skipped_note += f"\n            - ⚠️ {warning}"
+        return f"""
+            ✅ **{filename} processed successfully**
+            - 📘 Requirements → `{req_path}`
+            - 🧩 Gherkin → `{gherkin_path}`
+            - 🔁 Updated Code → `{updated_path}`{skipped_note}
+            """
+
+    def iter_results(self):
+        """Yield ``(index, filename, summary)`` tuples as files finish.
+
+        With ``max_workers == 1`` files run sequentially in input order;
+        otherwise they are processed by a bounded thread pool and yielded in
+        completion order. Files are submitted as they are discovered, with
+        at most ``4 * max_workers`` queued at a time.
+        """
+        self._start_run()
+        with self._cpu_offload():
+            if self.max_workers == 1 or (self._source is None and len(self.file_paths) <= 1):
+                for index, file_path in self._sources():
+                    yield index, self._file_key(file_path), self._process_file(file_path)
+                self._finish_run()
+                return
+
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="qa-file") as file_pool, \
+                    ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="qa-stage") as stage_pool:
+                self._stage_pool = stage_pool
+                try:
+                    futures = {}
+                    for index, file_path in self._sources():
+                        future = file_pool.submit(self._process_file, file_path, stage_pool, time.perf_counter())
+                        futures[future] = index
+                        if len(futures) >= 4 * self.max_workers:
+                            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                index = futures.pop(future)
+                                yield index, self._file_key(self.file_paths[index]), future.result()
+                    for future in as_completed(futures):
+                        index = futures[future]
+                        yield index, self._file_key(self.file_paths[index]), future.result()
+                finally:
+                    self._stage_pool = None
+            self._finish_run()
+
+    def stage_table(self):
+        """Per-stage latency, token and cache figures for this run."""
+        return self.spans.stage_table()
+
+    def skipped_summary(self):
+        """One-line description of how much work the manifest saved."""
+        total = self.stats["stages_run"] + self.stats["stages_skipped"]
+        return f"⏭️ Skipped {self.stats['stages_skipped']} of {total} stages with unchanged inputs."
+
+    def dedup_summary(self):
+        """One-line dedup ratio of the run: duplicate functions and model stages saved."""
+        stats = self.dedup.stats()
+        duplicates = stats["exact_functions"] + stats["near_functions"]
+        return (
+            f"🧬 Dedup: {duplicates} of {stats['functions']} functions duplicate ({stats['duplicate_ratio']:.0%}; "
+            f"{stats['exact_functions']} exact, {stats['near_functions']} near); "
+            f"{stats['exact_modules'] + stats['near_modules']} modules reused outputs, "
+            f"saving {self.stats['stages_deduped']} model stages."
+        )
+
+    async def aprocess_all(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Process every file on the running event loop.
+
+        Files are scheduled as soon as they are discovered (the scan runs off
+        the event loop); ``max_concurrency`` caps the number of model calls in
+        flight. Summaries are returned in input order.
+        """
+        semaphore = asyncio.Semaphore(max(1, int(max_concurrency)))
+        await asyncio.to_thread(self._start_run)
+        with self._cpu_offload():
+            sources, tasks = self._sources(), []
+            while True:
+                batch = await asyncio.to_thread(list, itertools.islice(sources, DISCOVERY_BATCH))
+                if not batch:
+                    break
+                tasks.extend(asyncio.create_task(self._aprocess_file(path, semaphore)) for _, path in batch)
+            results = list(await asyncio.gather(*tasks))
+        await asyncio.to_thread(self._finish_run)
+
+        if self.incremental:
+            results.append(self.skipped_summary())
+        if self.dedup.stats()["functions"]:
+            results.append(self.dedup_summary())
+        return "\n\n".join(results)
+
+    def process_all_async(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """Blocking entry point that runs :meth:`aprocess_all` on a fresh event loop."""
+        return asyncio.run(self.aprocess_all(max_concurrency=max_concurrency))
+
+    def process_batch(self, client=None, poll_interval=30.0, timeout=None):
+        """Process every file through the offline Batch API in dependency waves."""
+        from backend.batch_runner import BatchRunner
+
+        runner = BatchRunner(self, client=client, poll_interval=poll_interval, timeout=timeout)
+        return runner.run()
+
+    def process_all(self):
+        """Process all input Python files end-to-end."""
+        summaries = {index: summary for index, _, summary in self.iter_results()}
+        results = [summaries[index] for index in sorted(summaries)]
 
+        if self.incremental:
+            results.append(self.skipped_summary())
+        if self.dedup.stats()["functions"]:
+            results.append(self.dedup_summary())
         return "\n\n".join(results)
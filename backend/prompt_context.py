@@ -0,0 +1,139 @@
+import os
+from backend.code_parser import PythonCodeParser
+from backend.rate_limiter import RateLimiter
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKENS", "1500"))
+
+
+class PromptContextBuilder:
+    """Builds a compact, budgeted description of a module for prompts.
+
+    The summary from :class:`PythonCodeParser` is rendered at the most
+    detailed level that fits ``token_budget``: full signatures with
+    decorators and docstring headlines first, then bare signatures, then
+    names only, truncating the list as a last resort. Prompt size therefore
+    follows the module's API surface rather than its raw length.
+    """
+
+    def __init__(self, code_text: str, filename: str, token_budget=DEFAULT_TOKEN_BUDGET, summary=None):
+        self.filename = filename
+        self.token_budget = token_budget
+        self.summary = summary if summary is not None else PythonCodeParser(code_text, filename).process()
+
+    @staticmethod
+    def _headline(doc, limit):
+        if not doc or doc == "No description.":
+            return ""
+        line = doc.strip().splitlines()[0]
+        return line if len(line) <= limit else line[: limit - 3] + "..."
+
+    @staticmethod
+    def _signature(func, level):
+        if level == 0:
+            return func["name"]
+
+        params = []
+        for param in func.get("params", []):
+            text = param["name"]
+            if level >= 2 and param.get("annotation"):
+                text += f": {param['annotation']}"
+            if level >= 3 and param.get("default") is not None:
+                text += f" = {param['default']}"
+            params.append(text)
+
+        prefix = "async def" if func.get("is_async") else "def"
+        signature = f"{prefix} {func['name']}({', '.join(params)})"
+        if level >= 2 and func.get("returns"):
+            signature += f" -> {func['returns']}"
+        if level >= 3 and func.get("decorators"):
+            signature = " ".join(f"@{d}" for d in func["decorators"]) + " " + signature
+        return signature
+
+    def _function_line(self, func, level, indent=""):
+        line = indent + "- " + self._signature(func, level)
+        if level >= 2:
+            headline = self._headline(func.get("doc"), 100 if level >= 3 else 60)
+            if headline:
+                line += f" — {headline}"
+        return line
+
+    def _api_lines(self, level):
+        lines = []
+        for cls in self.summary.get("classes", []):
+            header = f"- class {cls['name']}"
+            if level >= 1 and cls.get("bases"):
+                header += f"({', '.join(cls['bases'])})"
+            if level >= 3 and cls.get("decorators"):
+                header = "- " + " ".join(f"@{d}" for d in cls["decorators"]) + " " + header[2:]
+            if level >= 2:
+                headline = self._headline(cls.get("doc"), 100 if level >= 3 else 60)
+                if headline:
+                    header += f" — {headline}"
+            lines.append(header)
+            for method in cls.get("methods", []):
+                lines.append(self._function_line(method, level, indent="  "))
+        for func in self.summary.get("functions", []):
+            lines.append(self._function_line(func, level))
+        return lines
+
+    def _constant_lines(self, level):
+        lines = []
+        for const in self.summary.get("constants", []):
+            text = const["name"]
+            if level >= 2 and const.get("annotation"):
+                text += f": {const['annotation']}"
+            if level >= 1 and const.get("value") is not None:
+                text += f" = {const['value']}"
+            lines.append(text)
+        return lines
+
+    def _module_doc(self, level):
+        doc = self.summary.get("module_doc", "No module description available.")
+        if level >= 3:
+            return doc.strip()
+        return doc.strip().split("\n\n")[0][: 300 if level >= 1 else 120]
+
+    @staticmethod
+    def _tokens(*parts):
+        return sum(RateLimiter.estimate_tokens(part) for part in parts)
+
+    def build(self):
+        """Return ``module_doc``, ``functions_summary`` and ``constants`` for prompts."""
+        for level in (3, 2, 1):
+            module_doc = self._module_doc(level)
+            api = "\n".join(self._api_lines(level))
+            constants = self._constant_lines(level)
+            if self._tokens(module_doc, api, "\n".join(constants)) <= self.token_budget:
+                return {"module_doc": module_doc, "functions_summary": api or "No functions defined.", "constants": constants}
+
+        # Names only, truncated to whatever still fits the budget.
+        module_doc = self._module_doc(0)
+        remaining = self.token_budget - self._tokens(module_doc)
+        kept = []
+        api_lines = self._api_lines(0)
+        for line in api_lines:
+            cost = self._tokens(line)
+            if cost > remaining:
+                break
+            kept.append(line)
+            remaining -= cost
+        if len(kept) < len(api_lines):
+            kept.append(f"- ... and {len(api_lines) - len(kept)} more")
+
+        constants = []
+        for name in self._constant_lines(0):
+            cost = self._tokens(name)
+            if cost > remaining:
+                break
+            constants.append(name)
+            remaining -= cost
+
+        return {"module_doc": module_doc, "functions_summary": "\n".join(kept), "constants": constants}
+
+    def render(self):
+        """Single text block combining all parts, e.g. for the code updater prompt."""
+        context = self.build()
+        text = f"Description: {context['module_doc']}\nAPI:\n{context['functions_summary']}"
+        if context["constants"]:
+            text += "\nConstants: " + ", ".join(context["constants"])
+        return text
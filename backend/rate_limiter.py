@@ -0,0 +1,105 @@
+import asyncio
+import os
+import threading
+import time
+
+
+class _Bucket:
+    """Token bucket refilled continuously at ``capacity`` units per minute."""
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount, now):
+        """Take ``amount`` units and return how long the caller must wait."""
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        self.level -= min(float(amount), self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+
+class RateLimiter:
+    """Client-side limiter enforcing requests-per-minute and tokens-per-minute.
+
+    Callers reserve capacity up front and sleep for however long their
+    reservation puts the bucket in debt, so queued callers are released in
+    order at the configured rate. A limit of ``0``/``None`` disables that
+    bucket. ``pause()`` blocks every caller for a while after a 429.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self._requests = _Bucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_calls = 0
+        self.throttled_seconds = 0.0
+
+    @classmethod
+    def default(cls):
+        """Return the process-wide limiter configured from the environment."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(
+                    requests_per_minute=int(os.getenv("AI_REQUESTS_PER_MINUTE", "0")),
+                    tokens_per_minute=int(os.getenv("AI_TOKENS_PER_MINUTE", "0")),
+                )
+            return cls._default
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Cheap token estimate (~4 characters per token)."""
+        return len(text) // 4 + 1
+
+    def _reserve(self, tokens):
+        now = time.monotonic()
+        with self._lock:
+            wait = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.reserve(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.reserve(tokens, now))
+            if wait > 0:
+                self.throttled_calls += 1
+                self.throttled_seconds += wait
+        return wait
+
+    def acquire(self, tokens=1):
+        """Block until a request of ``tokens`` tokens may be sent."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self, tokens=1):
+        """Async variant of :meth:`acquire`."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def adjust(self, estimated, actual):
+        """Correct a reservation once the real token usage is known."""
+        if self._tokens is None or actual is None:
+            return
+        with self._lock:
+            self._tokens.refund(estimated - actual)
+
+    def pause(self, seconds):
+        """Hold back all callers for ``seconds`` (e.g. after a 429)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "throttled_calls": self.throttled_calls,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
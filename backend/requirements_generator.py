@@ -1,22 +1,32 @@
 from backend.ai_client import AIClient
+from backend.analysis_cache import ModuleAnalysis
 from backend.app_utils.prompt_library import PromptLibrary
 
 class RequirementsGenerator:
     """Generates functional requirements specification from Python code."""
 
-    def __init__(self, py_code: str, filename: str):
+    def __init__(self, py_code: str, filename: str, analysis=None):
         self.py_code = py_code
         self.filename = filename
-        self.ai = AIClient()
+        self.analysis = analysis or ModuleAnalysis(None, filename, py_code, None)
+        self.ai = AIClient.shared()
+
+    def build_prompt(self):
+        """Use centralized prompt to describe the requirements request."""
+        context = self.analysis.prompt_context()
+
+        return PromptLibrary.requirements_prompt(
+            context["module_doc"], context["functions_summary"], context["constants"], self.filename
+        )
 
     def process(self):
         """Use centralized prompt to generate requirements."""
-        module_doc = "Extracted module documentation from code."
-        functions_summary = "Summary of functions extracted from code."
-        constants = []
+        return self.ai.generate_text(self.build_prompt())
 
-        prompt = PromptLibrary.requirements_prompt(
-            module_doc, functions_summary, constants, self.filename
-        )
+    async def aprocess(self):
+        """Async variant of :meth:`process`."""
+        return await self.ai.agenerate_text(self.build_prompt())
 
-        return self.ai.generate_text(prompt)
+    def stream(self):
+        """Yield the response in chunks as the model produces them."""
+        return self.ai.stream_text(self.build_prompt())
@@ -0,0 +1,144 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = os.getenv("AI_CACHE_PATH", ".cache/ai_responses.sqlite")
+
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+class ResponseCache:
+    """Persistent, content-addressed cache for model responses.
+
+    Entries are keyed by a SHA-256 of ``(provider, model, prompt)`` and kept in a small
+    SQLite file. The cache is bounded to ``max_entries`` with least-recently-used
+    eviction, and entries older than ``ttl`` seconds are treated as misses.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=5000, ttl=None, enabled=True):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl) if ttl else None
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    @classmethod
+    def default(cls):
+        """Return the process-wide cache configured from the environment."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(
+                    path=DEFAULT_CACHE_PATH,
+                    max_entries=int(os.getenv("AI_CACHE_MAX_ENTRIES", "5000")),
+                    ttl=float(os.getenv("AI_CACHE_TTL", "0")) or None,
+                    enabled=not _env_flag("AI_CACHE_DISABLED"),
+                )
+            return cls._default
+
+    @staticmethod
+    def make_key(model: str, prompt: str, provider: str = "openai") -> str:
+        digest = hashlib.sha256()
+        # The provider is part of the key so stub replies never answer real requests.
+        digest.update(provider.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(model.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _connection(self):
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+                " created REAL, last_access REAL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, model: str, prompt: str, provider: str = "openai"):
+        """Return the cached response or ``None`` on a miss or when disabled."""
+        if not self.enabled:
+            return None
+
+        key = self.make_key(model, prompt, provider)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, model: str, prompt: str, response: str, provider: str = "openai"):
+        """Store a response, evicting the least recently used entries if full."""
+        if not self.enabled:
+            return
+
+        key = self.make_key(model, prompt, provider)
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_access)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            count = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            conn.commit()
+
+    def clear(self):
+        """Remove every cached entry and reset the counters."""
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            entries = 0
+            if self.enabled:
+                entries = self._connection().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
@@ -0,0 +1,144 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+import openai
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Jittered exponential backoff for transient model API failures.
+
+    Rate limits, timeouts, connection errors and 5xx responses are retried up
+    to ``max_retries`` times. A server-provided ``Retry-After`` header wins
+    over the computed backoff; otherwise the delay is drawn uniformly from
+    ``[0, min(max_delay, base_delay * 2 ** attempt)]`` ("full jitter").
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, max_retries=5, base_delay=1.0, max_delay=60.0, limiter=None):
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retry_seconds = 0.0
+        self.failures = 0
+
+    @classmethod
+    def default(cls, limiter=None):
+        """Return the process-wide policy configured from the environment."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(
+                    max_retries=int(os.getenv("AI_MAX_RETRIES", "5")),
+                    base_delay=float(os.getenv("AI_RETRY_BASE_DELAY", "1.0")),
+                    max_delay=float(os.getenv("AI_RETRY_MAX_DELAY", "60")),
+                    limiter=limiter,
+                )
+            return cls._default
+
+    @staticmethod
+    def status_code(exc):
+        return getattr(exc, "status_code", None)
+
+    @classmethod
+    def is_retryable(cls, exc) -> bool:
+        if isinstance(exc, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        return cls.status_code(exc) in RETRYABLE_STATUS
+
+    @staticmethod
+    def retry_after(exc):
+        """Seconds requested by the server via ``Retry-After``, if any."""
+        requested = getattr(exc, "retry_after_seconds", None)
+        if requested is not None:
+            return float(requested)
+
+        response = getattr(exc, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+
+        retry_ms = headers.get("retry-after-ms")
+        if retry_ms:
+            try:
+                return float(retry_ms) / 1000.0
+            except ValueError:
+                pass
+
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            parsed = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None  # malformed header: fall back to jittered backoff
+        return max(0.0, parsed.timestamp() - time.time())
+
+    def backoff(self, attempt, exc):
+        """Delay before retry number ``attempt`` (0-based)."""
+        requested = self.retry_after(exc)
+        if requested is not None:
+            return min(requested, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _next_delay(self, attempt, exc):
+        """Return the delay before retrying, or ``None`` to give up."""
+        if attempt >= self.max_retries or not self.is_retryable(exc):
+            with self._lock:
+                self.failures += 1
+            return None
+
+        delay = self.backoff(attempt, exc)
+        if self.limiter is not None and self.status_code(exc) == 429:
+            # Slow every caller down, not just this one.
+            self.limiter.pause(delay)
+        with self._lock:
+            self.retries += 1
+            self.retry_seconds += delay
+        return delay
+
+    def call(self, fn):
+        """Call ``fn()`` and retry transient failures."""
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as exc:
+                delay = self._next_delay(attempt, exc)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def acall(self, fn):
+        """Await ``fn()`` and retry transient failures."""
+        attempt = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as exc:
+                delay = self._next_delay(attempt, exc)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "retries": self.retries,
+                "retry_seconds": round(self.retry_seconds, 3),
+                "failures": self.failures,
+            }
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+import threading
+from backend.file_saver import ArtifactWriter
+
+_SAVE_LOCKS = {}  # absolute path -> lock shared by every instance saving that file
+_SAVE_LOCKS_GUARD = threading.Lock()
+
+
+def save_lock(path):
+    """The process-wide lock for saving ``path`` (concurrent jobs share one output folder)."""
+    with _SAVE_LOCKS_GUARD:
+        return _SAVE_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+
+def load_json(path):
+    """The JSON object stored at ``path``, or ``{}`` if it is missing or unreadable."""
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return data
+        except Exception:
+            pass
+    return {}
+
+
+def write_json(path, payload):
+    """Replace ``path`` with ``payload`` atomically, through a temp file of its own."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fd, tmp_path = ArtifactWriter._create_tmp(path)  # umask default, unlike mkstemp's 0600
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            ArtifactWriter._keep_mode(f.fileno(), path)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class RunManifest:
+    """Records per-file, per-stage fingerprints of the last successful run.
+
+    A stage fingerprint combines everything its output depends on (source
+    hash, prompt template hash, model and any upstream stage fingerprint), so
+    a stage only needs to run again when one of those inputs changed or its
+    output file has gone missing.
+
+    Several runs may share one manifest file: :meth:`save` merges the
+    stages this instance recorded into what is on disk, so concurrent jobs
+    never drop each other's entries.
+    """
+
+    def __init__(self, path="generated_outputs/.run_manifest.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._recorded = {}  # (file_key, stage) -> entry recorded since the last save
+        self.entries = load_json(path)
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """Combine the given inputs into a single stage fingerprint."""
+        return RunManifest.hash_text("\0".join(str(part) for part in parts))
+
+    def is_fresh(self, file_key: str, stage: str, fingerprint: str, output_path) -> bool:
+        """True if ``stage`` already ran with ``fingerprint`` and its output exists."""
+        with self._lock:
+            entry = self.entries.get(file_key, {}).get(stage)
+        return (
+            entry is not None
+            and entry.get("fingerprint") == fingerprint
+            and os.path.exists(output_path)
+        )
+
+    def record(self, file_key: str, stage: str, fingerprint: str, output_path):
+        entry = {"fingerprint": fingerprint, "output": str(output_path)}
+        with self._lock:
+            self.entries.setdefault(file_key, {})[stage] = entry
+            self._recorded[(file_key, stage)] = entry
+
+    def save(self):
+        """Merge the stages recorded since the last save into the file on disk."""
+        # Serialize whole saves so an older snapshot never replaces a newer one.
+        with save_lock(self.path):
+            entries = load_json(self.path)
+            with self._lock:
+                for (file_key, stage), entry in self._recorded.items():
+                    entries.setdefault(file_key, {})[stage] = entry
+                self._recorded = {}
+                self.entries = entries
+                payload = json.dumps(entries, indent=2, sort_keys=True)
+            write_json(self.path, payload)
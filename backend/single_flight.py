@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+
+class _Call:
+    """One in-flight call and the callers waiting for it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = []  # (loop, asyncio.Future) of async followers
+
+    def outcome(self):
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def _resolve(future, call):
+    if future.done():  # the follower was cancelled meanwhile
+        return
+    if isinstance(call.error, asyncio.CancelledError):
+        future.cancel()
+    elif call.error is not None:
+        future.set_exception(call.error)
+    else:
+        future.set_result(call.result)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight (followers) wait and receive the same
+    result or exception. Threads and asyncio tasks on any event loop can
+    join the same call. If the leader is cancelled, its followers retry and
+    one of them becomes the new leader.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._calls[key] = _Call()
+            self.leaders += 1
+            return call, True
+
+    def _finish(self, key, call, result=None, error=None):
+        with self._lock:
+            self._calls.pop(key, None)
+            call.result, call.error = result, error
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, call)
+
+    def do(self, key, fn):
+        """Run ``fn()`` once per key in flight; returns ``(result, coalesced)``."""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                try:
+                    result = fn()
+                except BaseException as e:
+                    self._finish(key, call, error=e)
+                    raise
+                self._finish(key, call, result=result)
+                return result, False
+
+            call.done.wait()
+            if not isinstance(call.error, asyncio.CancelledError):
+                return call.outcome(), True
+
+    async def ado(self, key, fn):
+        """Async variant of :meth:`do`; ``fn`` returns an awaitable."""
+        while True:
+            call, leader = self._join(key)
+            if leader:
+                try:
+                    result = await fn()
+                except BaseException as e:
+                    self._finish(key, call, error=e)
+                    raise
+                self._finish(key, call, result=result)
+                return result, False
+
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            with self._lock:
+                finished = call.done.is_set()
+                if not finished:
+                    call.waiters.append((loop, future))
+            if finished:
+                _resolve(future, call)
+            try:
+                return await future, True
+            except asyncio.CancelledError:
+                if not isinstance(call.error, asyncio.CancelledError):
+                    raise  # this follower itself was cancelled
+
+    def stats(self):
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._calls)}
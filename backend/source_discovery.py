@@ -0,0 +1,166 @@
+"""Streaming, recursive discovery of source files.
+
+:class:`SourceScanner` walks a tree with ``os.scandir`` and yields matching
+paths as soon as it sees them, so a run can start on the first files while
+the rest of a large tree is still being scanned. Include/exclude patterns
+and ``.gitignore`` files use the same (gitignore-style) glob syntax.
+"""
+
+import os
+import re
+
+DEFAULT_INCLUDE = ("*.py",)
+DEFAULT_EXCLUDE = (
+    ".git/", ".hg/", ".svn/", "__pycache__/", ".venv/", "venv/", ".tox/", ".nox/",
+    ".mypy_cache/", ".pytest_cache/", "node_modules/", "*.egg-info/",
+)
+
+
+def _translate(pattern):
+    """Regex for a gitignore-style glob (``*``, ``?``, ``[...]`` and ``**``)."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+            i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return re.compile("".join(out))
+
+
+class GlobRule:
+    """One gitignore-style pattern, relative to the folder ``base`` ('' for the root).
+
+    Patterns without a slash match a name at any depth; patterns with one
+    are anchored to ``base``. A trailing ``/`` matches directories only and
+    a leading ``!`` negates the rule.
+    """
+
+    def __init__(self, pattern, base=""):
+        self.negate = pattern.startswith("!")
+        if self.negate or pattern.startswith("\\!") or pattern.startswith("\\#"):
+            pattern = pattern[1:]
+        self.dir_only = pattern.endswith("/")
+        pattern = pattern.rstrip("/")
+        self.anchored = "/" in pattern
+        self.regex = _translate(pattern.lstrip("/"))
+        self.base = f"{base}/" if base else ""
+
+    def matches(self, rel_path, is_dir):
+        if self.dir_only and not is_dir:
+            return False
+        if self.base:
+            if not rel_path.startswith(self.base):
+                return False
+            rel_path = rel_path[len(self.base):]
+        if self.anchored:
+            return self.regex.fullmatch(rel_path) is not None
+        return self.regex.fullmatch(rel_path.rsplit("/", 1)[-1]) is not None
+
+
+def parse_gitignore(text, base=""):
+    """Rules of one ``.gitignore`` file located in the folder ``base``."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        rules.append(GlobRule(line, base))
+    return rules
+
+
+def is_ignored(rules, rel_path, is_dir):
+    """gitignore semantics: the last matching rule decides."""
+    ignored = False
+    for rule in rules:
+        if rule.matches(rel_path, is_dir):
+            ignored = not rule.negate
+    return ignored
+
+
+class SourceScanner:
+    """Iterable that lazily yields source files below ``root``.
+
+    Every iteration rescans the tree. Files must match one ``include``
+    pattern and no ``exclude`` pattern; with ``gitignore`` enabled, the
+    ``.gitignore`` files found on the way are honoured as well. Ignored
+    directories are pruned without being opened.
+    """
+
+    def __init__(self, root, include=DEFAULT_INCLUDE, exclude=DEFAULT_EXCLUDE, gitignore=True):
+        self.root = str(root)
+        self.include = [GlobRule(pattern) for pattern in include]
+        self.exclude = [GlobRule(pattern) for pattern in exclude]
+        self.gitignore = gitignore
+        self.stats = {"directories": 0, "files": 0, "ignored": 0}
+
+    def _excluded(self, rules, rel_path, is_dir):
+        if any(rule.matches(rel_path, is_dir) for rule in self.exclude):
+            return True
+        return is_ignored(rules, rel_path, is_dir)
+
+    def _gitignore_rules(self, folder, rel_dir):
+        try:
+            with open(os.path.join(folder, ".gitignore"), "r", encoding="utf-8") as f:
+                return parse_gitignore(f.read(), rel_dir)
+        except (OSError, UnicodeDecodeError):
+            return []
+
+    def __iter__(self):
+        self.stats = {"directories": 0, "files": 0, "ignored": 0}
+        # Depth-first, in name order; each folder carries the rules in force there.
+        stack = [(self.root, "", ())]
+        while stack:
+            folder, rel_dir, rules = stack.pop()
+            if self.gitignore:
+                rules = rules + tuple(self._gitignore_rules(folder, rel_dir))
+            try:
+                with os.scandir(folder) as it:
+                    entries = sorted(it, key=lambda entry: entry.name)
+            except OSError:
+                continue
+            self.stats["directories"] += 1
+
+            subfolders = []
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    is_file = not is_dir and entry.is_file()
+                except OSError:
+                    continue
+                if not (is_dir or is_file):
+                    continue
+                if self._excluded(rules, rel_path, is_dir):
+                    self.stats["ignored"] += 1
+                elif is_dir:
+                    subfolders.append((entry.path, rel_path, rules))
+                elif any(rule.matches(rel_path, False) for rule in self.include):
+                    self.stats["files"] += 1
+                    yield entry.path
+            stack.extend(reversed(subfolders))
@@ -1,23 +1,165 @@
+import copy
 import threading
+import time
+from collections import deque
+from pathlib import Path
+
+DEFAULT_STAGES_PER_FILE = 4  # parse, requirements, gherkin, updated_code
+MIN_WINDOW = 5
+
 
 class StatusTracker:
-    """Thread-safe global progress tracker for live Streamlit display."""
-    _instance = None
-    _lock = threading.Lock()
+    """Thread-safe progress tracker for live Streamlit display.
+
+    Workers record per-file status and append events under one short-held
+    lock; they never wait on the reader. The page polls :meth:`events_since`
+    with the last sequence number it saw and :meth:`progress` for ETA and
+    throughput, so polling never blocks the workers.
+    """
+
+    def __init__(self, total_files=0, stages_per_file=DEFAULT_STAGES_PER_FILE, max_events=10000,
+                 window=20, discovering=False):
+        self.total_files = total_files
+        self.discovering = discovering
+        self.stages_per_file = max(1, stages_per_file)
+        self.status = {}
+        self.completed = 0
+        self.failed = 0
+        self.started_at = time.monotonic()
+        self._events = deque(maxlen=max_events)
+        self._finish_times = deque(maxlen=max(MIN_WINDOW, window))
+        self._seq = 0
+        self._lock = threading.Lock()
 
-    def __new__(cls):
-        with cls._lock:
-            if cls._instance is None:
-                cls._instance = super(StatusTracker, cls).__new__(cls)
-                cls._instance.status = {}
-        return cls._instance
+    def _emit(self, key, kind, message, stage=None):
+        """Append an event; the caller must hold ``self._lock``."""
+        self._seq += 1
+        entry = self.status.get(key, {})
+        self._events.append({
+            "seq": self._seq,
+            "time": time.time(),
+            "file": key,
+            "filename": entry.get("filename", Path(key).name),
+            "kind": kind,
+            "stage": stage,
+            "message": message,
+            "progress": entry.get("progress", 0),
+        })
+
+    def _entry(self, key, filename=None):
+        entry = self.status.get(key)
+        if entry is None:
+            entry = self.status[key] = {
+                "filename": filename or Path(key).name,
+                "stage": "Start",
+                "progress": 0,
+                "message": "",
+                "state": "pending",
+                "stages_done": [],
+            }
+        return entry
+
+    def add_files(self, count=1):
+        """Grow the total while files are still being discovered."""
+        with self._lock:
+            self.total_files += count
+
+    def discovery_done(self):
+        with self._lock:
+            self.discovering = False
 
     def update(self, filename, message, stage=None, percent=None):
-        if filename not in self.status:
-            self.status[filename] = {"stage": stage or "Start", "progress": percent or 0, "message": message}
-        else:
-            self.status[filename].update({"stage": stage or "Start", "progress": percent or 0, "message": message})
-        print(f"[{filename}] {message}")
+        """Set a free-form status message for ``filename``."""
+        with self._lock:
+            entry = self._entry(filename)
+            entry.update({"stage": stage or entry["stage"], "message": message})
+            if percent is not None:
+                entry["progress"] = percent
+            self._emit(filename, "update", message, stage)
+
+    def start_file(self, key, filename=None):
+        with self._lock:
+            entry = self._entry(key, filename)
+            # A rerun of the same file replaces its previous outcome.
+            if entry["state"] == "done":
+                self.completed -= 1
+            elif entry["state"] == "failed":
+                self.failed -= 1
+            entry.update({
+                "state": "running", "message": "Started", "progress": 0, "stages_done": [],
+                "started": time.monotonic(),
+            })
+            self._emit(key, "file_started", "Started")
+
+    def stage_done(self, key, stage, skipped=False):
+        """Mark ``stage`` of ``key`` complete and advance its percentage."""
+        with self._lock:
+            entry = self._entry(key)
+            if stage not in entry["stages_done"]:
+                entry["stages_done"].append(stage)
+            entry["stage"] = stage
+            entry["progress"] = min(100, round(100 * len(entry["stages_done"]) / self.stages_per_file))
+            entry["message"] = f"{stage} {'reused' if skipped else 'done'}"
+            self._emit(key, "stage_skipped" if skipped else "stage_done", entry["message"], stage)
+
+    def finish_file(self, key, ok=True, message=None):
+        with self._lock:
+            entry = self._entry(key)
+            entry["state"] = "done" if ok else "failed"
+            entry["message"] = message or ("Completed" if ok else "Failed")
+            if ok:
+                entry["progress"] = 100
+                self.completed += 1
+            else:
+                self.failed += 1
+            self._finish_times.append(time.monotonic())
+            self._emit(key, "file_done" if ok else "file_failed", entry["message"])
+
+    def events_since(self, seq=0):
+        """Events newer than ``seq``, oldest first."""
+        with self._lock:
+            if not self._events or self._events[-1]["seq"] <= seq:
+                return []
+            return [dict(event) for event in self._events if event["seq"] > seq]
 
     def get_status(self):
-        return dict(self.status)
+        """Deep copy of the per-file status, safe to read while workers update it."""
+        with self._lock:
+            return copy.deepcopy(self.status)
+
+    def progress(self):
+        """Counts, throughput (files/sec) and an ETA for the remaining files."""
+        now = time.monotonic()
+        with self._lock:
+            finished = self.completed + self.failed
+            elapsed = now - self.started_at
+            finish_times = list(self._finish_times)
+            total, completed, failed = self.total_files, self.completed, self.failed
+            discovering = self.discovering
+
+        # Once enough files finished, use the recent window: it adapts when
+        # the pace changes mid-run and ignores the warm-up before the first file.
+        if len(finish_times) >= MIN_WINDOW and finish_times[-1] > finish_times[0]:
+            throughput = (len(finish_times) - 1) / (finish_times[-1] - finish_times[0])
+        else:
+            throughput = finished / elapsed if finished and elapsed > 0 else 0.0
+        remaining = max(0, total - finished)
+        if discovering:
+            eta = None  # the total is still growing
+        elif not remaining:
+            eta = 0.0
+        elif throughput:
+            eta = round(remaining / throughput, 1)
+        else:
+            eta = None
+        return {
+            "total": total,
+            "discovering": discovering,
+            "completed": completed,
+            "failed": failed,
+            "remaining": remaining,
+            "percent": round(100 * finished / total, 1) if total else 0.0,
+            "elapsed_seconds": round(elapsed, 2),
+            "files_per_second": round(throughput, 3),
+            "eta_seconds": eta,
+        }
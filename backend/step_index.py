@@ -0,0 +1,198 @@
+"""Index of Behave step definitions found in generated outputs.
+
+Gherkin outputs carry their step definitions (``@given("...")`` and
+friends) next to the feature text. :class:`StepIndex` collects those
+patterns per source file so later prompts can list the steps that already
+exist and the model only writes the missing ones.
+"""
+
+import ast
+import json
+import os
+import re
+import threading
+from backend.rate_limiter import RateLimiter
+from backend.run_manifest import load_json, save_lock, write_json
+from backend.source_discovery import SourceScanner
+
+DEFAULT_STEP_TOKENS = int(os.getenv("STEP_INDEX_TOKENS", "400"))
+STEP_FILE_PATTERNS = ("*.feature", "*.py", "*.md")
+
+_STEP_RE = re.compile(
+    r"""^\s*@(given|when|then|step)\(\s*(?:parsers\.\w+\(\s*)?[rRuU]?("{3}|'{3}|"|')((?:\\.|.)+?)\2""",
+    re.MULTILINE,
+)
+_BLOCK_RE = re.compile(r"^```[ \t]*([\w-]*)[^\n]*\n(.*?)^```", re.DOTALL | re.MULTILINE)
+_PLACEHOLDER_RE = re.compile(r"\{[^{}]*\}|\(\?P<\w+>[^)]*\)|<\w+>")
+_WORD_RE = re.compile(r"[a-z]{3,}")
+
+
+def parse_steps(text):
+    """``[(keyword, pattern), ...]`` of the step decorators in ``text``, in order."""
+    steps, seen = [], set()
+    for match in _STEP_RE.finditer(text):
+        pattern = match.group(3).replace('\\"', '"').replace("\\'", "'").strip()
+        step = (match.group(1).lower(), pattern)
+        if step not in seen:
+            seen.add(step)
+            steps.append(step)
+    return steps
+
+
+def split_reply(text):
+    """``(feature_text, [python_block, ...])`` of one Gherkin reply."""
+    features, steps = [], []
+    for match in _BLOCK_RE.finditer(text):
+        language, body = match.group(1).lower(), match.group(2)
+        if language in ("python", "py") or (not language and parse_steps(body)):
+            if parse_steps(body):
+                steps.append(body)
+        elif language in ("gherkin", "feature", "cucumber") or "Feature:" in body:
+            features.append(body.rstrip())
+    if not features and "Feature:" in text and not _BLOCK_RE.search(text):
+        features.append(text.strip())  # a bare feature without fences
+    return "\n\n".join(features), steps
+
+
+def runnable_steps(text):
+    """Steps of ``text`` that can actually run: those in step blocks that parse as Python.
+
+    Text without fenced blocks (a plain steps module) is taken as one block.
+    """
+    blocks = split_reply(text)[1] if _BLOCK_RE.search(text) else [text]
+    steps = []
+    for block in blocks:
+        try:
+            ast.parse(block)
+        except SyntaxError:
+            continue
+        steps.extend(step for step in parse_steps(block) if step not in steps)
+    return steps
+
+
+def normalize(pattern):
+    """Pattern with every placeholder replaced by ``{}`` (to spot duplicates)."""
+    return " ".join(_PLACEHOLDER_RE.sub("{}", pattern).lower().split())
+
+
+class StepIndex:
+    """Step patterns per source file, persisted as JSON next to the outputs.
+
+    Files are re-read only when their mtime or size changed. The same step
+    defined in several files is listed once, most widely defined first.
+    :meth:`save` merges this instance's changes into the file on disk, so
+    concurrent jobs sharing an output folder keep each other's steps.
+    """
+
+    def __init__(self, path="generated_outputs/.step_index.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._changed = {}  # source path -> new entry, or None once forgotten, since the last save
+        self.sources = load_json(path)  # source path -> {"mtime_ns", "size", "steps": [[kw, pattern]]}
+
+    def save(self):
+        """Merge the sources changed since the last save into the file on disk."""
+        with save_lock(self.path):
+            sources = load_json(self.path)
+            with self._lock:
+                for key, entry in self._changed.items():
+                    if entry is None:
+                        sources.pop(key, None)
+                    else:
+                        sources[key] = entry
+                self._changed = {}
+                self.sources = sources
+                payload = json.dumps(sources, indent=1, sort_keys=True)
+            write_json(self.path, payload)
+
+    def add(self, source, text):
+        """Replace the steps recorded for ``source`` with those found in ``text``."""
+        key = os.path.abspath(source)
+        try:
+            stat = os.stat(key)
+            mtime_ns, size = stat.st_mtime_ns, stat.st_size
+        except OSError:
+            mtime_ns, size = None, None
+        steps = [list(step) for step in runnable_steps(text)]
+        with self._lock:
+            self.sources[key] = self._changed[key] = {"mtime_ns": mtime_ns, "size": size, "steps": steps}
+
+    def refresh(self, *directories):
+        """Re-index changed step files below ``directories`` and forget deleted ones."""
+        seen = set()
+        for directory in directories:
+            if not os.path.isdir(directory):
+                continue
+            for path in SourceScanner(directory, include=STEP_FILE_PATTERNS):
+                key = os.path.abspath(path)
+                seen.add(key)
+                try:
+                    stat = os.stat(key)
+                except OSError:
+                    continue
+                with self._lock:
+                    entry = self.sources.get(key)
+                if entry is not None and (entry["mtime_ns"], entry["size"]) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    with open(key, "r", encoding="utf-8") as f:
+                        self.add(key, f.read())
+                except (OSError, UnicodeDecodeError):
+                    continue
+        roots = tuple(os.path.join(os.path.abspath(d), "") for d in directories)
+        with self._lock:
+            for key in [k for k in self.sources if k.startswith(roots) and k not in seen]:
+                del self.sources[key]
+                self._changed[key] = None
+        return self
+
+    def snapshot(self):
+        """A frozen copy, so every prompt of a run sees the same steps."""
+        copy = StepIndex.__new__(StepIndex)
+        copy.path = self.path
+        copy._lock = threading.Lock()
+        copy._changed = {}
+        with self._lock:
+            copy.sources = {key: dict(entry) for key, entry in self.sources.items()}
+        return copy
+
+    def steps(self, exclude=None):
+        """``[(keyword, pattern, defined_in_count), ...]`` deduplicated across sources.
+
+        Steps of ``exclude`` (the output about to be regenerated) are left
+        out, so a file never loses its own steps to "reuse".
+        """
+        exclude = os.path.abspath(exclude) if exclude else None
+        found = {}
+        with self._lock:
+            entries = [(key, entry) for key, entry in self.sources.items() if key != exclude]
+        for _, entry in entries:
+            for keyword, pattern in entry["steps"]:
+                key = (keyword, normalize(pattern))
+                if key in found:
+                    found[key][2] += 1
+                else:
+                    found[key] = [keyword, pattern, 1]
+        return [tuple(step) for step in found.values()]
+
+    def render(self, context_text="", exclude=None, token_budget=DEFAULT_STEP_TOKENS):
+        """Reusable step signatures for a prompt, most relevant first, within ``token_budget``.
+
+        Relevance is word overlap with ``context_text`` (the module being
+        described), then how many files already use the step.
+        """
+        words = set(_WORD_RE.findall(context_text.lower()))
+        ranked = sorted(
+            self.steps(exclude),
+            key=lambda s: (-len(words & set(_WORD_RE.findall(s[1].lower()))), -s[2], s[1]),
+        )
+        lines, used = [], 0
+        for keyword, pattern, _ in ranked:
+            quoted = pattern.replace('"', '\\"')
+            line = f'- @{keyword}("{quoted}")'
+            cost = RateLimiter.estimate_tokens(line)
+            if used + cost > token_budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
@@ -1,50 +1,54 @@
 # backend/story_generator.py
 
-import os
-from openai import OpenAI
-from backend.code_parser import PythonCodeParser
-from backend.app_utils.prompt_manager import PromptManager
-from dotenv import load_dotenv
+from backend.ai_client import AIClient
+from backend.analysis_cache import ModuleAnalysis
+from backend.app_utils.prompt_library import PromptLibrary
+from backend.app_utils.prompt_registry import PromptRegistry
 
-load_dotenv()
+PROMPT_FILE = "backend/app_utils/prompts.json"
+
+STORY_MODEL = "gpt-4o"
+SYSTEM_MESSAGE = "You are a professional business analyst."
 
 class StoryGenerator:
     """Generate user stories from code using GPT."""
     
-    def __init__(self, code_text: str, filename: str):
+    def __init__(self, code_text: str, filename: str, analysis=None):
         self.code_text = code_text
         self.filename = filename
-        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.ai = AIClient.shared()
+        self.analysis = analysis or ModuleAnalysis(None, filename, code_text, None)
 
-        if not self.api_key:
-            raise ValueError("❌ OpenAI API key is missing. Please set it in your .env file.")
+    def build_messages(self):
+        parsed = self.analysis.summary
+        module_doc = parsed.get("module_doc", "No module description available.")
+        functions = parsed.get("functions", [])
 
-        self.client = OpenAI(api_key=self.api_key)
-        self.parser = PythonCodeParser(code_text, filename)
+        formatted_functions = "\n".join([f"- {f['name']}: {f['doc'] or 'No docstring'}" for f in functions])
 
-        # Load prompt
-        self.prompt_manager = PromptManager("backend/app_utils/prompts.json")
-        self.story_prompt = self.prompt_manager.get_prompt("story_prompt")
+        # Prompt Manager template if set, otherwise the library default
+        template = PromptRegistry.for_file(PROMPT_FILE).get("story_prompt")
+        if template:
+            prompt = template.render(
+                module_doc=module_doc,
+                functions_summary=formatted_functions,
+                filename=self.filename
+            )
+        else:
+            prompt = PromptLibrary.story_prompt(module_doc, formatted_functions, self.filename)
+
+        return [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ]
 
     def process(self):
-        parsed = self.parser.process()
-        module_doc = parsed.get("module_doc", "No module description available.")
-        functions = parsed.get("functions", [])
+        return self.ai.chat_text(self.build_messages(), model=STORY_MODEL)
 
-        formatted_functions = "\n".join([f"- {f['name']}: {f['doc'] or 'No docstring'}" for f in functions])
+    async def aprocess(self):
+        """Async variant of :meth:`process`."""
+        return await self.ai.achat_text(self.build_messages(), model=STORY_MODEL)
 
-        prompt = self.story_prompt.format(
-            module_doc=module_doc,
-            functions_summary=formatted_functions,
-            filename=self.filename
-        )
-
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a professional business analyst."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        return response.choices[0].message.content.strip()
+    def stream(self):
+        """Yield the story in chunks as the model produces them."""
+        return self.ai.stream_chat(self.build_messages(), model=STORY_MODEL)
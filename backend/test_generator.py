@@ -4,14 +4,28 @@ from backend.app_utils.prompt_library import PromptLibrary
 class TestGenerator:
     """Generates pytest test cases from function summaries."""
 
-    def __init__(self, functions_summary: str, filename: str):
+    def __init__(self, functions_summary: str, filename: str, analysis=None):
         self.functions_summary = functions_summary
         self.filename = filename
-        self.ai = AIClient()
+        self.analysis = analysis
+        self.ai = AIClient.shared()
+
+    def build_prompt(self):
+        functions_summary = self.functions_summary
+        if not functions_summary and self.analysis is not None:
+            functions_summary = self.analysis.prompt_context()["functions_summary"]
+        return PromptLibrary.test_prompt(
+            functions_summary, self.filename
+        )
 
     def process(self):
         """Use centralized prompt to generate test scripts."""
-        prompt = PromptLibrary.test_prompt(
-            self.functions_summary, self.filename
-        )
-        return self.ai.generate_text(prompt)
+        return self.ai.generate_text(self.build_prompt())
+
+    async def aprocess(self):
+        """Async variant of :meth:`process`."""
+        return await self.ai.agenerate_text(self.build_prompt())
+
+    def stream(self):
+        """Yield the response in chunks as the model produces them."""
+        return self.ai.stream_text(self.build_prompt())
@@ -0,0 +1,397 @@
+"""Parallel, sharded runner for generated pytest and Behave suites.
+
+Test files are balanced across ``workers`` shards by their duration in
+previous runs (longest first, each onto the least loaded shard). Each shard
+runs as its own ``pytest`` process, and each Behave feature as its own
+``behave`` process, so shards execute in parallel. A file whose test file
+and source tree are unchanged since it last passed is not run again. The
+outcome is written as one merged JUnit XML file plus a timing report.
+
+The pipeline exports its Gherkin replies as a Behave suite (features plus
+a shared ``steps`` package, see :class:`BehaveSuite`) under
+``generated_outputs/behave``. Pytest files can be passed alongside.
+
+Usage::
+
+    python -m backend.test_runner generated_outputs/behave --source input
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from backend.source_discovery import DEFAULT_EXCLUDE, SourceScanner
+
+DEFAULT_TEST_WORKERS = int(os.getenv("TEST_RUNNER_WORKERS", str(os.cpu_count() or 1)))
+DEFAULT_TEST_TIMEOUT = float(os.getenv("TEST_RUNNER_TIMEOUT", "900"))
+DEFAULT_STATE_PATH = os.getenv("TEST_RUNNER_STATE", ".cache/test_runner.json")
+DEFAULT_DURATION = 1.0  # seconds assumed for a file never timed before
+TEST_PATTERNS = ("test_*.py", "*_test.py", "*.feature")
+TEST_EXCLUDE = DEFAULT_EXCLUDE + ("steps/",)  # Behave step packages are loaded by behave, not run
+
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def discover_tests(paths):
+    """Test files among ``paths``; directories are scanned recursively."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(SourceScanner(path, include=TEST_PATTERNS, exclude=TEST_EXCLUDE))
+        elif os.path.isfile(path):
+            found.append(path)
+    return sorted({os.path.abspath(p) for p in found})
+
+
+def find_steps_dir(feature_path):
+    """The ``steps`` folder Behave loads for ``feature_path`` (nearest one upwards), or ``None``."""
+    folder = Path(feature_path).resolve().parent
+    for candidate in (folder, *folder.parents):
+        if (candidate / "steps").is_dir():
+            return candidate / "steps"
+    return None
+
+
+def _hash_folder(folder, pattern="*.py"):
+    digest = hashlib.sha256()
+    for path in sorted(Path(folder).glob(pattern)):
+        digest.update(f"{path.name}\0{_hash_file(path)}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def discover_sources(paths):
+    """Python sources among ``paths`` (directories scanned recursively), sorted."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(SourceScanner(path))
+        elif os.path.isfile(path):
+            found.append(path)
+    return sorted({os.path.abspath(p) for p in found})
+
+
+def balance(paths, durations, shards):
+    """Longest-processing-time-first split of ``paths`` into ``shards`` lists."""
+    known = [durations[p] for p in paths if p in durations]
+    default = sorted(known)[len(known) // 2] if known else DEFAULT_DURATION
+    bins = [[0.0, []] for _ in range(max(1, min(shards, len(paths))))]
+    for path in sorted(paths, key=lambda p: durations.get(p, default), reverse=True):
+        lightest = min(bins, key=lambda b: b[0])
+        lightest[0] += durations.get(path, default)
+        lightest[1].append(path)
+    return [files for _, files in bins if files]
+
+
+def _rootdir(files):
+    """Common folder of ``files``; pytest reports test paths relative to it."""
+    return os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in files])
+
+
+def _cases_by_file(junit_path, files, rootdir=None):
+    """``{file: [testcase element, ...]}`` from a JUnit report, attributed by path.
+
+    A case's ``file`` attribute, or else its dotted ``classname``, is
+    resolved against ``rootdir`` (the pytest ``--rootdir``), so same-named
+    test files in different folders are told apart.
+    """
+    cases = {path: [] for path in files}
+    if not os.path.exists(junit_path):
+        return cases
+    rootdir = rootdir or _rootdir(files)
+    by_path = {os.path.abspath(path): path for path in files}
+
+    for case in ET.parse(junit_path).getroot().iter("testcase"):
+        match = None
+        if len(files) == 1:
+            match = files[0]
+        elif case.get("file"):
+            match = by_path.get(os.path.abspath(os.path.join(rootdir, case.get("file"))))
+        if match is None:
+            # "pkg.test_mod.TestX" → pkg/test_mod.py, trying the longest module path first
+            parts = (case.get("classname") or "").split(".")
+            for end in range(len(parts), 0, -1):
+                match = by_path.get(os.path.abspath(os.path.join(rootdir, *parts[:end]) + ".py"))
+                if match is not None:
+                    break
+        if match is not None:
+            cases[match].append(case)
+    return cases
+
+
+def _case_record(case):
+    status = "passed"
+    for tag in ("failure", "error"):
+        if case.find(tag) is not None:
+            status = "failed" if tag == "failure" else "error"
+    if case.find("skipped") is not None:
+        status = "skipped"
+    return {
+        "classname": case.get("classname", ""),
+        "name": case.get("name", ""),
+        "time": float(case.get("time") or 0.0),
+        "status": status,
+    }
+
+
+class TestRunner:
+    """Runs generated test files in balanced parallel shards with a pass cache.
+
+    State (per-file durations and cached passes) lives in one JSON file, so
+    balancing and caching carry over between runs.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self, source_paths=(), workers=DEFAULT_TEST_WORKERS, state_path=DEFAULT_STATE_PATH,
+                 use_cache=True, timeout=DEFAULT_TEST_TIMEOUT, python=sys.executable):
+        self.source_paths = list(source_paths)
+        self.workers = max(1, workers)
+        self.state_path = state_path
+        self.use_cache = use_cache
+        self.timeout = timeout
+        self.python = python
+        self.state = self._load()
+
+    # ----------------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------------
+    def _load(self):
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if isinstance(data, dict):
+                    return {"durations": data.get("durations", {}), "passed": data.get("passed", {})}
+            except Exception:
+                pass
+        return {"durations": {}, "passed": {}}
+
+    def _save(self):
+        folder = os.path.dirname(self.state_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def _source_digest(self):
+        """One hash over every source file the tests may exercise."""
+        digest = hashlib.sha256()
+        for path in discover_sources(self.source_paths):
+            digest.update(f"{path}\0{_hash_file(path)}\0".encode("utf-8"))
+        return digest.hexdigest()
+
+    # ----------------------------------------------------------------
+    # Shard execution
+    # ----------------------------------------------------------------
+    def _execute(self, command):
+        started = time.perf_counter()
+        try:
+            proc = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            code, output = proc.returncode, proc.stdout + proc.stderr
+        except subprocess.TimeoutExpired as e:
+            code, output = None, f"⏱️ Timed out after {self.timeout:.0f}s\n{e.stdout or ''}"
+        except OSError as e:
+            code, output = None, f"❌ Could not start {command[0]}: {e}"
+        return code, output, time.perf_counter() - started
+
+    def _run_pytest(self, shard, files, workdir):
+        junit_path = os.path.join(workdir, f"pytest_shard_{shard}.xml")
+        rootdir = _rootdir(files)
+        command = [
+            self.python, "-m", "pytest", "-q", "-p", "no:cacheprovider", "-o", "junit_family=xunit1",
+            # importlib mode: same-named test files in different folders do not clash on import
+            "--continue-on-collection-errors", "--import-mode=importlib",
+            f"--rootdir={rootdir}", f"--junitxml={junit_path}", *files,
+        ]
+        code, output, seconds = self._execute(command)
+        return self._file_results(files, junit_path, code, output, seconds, no_tests_code=5, rootdir=rootdir)
+
+    def _run_behave(self, feature, workdir):
+        junit_dir = tempfile.mkdtemp(prefix="behave_", dir=workdir)
+        command = [
+            self.python, "-m", "behave", "--no-capture", "--format", "progress",
+            "--junit", "--junit-directory", junit_dir, feature,
+        ]
+        code, output, seconds = self._execute(command)
+        reports = sorted(Path(junit_dir).glob("*.xml"))
+        junit_path = str(reports[0]) if reports else os.path.join(junit_dir, "missing.xml")
+        return self._file_results([feature], junit_path, code, output, seconds)
+
+    @staticmethod
+    def _file_results(files, junit_path, code, output, seconds, no_tests_code=None, rootdir=None):
+        cases = _cases_by_file(junit_path, files, rootdir)
+        total_case_time = sum(float(c.get("time") or 0.0) for cs in cases.values() for c in cs)
+        overhead = max(0.0, seconds - total_case_time) / len(files)
+        results = {}
+        for path in files:
+            records = [_case_record(case) for case in cases[path]]
+            if records:
+                failed = any(r["status"] in ("failed", "error") for r in records)
+                status = "failed" if failed else "passed"
+            elif code == 0 or (no_tests_code is not None and code == no_tests_code):
+                status = "empty"
+            else:
+                status = "error"
+            case_time = sum(r["time"] for r in records)
+            results[path] = {
+                "status": status,
+                # Process start-up and collection are shared evenly by the shard's files.
+                "duration": round(case_time + overhead, 4),
+                "cases": records,
+                "output": "" if status in ("passed", "empty") else output[-4000:],
+                "cached": False,
+            }
+        return results
+
+    # ----------------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------------
+    def run(self, paths, junit_path="generated_outputs/test_results/junit.xml"):
+        """Run every test file under ``paths`` and return a report dict."""
+        started = time.perf_counter()
+        tests = discover_tests(paths)
+        source_digest = self._source_digest()
+        steps_digests = {}  # a feature also depends on the shared step definitions it runs with
+        keys = {}
+        for path in tests:
+            parts = [_hash_file(path), source_digest]
+            if path.endswith(".feature"):
+                steps_dir = find_steps_dir(path)
+                if steps_dir not in steps_digests:
+                    steps_digests[steps_dir] = _hash_folder(steps_dir) if steps_dir else ""
+                parts.append(steps_digests[steps_dir])
+            keys[path] = hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+        results, pending = {}, []
+        for path in tests:
+            cached = self.state["passed"].get(path)
+            if self.use_cache and cached and cached.get("key") == keys[path]:
+                results[path] = {
+                    "status": "passed", "duration": 0.0, "cases": cached.get("cases", []),
+                    "output": "", "cached": True,
+                }
+            else:
+                pending.append(path)
+
+        durations = self.state["durations"]
+        py_files = [p for p in pending if p.endswith(".py")]
+        features = [p for p in pending if p.endswith(".feature")]
+        shards = balance(py_files, durations, self.workers)
+        # Threads only wait on the test processes; every shard is its own process.
+        with tempfile.TemporaryDirectory(prefix="qa_tests_") as workdir, \
+                ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="qa-test") as pool:
+            futures = [pool.submit(self._run_pytest, index, shard, workdir) for index, shard in enumerate(shards)]
+            # Behave has no multi-file JUnit attribution, so every feature is its own shard.
+            futures += [pool.submit(self._run_behave, feature, workdir)
+                        for feature in sorted(features, key=lambda p: durations.get(p, DEFAULT_DURATION),
+                                              reverse=True)]
+            for future in as_completed(futures):
+                results.update(future.result())
+
+        for path, result in results.items():
+            if result["cached"]:
+                continue
+            durations[path] = result["duration"]
+            if result["status"] == "passed":
+                self.state["passed"][path] = {"key": keys[path], "cases": result["cases"]}
+            else:
+                self.state["passed"].pop(path, None)
+        self._save()
+
+        report = {
+            "files": {path: results[path] for path in tests},
+            "totals": self._totals(results),
+            "shards": len(shards) + len(features),
+            "wall_seconds": round(time.perf_counter() - started, 3),
+            "junit": str(self.write_junit(results, junit_path)) if junit_path else None,
+        }
+        return report
+
+    @staticmethod
+    def _totals(results):
+        totals = {"files": len(results), "cached": 0, "passed": 0, "failed": 0, "error": 0, "empty": 0,
+                  "tests": 0, "test_seconds": 0.0}
+        for result in results.values():
+            totals[result["status"]] += 1
+            totals["cached"] += result["cached"]
+            totals["tests"] += len(result["cases"])
+            totals["test_seconds"] += result["duration"]
+        totals["test_seconds"] = round(totals["test_seconds"], 3)
+        return totals
+
+    @staticmethod
+    def write_junit(results, junit_path):
+        """Merged JUnit XML: one ``testsuite`` per test file (cached passes included)."""
+        root = ET.Element("testsuites")
+        for path, result in sorted(results.items()):
+            cases = result["cases"]
+            suite = ET.SubElement(root, "testsuite", {
+                "name": Path(path).name,
+                "file": path,
+                "tests": str(len(cases)),
+                "failures": str(sum(c["status"] == "failed" for c in cases)),
+                "errors": str(sum(c["status"] == "error" for c in cases) + (result["status"] == "error")),
+                "skipped": str(sum(c["status"] == "skipped" for c in cases)),
+                "time": f"{result['duration']:.4f}",
+            })
+            if result["cached"]:
+                properties = ET.SubElement(suite, "properties")
+                ET.SubElement(properties, "property", {"name": "cached", "value": "true"})
+            for case in cases:
+                element = ET.SubElement(suite, "testcase", {
+                    "classname": case["classname"], "name": case["name"], "time": f"{case['time']:.4f}",
+                })
+                if case["status"] == "failed":
+                    ET.SubElement(element, "failure", {"message": "failed"}).text = result["output"]
+                elif case["status"] == "error":
+                    ET.SubElement(element, "error", {"message": "error"}).text = result["output"]
+                elif case["status"] == "skipped":
+                    ET.SubElement(element, "skipped")
+            if result["status"] == "error" and not cases:
+                element = ET.SubElement(suite, "testcase", {"classname": Path(path).stem, "name": "run"})
+                ET.SubElement(element, "error", {"message": "test file could not be run"}).text = result["output"]
+
+        junit_path = Path(junit_path)
+        junit_path.parent.mkdir(parents=True, exist_ok=True)
+        ET.ElementTree(root).write(junit_path, encoding="utf-8", xml_declaration=True)
+        return junit_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run generated pytest and Behave suites in parallel shards.")
+    parser.add_argument("paths", nargs="+", help="Test files or directories to scan for tests.")
+    parser.add_argument("--source", action="append", default=[],
+                        help="Source file or directory the tests exercise (repeatable); part of the cache key.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_TEST_WORKERS)
+    parser.add_argument("--junit", default="generated_outputs/test_results/junit.xml")
+    parser.add_argument("--timings", default=None, help="Also write the JSON report to this path.")
+    parser.add_argument("--no-cache", action="store_true", help="Run every file even if it passed before.")
+    args = parser.parse_args()
+
+    runner = TestRunner(args.source, workers=args.workers, use_cache=not args.no_cache)
+    report = runner.run(args.paths, junit_path=args.junit)
+    totals = report["totals"]
+    print(
+        f"🧪 {totals['files']} files ({totals['cached']} cached) · ✅ {totals['passed']} passed · "
+        f"❌ {totals['failed']} failed · ⚠️ {totals['error']} errors · "
+        f"{report['shards']} shards in {report['wall_seconds']:.1f}s → {report['junit']}"
+    )
+    if args.timings:
+        Path(args.timings).write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    sys.exit(1 if totals["failed"] or totals["error"] else 0)
+
+
+if __name__ == "__main__":
+    main()